@@ -50,6 +50,8 @@ from .dataviewer import DVParser
 from .dataviewer import DVSource
 
 import session
+from . import cache
+from .exporter import default_registry
 
 
 # Set default logging handler to avoid "No handler found" warnings.
@@ -65,11 +67,14 @@ logging.getLogger(__name__).addHandler(NullHandler())
 
 
 class PyEnt(object):
-    def __init__(self, console_url, username=None, password=None, **kwargs):
+    def __init__(self, console_url, username=None, password=None, cache_ttl=cache.DEFAULT_TTL, **kwargs):
         self._session = session.clean()
         self._console_url = console_url
         self._username = username
         self._password = password
+        self._registry = None
+        self._cache_ttl = cache_ttl
+        cache.for_session(self._session, cache_ttl)
 
         self._event_attribute = EventAttribute(self._console_url, self._session)
         self._event_type = EventType(self._console_url, self._session)
@@ -128,7 +133,37 @@ class PyEnt(object):
     def logout(self):
         self._session = session.logout(self._session)
 
+    def export_metrics(self, registry=None):
+        """Record the latency of every REST request, kept across login
+
+        :param registry: MetricsRegistry, default is exporter.default_registry, serve it with MetricsExporter
+        :return: registry
+        """
+        self._registry = registry or default_registry
+        self._registry.instrument(self._session)
+        return self._registry
+
+    @property
+    def cache(self):
+        """Metadata cache shared by the resources, get_by_name lookups are served from it
+
+        :return: MetadataCache of the current session
+        """
+        return cache.for_session(self._session, self._cache_ttl)
+
+    def clear_cache(self, *resources):
+        """Drop cached resource lists, e.g. after changes made by another client
+
+        :param resources: resource names, e.g. EventParser or EventInitParams, none drops everything
+        :return: None
+        """
+        self.cache.invalidate(*resources)
+
     def update_session(self):
+        if self._session is not None:
+            cache.for_session(self._session, self._cache_ttl)
+        if self._registry is not None and self._session is not None:
+            self._registry.instrument(self._session)
         self._event_parser.session = self._session
         self._event_type.session = self._session
         self._event_base.session = self._session
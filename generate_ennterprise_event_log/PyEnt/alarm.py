@@ -1,8 +1,10 @@
 # -*- coding: utf-8 -*-
 
+import copy
 import json
 
 from ._internal_utils import status_code_check, response_status_check, convert_date_time
+from .cache import cached
 
 from datetime import datetime, date, timedelta
 import logging
@@ -23,31 +25,37 @@ class Alarm(object):
     def session(self, value):
         self._session = value
 
-    def init_param(self):
-        """Get alarm init params
+    def init_param(self, refresh=False):
+        """Get alarm init params, cached per session with the metadata cache ttl
         
+        :param refresh: reload them from the server
         :return: alarm init info dict, keys: attrDatasMap, dynamicOptionDatasMap, operationMap, optionDatasMap and referOptionDatasMap
         """
-        uri = self._console_url + '/alarm/search/getInitParams'
+        return copy.deepcopy(self._init_param(refresh))
 
-        response = self._session.get(uri)
-        response_content = json.loads(response.content)
+    def _init_param(self, refresh=False):
+        def load():
+            uri = self._console_url + '/alarm/search/getInitParams'
 
-        status_code_check(response.status_code, 200)
-        response_status_check(response_content['statusCode'], 0, response_content['messages'])
+            response = self._session.get(uri)
+            response_content = json.loads(response.content)
+
+            status_code_check(response.status_code, 200)
+            response_status_check(response_content['statusCode'], 0, response_content['messages'])
 
-        return response_content['data']['alarmAttrsMap']
+            return response_content['data']['alarmAttrsMap']
+        return cached(self._session, 'AlarmInitParams', load, refresh)
 
     def get_alarm_option_data(self):
         """Get alarm option data info
         
         :return: alarm option data info dict, keys: alarm_focus, alarm_level, alarm_stage, alarm_status, alarm_type
         """
-        return self.init_param()['optionDatasMap']
+        return copy.deepcopy(self._init_param()['optionDatasMap'])
 
     def get_filter_options(self):
         ret_list = []
-        alarm_attr = self.init_param()['attrDatasMap']
+        alarm_attr = self._init_param()['attrDatasMap']
         for i in alarm_attr:
             ret_list.append(alarm_attr[i]['value'])
         ret_list.append('rule_type')
@@ -76,8 +84,7 @@ class Alarm(object):
         if filter_expression:
             payload['alarmScene']['commonFilters'] = dict(FilterExpression = filter_expression)
         uri = self._console_url + '/api/node/alarm/list'
-        print uri
-        print payload
+        log.debug('%s %s', uri, payload)
         response = self._session.post(uri, json=payload)
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
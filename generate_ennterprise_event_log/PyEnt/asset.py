@@ -4,6 +4,7 @@ import json
 
 from ._internal_utils import status_code_check, response_status_check
 from .assettype import AssetType
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -168,18 +169,13 @@ class Asset(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all assets
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        asset_list = self.list()
-        for asset in asset_list:
-            try:
-                self.delete(asset['assetId'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([asset['assetId'] for asset in self.list()])
 
     def import_asset(self, local_file, strategy='skip'):
         """Import asset
@@ -3,6 +3,8 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 
 import logging
@@ -67,8 +69,7 @@ class AssetType(object):
         :return:asset type info dict
         """
 
-        asset_type_list = self.list()
-        return [asset_type for asset_type in asset_type_list if asset_type['name'] == name][0]
+        return lookup(self._session, 'AssetType', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create asset type by name
@@ -80,6 +81,7 @@ class AssetType(object):
         uri = self._console_url + '/asset/type'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'AssetType')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -135,6 +137,7 @@ class AssetType(object):
                 update_data['description'] = desc
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'AssetType')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -148,17 +151,13 @@ class AssetType(object):
 
         uri = self._console_url + '/asset/type/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'AssetType')
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all asset types
-        
-        :return: None
-        """
 
-        asset_type_list = self.list()
-        for asset_type in asset_type_list:
-            try:
-                self.delete(asset_type['id'])
-            except Exception as ex:
-                pass
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
+        """
+        return BulkExecutor(self, workers).delete([asset_type['id'] for asset_type in self.list()])
@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.asyncsender
+~~~~~~~~~~~~~~
+This module provides the asyncio sender engine, many emulated device streams in one event loop.
+
+Every stream has its own msg template, rate and transport. Streams do not own sockets,
+they are assigned round-robin to a small pool of sockets per (transport, host, port),
+so thousands of streams cost a handful of file descriptors. Each stream is woken every
+`tick` seconds and sends the part of its rate that is due for the time elapsed since
+its last wake up, fractions carry over; a late wake up catches up, up to max_lag seconds.
+"""
+
+import random
+import threading
+import time
+
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+
+from .sender import Transport, frame_msg
+
+import logging
+log = logging.getLogger(__name__)
+
+
+class Stream(object):
+    def __init__(self, name, template, rate, host, port=514, transport='udp'):
+        """Stream class init function
+
+        :param name: stream name, unique within the engine
+        :param template: encoded msg, or callable template(stream) returning an encoded msg
+        :param rate: events per second
+        :param host: host server ip
+        :param port: host port, default is 514, SYSLOG port
+        :param transport: refer to Transport, default is udp
+        """
+        assert transport in Transport
+        self.name = name
+        self.template = template
+        self.rate = rate
+        self.addr = (host, port)
+        self.transport = transport
+        self.sent = 0
+        self.bytes = 0
+        self.errors = 0
+        self.dropped = 0
+        self.started = None
+        self._due = 0.0
+        self._last = None
+        self._conn = None
+
+    def render(self):
+        if callable(self.template):
+            return self.template(self)
+        return self.template
+
+    def stats(self):
+        """Get stream stats
+
+        :return: stats dict, keys: name, rate, sent, bytes, errors, dropped, achieved_rate
+        """
+        elapsed = time.time() - self.started if self.started else 0.0
+        return {
+            'name': self.name,
+            'rate': self.rate,
+            'sent': self.sent,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'achieved_rate': self.sent / elapsed if elapsed else 0.0,
+        }
+
+
+class _Connection(object):
+    """One pooled socket, asyncio protocol for both datagram and stream transports"""
+
+    def __init__(self, engine, transport_type, addr):
+        self._engine = engine
+        self.transport_type = transport_type
+        self.addr = addr
+        self.transport = None
+        self.paused = False
+        self.errors = 0
+
+    @property
+    def ready(self):
+        return self.transport is not None and not self.paused
+
+    def write(self, data):
+        if self.transport_type == 'udp':
+            self.transport.sendto(data)
+        else:
+            self.transport.write(data)
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def connection_lost(self, exc):
+        self.transport = None
+        if self._engine.running and self.transport_type != 'udp':
+            log.warning('connection to %s:%s lost: %s, reconnecting', self.addr[0], self.addr[1], exc)
+            self._engine.reconnect(self)
+
+    def pause_writing(self):
+        self.paused = True
+
+    def resume_writing(self):
+        self.paused = False
+
+    def error_received(self, exc):
+        self.errors += 1
+
+    def datagram_received(self, data, addr):
+        pass
+
+    def data_received(self, data):
+        pass
+
+    def eof_received(self):
+        return False
+
+
+class AsyncSender(object):
+    def __init__(self, sockets=4, tick=0.1, report_interval=0, on_report=None, max_lag=1.0):
+        """AsyncSender class init function
+
+        :param sockets: pooled sockets per (transport, host, port)
+        :param tick: stream wake up interval in seconds
+        :param max_lag: seconds of backlog a stream keeps for catching up, as in Pacer, older backlog is dropped
+        :param report_interval: seconds between on_report calls, 0 disables
+        :param on_report: callable on_report(stats), stats as returned by stats()
+        """
+        if asyncio is None:
+            raise ImportError('asyncio (or trollius on Python 2) is required by AsyncSender')
+        self._sockets = sockets
+        self._tick = tick
+        self._max_lag = max_lag
+        self._report_interval = report_interval
+        self._on_report = on_report
+        self._streams = {}
+        self._pool = {}
+        self._loop = None
+        self._thread = None
+        self._done = None
+        self._assigned = 0
+        self.running = False
+
+    def add_stream(self, name, template, rate, host, port=514, transport='udp'):
+        """Add a device stream, streams added while running start on the next tick
+
+        :param name: stream name, unique within the engine
+        :param template: encoded msg, or callable template(stream) returning an encoded msg
+        :param rate: events per second
+        :param host: host server ip
+        :param port: host port, default is 514, SYSLOG port
+        :param transport: refer to Transport, default is udp
+        :return: Stream instance
+        """
+        assert name not in self._streams
+        stream = Stream(name, template, rate, host, port, transport)
+        self._streams[name] = stream
+        if self.running:
+            self._loop.call_soon_threadsafe(self._start_stream, stream)
+        return stream
+
+    def remove_stream(self, name):
+        """Remove a device stream
+
+        :param name: stream name
+        :return: removed Stream instance
+        """
+        return self._streams.pop(name)
+
+    def stats(self):
+        """Get live stats of all streams
+
+        :return: dict of stream name to stream stats dict
+        """
+        return dict((name, stream.stats()) for name, stream in list(self._streams.items()))
+
+    def totals(self):
+        """Get stats summed over all streams
+
+        :return: stats dict, keys: streams, sent, bytes, errors, dropped
+        """
+        streams = list(self._streams.values())
+        return {
+            'streams': len(streams),
+            'sent': sum(x.sent for x in streams),
+            'bytes': sum(x.bytes for x in streams),
+            'errors': sum(x.errors for x in streams),
+            'dropped': sum(x.dropped for x in streams),
+        }
+
+    def run(self, duration=None):
+        """Run all streams in the calling thread
+
+        :param duration: seconds to run, None runs until stop() is called
+        :return: final stats, see stats()
+        """
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._open_pool()
+            self._done = asyncio.Future()
+            self.running = True
+            for stream in list(self._streams.values()):
+                self._start_stream(stream)
+            if duration is not None:
+                self._loop.call_later(duration, self._finish)
+            if self._report_interval and self._on_report:
+                self._loop.call_later(self._report_interval, self._report)
+            self._loop.run_until_complete(self._done)
+        finally:
+            self.running = False
+            for conn in self._iter_pool():
+                if conn.transport is not None:
+                    conn.transport.close()
+            self._loop.run_until_complete(asyncio.sleep(0))
+            self._loop.close()
+        return self.stats()
+
+    def start(self, duration=None):
+        """Run all streams in a background thread, stats() stays usable from the caller
+
+        :param duration: seconds to run, None runs until stop() is called
+        :return: None
+        """
+        self._thread = threading.Thread(target=self.run, args=(duration,))
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """Stop all streams and wait for the background thread
+
+        :return: final stats, see stats()
+        """
+        if self.running:
+            self._loop.call_soon_threadsafe(self._finish)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        return self.stats()
+
+    def reconnect(self, conn):
+        task = asyncio.ensure_future(self._connect(conn))
+        task.add_done_callback(self._reconnect_done(conn))
+
+    def _reconnect_done(self, conn):
+        def callback(task):
+            if task.exception() is not None and self.running:
+                self._loop.call_later(1.0, self.reconnect, conn)
+        return callback
+
+    def _iter_pool(self):
+        for conns in self._pool.values():
+            for conn in conns:
+                yield conn
+
+    def _open_pool(self):
+        self._pool = {}
+        keys = set((x.transport, x.addr) for x in self._streams.values())
+        for transport_type, addr in keys:
+            self._pool[(transport_type, addr)] = []
+            for i in range(self._sockets):
+                conn = _Connection(self, transport_type, addr)
+                self._pool[(transport_type, addr)].append(conn)
+                self._loop.run_until_complete(self._connect(conn))
+
+    def _connect(self, conn):
+        if conn.transport_type == 'udp':
+            return self._loop.create_datagram_endpoint(lambda: conn, remote_addr=conn.addr)
+        return self._loop.create_connection(lambda: conn, conn.addr[0], conn.addr[1])
+
+    def _pick(self, stream):
+        conns = self._pool.get((stream.transport, stream.addr))
+        if conns is None:
+            conns = self._pool[(stream.transport, stream.addr)] = []
+            for i in range(self._sockets):
+                conn = _Connection(self, stream.transport, stream.addr)
+                conns.append(conn)
+                self.reconnect(conn)
+        self._assigned += 1
+        return conns[self._assigned % len(conns)]
+
+    def _start_stream(self, stream):
+        stream.started = time.time()
+        stream._conn = self._pick(stream)
+        stream._last = None
+        # spread the first wake up over one tick so streams do not fire together
+        self._loop.call_later(random.random() * self._tick, self._wake, stream)
+
+    def _wake(self, stream):
+        if not self.running or self._streams.get(stream.name) is not stream:
+            return
+        # the budget follows the loop clock, wake ups delayed by a busy loop are made up
+        now = self._loop.time()
+        if stream._last is not None:
+            stream._due += stream.rate * (now - stream._last)
+        else:
+            stream._due += stream.rate * self._tick
+        stream._last = now
+        count = int(stream._due)
+        conn = stream._conn
+        if count and conn.ready:
+            stream._due -= count
+            for i in range(count):
+                try:
+                    data = frame_msg(stream.render(), stream.transport)
+                    conn.write(data)
+                except Exception as ex:
+                    stream.errors += 1
+                    log.debug('stream %s send failed: %s', stream.name, ex)
+                    continue
+                stream.sent += 1
+                stream.bytes += len(data)
+        # never carry more than max_lag of backlog, e.g. while a tcp socket reconnects
+        limit = max(stream.rate * self._max_lag, 1.0)
+        if stream._due > limit:
+            stream.dropped += int(stream._due - limit)
+            stream._due = float(limit)
+        self._loop.call_later(self._tick, self._wake, stream)
+
+    def _report(self):
+        if not self.running:
+            return
+        try:
+            self._on_report(self.stats())
+        except Exception as ex:
+            log.warning('report callback failed: %s', ex)
+        self._loop.call_later(self._report_interval, self._report)
+
+    def _finish(self):
+        if self._done is not None and not self._done.done():
+            self._done.set_result(None)
+
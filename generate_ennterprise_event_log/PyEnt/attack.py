@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 
 import logging
@@ -297,18 +298,13 @@ class Attack(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all attacks
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        attack_list = self.list()
-        for attack in attack_list:
-            try:
-                self.delete(attack['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([attack['id'] for attack in self.list()])
 
     def upload_file(self, local_file):
         """Upload local file to attack database
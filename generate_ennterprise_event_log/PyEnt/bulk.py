@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.bulk
+~~~~~~~~~~~~~~
+This module provides the bulk executor: one resource call per item, run over a bounded thread pool.
+
+Bulk create, update, delete, start and stop used to issue one blocking request after the
+other. BulkExecutor runs the calls from a pool of worker threads sharing the resource
+session, whose connection pool is sized to the workers so every worker keeps its
+keep-alive connection instead of reconnecting. A failing item does not stop the others,
+its error is collected in the report and logged.
+"""
+
+import time
+from multiprocessing.pool import ThreadPool
+
+from requests.adapters import HTTPAdapter
+
+import logging
+log = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 8
+
+
+def share_connections(session, url, workers):
+    """Size the keep-alive connection pool of a session for concurrent workers
+
+    :param session: requests session shared by the workers
+    :param url: console url, the pool is mounted for it
+    :param workers: concurrent requests
+    :return: session
+    """
+    adapter = session.get_adapter(url)
+    if getattr(adapter, '_pool_maxsize', 0) < workers:
+        session.mount(url, HTTPAdapter(pool_connections=1, pool_maxsize=workers, pool_block=True))
+    return session
+
+
+class BulkExecutor(object):
+    def __init__(self, resource, workers=DEFAULT_WORKERS):
+        """BulkExecutor class init function
+
+        :param resource: PyEnt resource, e.g. PyEnt(...).get_resource('Asset')
+        :param workers: concurrent requests
+        """
+        assert workers > 0
+        self._resource = resource
+        self._workers = workers
+        if resource.session is not None:
+            share_connections(resource.session, resource._console_url, workers)
+
+    def map(self, func, items, name=None):
+        """Call func(item) for every item over the pool
+
+        :param func: callable taking one item, e.g. resource.delete
+        :param items: item list
+        :param name: call name used in logs, default is the func name
+        :return: report dict, keys: call, total, ok, failed, results (func results in item order, None for
+                 failed items), errors (index, item, type, error for every failed item), elapsed, rate
+        """
+        items = list(items)
+        name = name or getattr(func, '__name__', 'call')
+
+        def call(index):
+            try:
+                return index, True, func(items[index])
+            except Exception as ex:
+                return index, False, ex
+
+        results = [None] * len(items)
+        errors = []
+        starttime = time.time()
+        if items:
+            pool = ThreadPool(min(self._workers, len(items)))
+            try:
+                for index, ok, value in pool.imap_unordered(call, range(len(items))):
+                    if ok:
+                        results[index] = value
+                    else:
+                        log.warning('%s %s failed: %s', name, items[index], value)
+                        errors.append({'index': index, 'item': items[index], 'type': type(value).__name__,
+                                       'error': '%s' % value})
+            finally:
+                pool.close()
+                pool.join()
+        elapsed = time.time() - starttime
+        errors.sort(key=lambda x: x['index'])
+        return {
+            'call': name,
+            'total': len(items),
+            'ok': len(items) - len(errors),
+            'failed': len(errors),
+            'results': results,
+            'errors': errors,
+            'elapsed': elapsed,
+            'rate': len(items) / elapsed if elapsed else 0.0,
+        }
+
+    def create(self, items):
+        """Create resources
+
+        :param items: list of create kwargs dicts, refer to the resource create
+        :return: report dict, refer to map, results are the created ids
+        """
+        create = self._resource.create
+        return self.map(lambda item: create(**item), items, 'create')
+
+    def create_by_data(self, items):
+        """Create resources from full data
+
+        :param items: list of create data dicts
+        :return: report dict, refer to map, results are the created ids
+        """
+        return self.map(self._resource.create_by_data, items, 'create_by_data')
+
+    def update(self, items):
+        """Update resources
+
+        :param items: list of (id, kwargs dict) tuples, refer to the resource update
+        :return: report dict, refer to map
+        """
+        update = self._resource.update
+        return self.map(lambda item: update(item[0], **item[1]), items, 'update')
+
+    def delete(self, ids):
+        """Delete resources
+
+        :param ids: resource id list
+        :return: report dict, refer to map
+        """
+        return self.map(self._resource.delete, ids, 'delete')
+
+    def start(self, ids):
+        """Start resources, e.g. cep rules or datasources
+
+        :param ids: resource id list
+        :return: report dict, refer to map
+        """
+        return self.map(self._resource.start, ids, 'start')
+
+    def stop(self, ids):
+        """Stop resources
+
+        :param ids: resource id list
+        :return: report dict, refer to map
+        """
+        return self.map(self._resource.stop, ids, 'stop')
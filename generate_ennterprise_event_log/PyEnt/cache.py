@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.cache
+~~~~~~~~~~~~~~
+This module provides the metadata cache shared by the resources of one console session.
+
+get_by_name used to download the full list of a resource and scan it on every call.
+The cache keeps the list per resource with name -> record and id -> record indexes for
+ttl seconds; every resource built on the same session, including the ones resources
+build internally, shares it. create, update, delete and the other calls changing a
+resource drop its entry, so bulk operations do one list fetch per resource. Records are
+copied on the way out, callers are free to modify them. Loads run outside the cache lock,
+concurrent misses on the same entry wait for the one load in flight instead of repeating it.
+
+The same cache holds single values under a key, e.g. the getInitParams data that every
+event search used to fetch again for its field lookup; cached() serves them.
+"""
+
+import copy
+import threading
+import time
+import weakref
+
+import logging
+log = logging.getLogger(__name__)
+
+# seconds a resource list is reused, 0 disables the cache
+DEFAULT_TTL = 60
+
+
+class MetadataCache(object):
+    def __init__(self, ttl=DEFAULT_TTL):
+        """MetadataCache class init function
+
+        :param ttl: seconds a resource list is reused, 0 disables the cache
+        """
+        self.ttl = ttl
+        self._lock = threading.RLock()
+        self._entries = {}
+        self._values = {}
+        # (store, key) -> threading.Event set when the load in flight ends
+        self._loading = {}
+        # bumped by invalidate, a load that raced with it is returned but not cached
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self, store, key, valid, loader):
+        # store[key] is (expires, ...) as built by loader, valid(entry) tells if it can be used
+        flight_key = (id(store), key)
+        while True:
+            with self._lock:
+                entry = store.get(key)
+                if entry is not None and time.time() < entry[0] and valid(entry):
+                    self.hits += 1
+                    return entry
+                flight = self._loading.get(flight_key)
+                if flight is None:
+                    flight = self._loading[flight_key] = threading.Event()
+                    generation = self._generation
+                    self.misses += 1
+                    break
+            # another thread loads it, use its result, or load here if it failed
+            flight.wait()
+        try:
+            entry = loader()
+            with self._lock:
+                if self.ttl > 0 and generation == self._generation:
+                    store[key] = entry
+            return entry
+        finally:
+            with self._lock:
+                del self._loading[flight_key]
+            flight.set()
+
+    def index(self, resource, loader, name_key):
+        """Get the indexes of a resource, loaded when missing or expired
+
+        :param resource: resource name, e.g. EventParser
+        :param loader: callable returning the record list, e.g. EventParser.list
+        :param name_key: record key holding the name, e.g. parserName
+        :return: tuple of name -> record and id -> record dicts, the first record wins on duplicate names
+        """
+        def load():
+            records = loader()
+            by_name = {}
+            by_id = {}
+            for record in records:
+                by_name.setdefault(record.get(name_key), record)
+                by_id.setdefault(record.get('id'), record)
+            log.debug('%s: %d records loaded', resource, len(records))
+            return time.time() + self.ttl, name_key, by_name, by_id
+
+        if self.ttl <= 0:
+            with self._lock:
+                self.misses += 1
+            return load()[2:]
+        return self._load(self._entries, resource, lambda entry: entry[1] == name_key, load)[2:]
+
+    def value(self, key, loader):
+        """Get a single cached value, loaded when missing or expired
+
+        :param key: value name, e.g. EventInitParams
+        :param loader: callable returning the value
+        :return: the cached value itself, shared, callers must not modify it
+        """
+        if self.ttl <= 0:
+            with self._lock:
+                self.misses += 1
+            return loader()
+        return self._load(self._values, key, lambda entry: True, lambda: (time.time() + self.ttl, loader()))[1]
+
+    def get_by_name(self, resource, loader, name_key, name):
+        """Get a record by name, a name not found is looked up once more in a fresh list
+
+        :param resource: resource name
+        :param loader: callable returning the record list
+        :param name_key: record key holding the name
+        :param name: record name
+        :return: copy of the record, IndexError if there is none
+        """
+        return self._get(resource, loader, name_key, 0, name)
+
+    def get_by_id(self, resource, loader, name_key, id):
+        """Get a record by id, an id not found is looked up once more in a fresh list
+
+        :param resource: resource name
+        :param loader: callable returning the record list
+        :param name_key: record key holding the name
+        :param id: record id
+        :return: copy of the record, IndexError if there is none
+        """
+        return self._get(resource, loader, name_key, 1, id)
+
+    def _get(self, resource, loader, name_key, which, key):
+        record = self.index(resource, loader, name_key)[which].get(key)
+        if record is None and self.ttl > 0:
+            # created since the list was loaded, e.g. by another client
+            self.invalidate(resource)
+            record = self.index(resource, loader, name_key)[which].get(key)
+        if record is None:
+            raise IndexError('%s %s not found' % (resource, key))
+        return copy.deepcopy(record)
+
+    def invalidate(self, *resources):
+        """Drop cached resources and values
+
+        :param resources: resource or value names, none drops everything
+        :return: None
+        """
+        with self._lock:
+            self._generation += 1
+            if not resources:
+                self._entries.clear()
+                self._values.clear()
+            for resource in resources:
+                self._entries.pop(resource, None)
+                self._values.pop(resource, None)
+
+    def stats(self):
+        """Get cache counters
+
+        :return: dict, keys: ttl, hits, misses, resources
+        """
+        with self._lock:
+            return {'ttl': self.ttl, 'hits': self.hits, 'misses': self.misses,
+                    'resources': sorted(set(self._entries) | set(self._values))}
+
+
+_caches = weakref.WeakKeyDictionary()
+_caches_lock = threading.Lock()
+
+
+def for_session(session, ttl=None):
+    """Get the metadata cache of a console session, created on first use
+
+    :param session: requests session, e.g. from session.login
+    :param ttl: set the cache ttl, default keeps it, DEFAULT_TTL for a new cache
+    :return: MetadataCache, None for a None session
+    """
+    if session is None:
+        return None
+    with _caches_lock:
+        cache = _caches.get(session)
+        if cache is None:
+            cache = _caches[session] = MetadataCache(DEFAULT_TTL if ttl is None else ttl)
+        elif ttl is not None:
+            cache.ttl = ttl
+    return cache
+
+
+def lookup(session, resource, loader, name_key, name):
+    """Get a resource record by name through the session cache
+
+    :param session: resource session
+    :param resource: resource name, e.g. EventParser
+    :param loader: callable returning the record list, e.g. self.list
+    :param name_key: record key holding the name
+    :param name: record name
+    :return: record dict, IndexError if there is none
+    """
+    cache = for_session(session)
+    if cache is None:
+        return [x for x in loader() if x[name_key] == name][0]
+    return cache.get_by_name(resource, loader, name_key, name)
+
+
+def cached(session, key, loader, refresh=False):
+    """Get a value through the session cache
+
+    :param session: resource session
+    :param key: value name, e.g. EventInitParams
+    :param loader: callable returning the value
+    :param refresh: reload it even if cached
+    :return: value, shared with other callers, do not modify it
+    """
+    cache = for_session(session)
+    if cache is None:
+        return loader()
+    if refresh:
+        cache.invalidate(key)
+    return cache.value(key, loader)
+
+
+def invalidate(session, *resources):
+    """Drop resources from the session cache, called by the resource methods changing them
+
+    :param session: resource session
+    :param resources: resource names
+    :return: None
+    """
+    cache = _caches.get(session) if session is not None else None
+    if cache is not None:
+        cache.invalidate(*resources)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.ceplatency
+~~~~~~~~~~~~~~
+This module provides the CEP alarm latency harness: time from the triggering events to the alarm.
+
+For every enabled CepRule a triggering sequence is sent through a Sender, sized from
+the rule template: one event for plain rules, threshold + 1 for having rules, one per
+event of follow-by rules. Triggers are spread over time, one rule every spacing seconds,
+and Alarm.list is polled until a new or updated alarm names the rule. Latency runs from
+the last trigger msg sent to the poll that found the alarm, on the client clock.
+
+The default trigger is the WAF sample, it can only fire rules without event filter or
+where condition; other rules, and having rules whose threshold is not known, are
+reported as skipped unless a custom trigger is given for them.
+"""
+
+import json
+import re
+import time
+from datetime import datetime
+
+from .fieldgen import FieldGenerator
+from .latency import LatencyProbe, PROBE_SAMPLE, estimate_clock_offset
+from .sequence import _strings
+from .template import Template
+
+import logging
+log = logging.getLogger(__name__)
+
+# templateId of rules counting events with having, and of multi event (follow-by, repeat-until) rules
+HAVING_TEMPLATES = (1, 5, 6)
+SEQUENCE_TEMPLATES = (3, 4)
+
+_trigger_template = Template(PROBE_SAMPLE, {
+    'dst_ip': r'dst_ip:((?:\d{1,3}\.){3}\d{1,3})',
+    'src_ip': r'src_ip:((?:\d{1,3}\.){3}\d{1,3})',
+    'stat_time': r'stat_time:(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{1,2}:\d{1,2})',
+})
+
+
+def threshold_key(epl):
+    """Find the having key compared with the event count in a cep template
+
+    :param epl: template having eplTpl, e.g. 'having count(*) >= n2'
+    :return: having key, e.g. n2, None if the template compares no count
+    """
+    match = re.search(r'count\s*\([^)]*\)\s*[<>=!]+\W*(n\d)\b', epl or '', re.I)
+    return match.group(1) if match else None
+
+
+def trigger_count(rule, key=None):
+    """Get the events needed to fire a rule
+
+    :param rule: cep rule dict, refer to CepRule.list
+    :param key: having key holding the count threshold, refer to threshold_key
+    :return: event count, threshold + 1 for having rules, event count for follow-by rules, else 1;
+             None for a having rule without key or with a non numeric threshold
+    """
+    template_id = rule.get('templateId')
+    if template_id in HAVING_TEMPLATES:
+        having = rule.get('having') or {}
+        if not key or not isinstance(having, dict):
+            return None
+        match = re.match(r'\s*(\d+)\s*$', '%s' % having.get(key, ''))
+        return int(match.group(1)) + 1 if match else None
+    if template_id in SEQUENCE_TEMPLATES:
+        return max(1, len(rule.get('events') or []))
+    return 1
+
+
+def sample_can_fire(rule):
+    """Check a rule fires on any event, e.g. the WAF sample, whatever its fields
+
+    :param rule: cep rule dict
+    :return: True if no event of the rule has a filter and there is no where condition
+    """
+    if rule.get('where'):
+        return False
+    return not any(event.get('filter') for event in rule.get('events') or [])
+
+
+def _alarm_key(alarm):
+    return alarm.get('id') or alarm.get('alarmKey') or json.dumps(alarm, sort_keys=True)
+
+
+class AlarmLatencyHarness(object):
+    def __init__(self, cep_rule, alarm, sender, triggers=None, spacing=5.0, poll_interval=2.0, timeout=300,
+                 window=300, seed=None, cep_template=None, threshold_keys=None):
+        """AlarmLatencyHarness class init function
+
+        Alarm.list logs its request at debug level, keep PyEnt.alarm above it for quiet runs.
+
+        :param cep_rule: CepRule resource, e.g. PyEnt(...).get_resource('CepRule')
+        :param alarm: Alarm resource
+        :param sender: Sender to the collector
+        :param triggers: dict of rule name to a callable trigger(rule, log_time, src_ip) returning the list of
+                         encoded msgs firing it, rules missing here get trigger_count(rule) WAF events
+                         sharing one fresh src_ip if sample_can_fire(rule), else they are skipped
+        :param cep_template: CepTemplate resource, the having threshold key of a rule is read from its
+                             template, refer to threshold_key
+        :param spacing: seconds between two rule triggers
+        :param poll_interval: seconds between Alarm.list polls
+        :param timeout: seconds after which a rule without alarm counts as missed
+        :param window: seconds of slack before the oldest pending trigger in the poll window
+        :param seed: src ip RNG seed
+        :param threshold_keys: dict of templateId to having key, overrides the templates
+        """
+        self._cep_rule = cep_rule
+        self._alarm = alarm
+        self._sender = sender
+        self._triggers = triggers or {}
+        self._spacing = spacing
+        self._poll_interval = poll_interval
+        self._timeout = timeout
+        self._window = window
+        self._fields = FieldGenerator(seed)
+        self._cep_template = cep_template
+        self._threshold_keys = dict(threshold_keys or {})
+        self.offset = 0.0
+
+    def enabled_rules(self):
+        """Get enabled cep rules
+
+        :return: cep rule list
+        """
+        return [rule for rule in self._cep_rule.list() if rule.get('status') == 1]
+
+    def threshold_key(self, rule):
+        """Get the having key holding the count threshold of a rule
+
+        :param rule: cep rule dict
+        :return: having key, None if unknown
+        """
+        template_id = rule.get('templateId')
+        if template_id not in self._threshold_keys and self._cep_template is not None:
+            key = None
+            for template in self._cep_template.list():
+                if template.get('id') == template_id or template.get('templateId') == template_id:
+                    key = threshold_key((template.get('having') or {}).get('eplTpl'))
+                    break
+            self._threshold_keys[template_id] = key
+        return self._threshold_keys.get(template_id)
+
+    def skip_reason(self, rule):
+        """Check the default trigger can fire a rule
+
+        :param rule: cep rule dict
+        :return: None if it can, or why the rule is skipped
+        """
+        if rule['name'] in self._triggers:
+            return None
+        if not sample_can_fire(rule):
+            return 'event filter or where condition the sample may not match'
+        if trigger_count(rule, self.threshold_key(rule)) is None:
+            return 'having threshold unknown'
+        return None
+
+    def trigger(self, rule, log_time, src_ip):
+        """Build the triggering msgs of a rule
+
+        :param rule: cep rule dict
+        :param log_time: server time struct for the log time
+        :param src_ip: encoded src ip shared by the sequence
+        :return: list of encoded msgs
+        """
+        custom = self._triggers.get(rule['name'])
+        if custom is not None:
+            return custom(rule, log_time, src_ip)
+        stat_time = time.strftime('%Y-%m-%d %H:%M:%S', log_time).encode('ascii')
+        dst_ips = self._fields.internet_ips(1)
+        return [_trigger_template.render({'src_ip': src_ip, 'dst_ip': dst_ips[0], 'stat_time': stat_time})
+                for i in range(trigger_count(rule, self.threshold_key(rule)))]
+
+    def run(self, rules=None, sync=True):
+        """Trigger every rule and wait for its alarm
+
+        :param rules: cep rule dicts, default is every enabled rule
+        :param sync: estimate the server clock offset first, default is True
+        :return: report dict, keys: rules (name, id, templateId, events, src_ip, latency or None when missed,
+                 skipped, the reason a rule was not triggered or None), fired, missed, skipped, offset and
+                 latency (count, mean, p50, p95, p99, max in seconds)
+        """
+        if rules is None:
+            rules = self.enabled_rules()
+        results = []
+        queue = []
+        for rule in rules:
+            reason = self.skip_reason(rule)
+            if reason is None:
+                queue.append(rule)
+                continue
+            log.info('%s skipped: %s', rule['name'], reason)
+            results.append({'name': rule['name'], 'id': rule.get('id'), 'templateId': rule.get('templateId'),
+                            'events': 0, 'src_ip': None, 'latency': None, 'skipped': reason})
+        if sync:
+            offset, error = estimate_clock_offset(self._alarm.session, self._alarm._console_url)
+            self.offset = offset or 0.0
+
+        # alarms already there are ignored unless they change
+        now = time.time()
+        baseline = self._list_alarms(now - self._window, now)
+        pending = {}
+        next_trigger = time.time()
+        next_poll = next_trigger + self._poll_interval
+        while queue or pending:
+            now = time.time()
+            if queue and now >= next_trigger:
+                rule = queue.pop(0)
+                src_ip = self._fields.internet_ips(1)[0]
+                msgs = self.trigger(rule, time.localtime(now + self.offset), src_ip)
+                for msg in msgs:
+                    self._sender.send_string(msg)
+                result = {'name': rule['name'], 'id': rule.get('id'), 'templateId': rule.get('templateId'),
+                          'events': len(msgs), 'src_ip': src_ip.decode('ascii'), 'latency': None, 'skipped': None}
+                results.append(result)
+                pending[rule['name']] = (time.time(), result)
+                next_trigger += self._spacing
+            if pending and now >= next_poll:
+                self._poll(pending, baseline)
+                next_poll = time.time() + self._poll_interval
+            waits = [next_poll] if pending else []
+            if queue:
+                waits.append(next_trigger)
+            if waits:
+                time.sleep(max(0.0, min(waits) - time.time()))
+
+        latencies = sorted(x['latency'] for x in results if x['latency'] is not None)
+        skipped = len([x for x in results if x['skipped']])
+        return {
+            'rules': results,
+            'fired': len(latencies),
+            'missed': len(results) - skipped - len(latencies),
+            'skipped': skipped,
+            'offset': self.offset,
+            'poll_interval': self._poll_interval,
+            'latency': LatencyProbe.summarize(latencies),
+        }
+
+    def _list_alarms(self, start, end):
+        alarms = self._alarm.list(datetime.fromtimestamp(int(start + self.offset)),
+                                  datetime.fromtimestamp(int(end + self.offset) + 2))
+        return dict((_alarm_key(x), json.dumps(x, sort_keys=True)) for x in alarms)
+
+    def _poll(self, pending, baseline):
+        now = time.time()
+        start = min(sent_at for sent_at, result in pending.values()) - self._window
+        alarms = self._alarm.list(datetime.fromtimestamp(int(start + self.offset)),
+                                  datetime.fromtimestamp(int(now + self.offset) + 2))
+        seen = time.time()
+        for alarm in alarms:
+            key = _alarm_key(alarm)
+            state = json.dumps(alarm, sort_keys=True)
+            if baseline.get(key) == state:
+                continue
+            baseline[key] = state
+            names = set(_strings(alarm))
+            for name in list(pending):
+                if name.encode('utf-8') in names:
+                    sent_at, result = pending.pop(name)
+                    result['latency'] = seen - sent_at
+                    log.info('%s alarm after %.1fs', name, result['latency'])
+        for name, (sent_at, result) in list(pending.items()):
+            if seen - sent_at > self._timeout:
+                log.warning('%s no alarm after %ds', name, self._timeout)
+                del pending[name]
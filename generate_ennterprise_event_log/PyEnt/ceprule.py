@@ -6,6 +6,9 @@ import re
 from ._internal_utils import status_code_check, response_status_check, AlarmInfo
 from .ceptemplate import CepTemplate
 from .contexts import Contexts
+from .event import Event
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -57,8 +60,7 @@ class CEPRuleType(object):
         :param name:  cep rule type name
         :return: cep rule type info dict, better to improve response format, add statusCode and message
         """
-        rule_type_list = self.list()
-        return [rule_type for rule_type in rule_type_list if rule_type['name'] == name][0]
+        return lookup(self._session, 'CEPRuleType', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create cep rule type by data
@@ -69,6 +71,7 @@ class CEPRuleType(object):
         uri = self._console_url + '/api/cep/rule-types'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'CEPRuleType')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 201)
         # response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -112,6 +115,7 @@ class CEPRuleType(object):
             if name:
                 update_data['name'] = name
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'CEPRuleType')
         # response_content = json.loads(response.content)
         status_code_check(response.status_code, 204)
         # response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -125,19 +129,16 @@ class CEPRuleType(object):
 
         uri = self._console_url + '/api/cep/rule-types/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'CEPRuleType')
         status_code_check(response.status_code, 204)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all cep rule types
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-        rule_type_list = self.list()
-        for rule_type in rule_type_list:
-            try:
-                self.delete(rule_type['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([rule_type['id'] for rule_type in self.list()])
 
 
 class CepRule(object):
@@ -154,17 +155,13 @@ class CepRule(object):
     def session(self, value):
         self._session = value
 
-    def init_event_param(self):
-        """Get cep event param info
+    def init_event_param(self, refresh=False):
+        """Get cep event param info, shared with Event.init_param
         
+        :param refresh: reload them from the server
         :return: cep event params, used to create or update cep rule
         """
-        uri = self._console_url + "/event/search/getInitParams"
-        response = self._session.get(uri)
-        status_code_check(response.status_code, 200)
-        response_content = json.loads(response.content)
-        response_status_check(response_content['statusCode'], 0, response_content['messages'])
-        return response_content['data']
+        return Event(self._console_url, self._session).init_param(refresh)
 
     def get_event_list(self):
         """Get cep event list info, include global event/inner event and parse event, context is exclude
@@ -250,8 +247,7 @@ class CepRule(object):
         :param name: cep rule name
         :return: 
         """
-        rule_list = self.list()
-        return [rule for rule in rule_list if rule['name'] == name][0]
+        return lookup(self._session, 'CepRule', self.list, 'name', name)
 
     def check_alarm_content_output(self):
         cep_rule_list = self.list()
@@ -469,6 +465,7 @@ class CepRule(object):
         uri = self._console_url + '/api/cep/rules'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'CepRule')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 201)
         # response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -633,6 +630,7 @@ class CepRule(object):
         """
         uri = self._console_url + "/api/cep/rules/" + str(id)
         response = self._session.delete(uri)
+        invalidate(self._session, 'CepRule')
         status_code_check(response.status_code, 204)
 
     def update(self, id, data=None, **kwargs):
@@ -662,6 +660,7 @@ class CepRule(object):
                 update_data['alert'] = alert
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'CepRule')
         #response_content = json.loads(response.content)
         status_code_check(response.status_code, 204, 200)
         #response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -675,19 +674,16 @@ class CepRule(object):
         uri = self._console_url + "/api/cep/rules/" + str(id)
         data = {'status': 1}
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'CepRule')
         status_code_check(response.status_code, 200)
 
-    def start_all(self):
+    def start_all(self, workers=DEFAULT_WORKERS):
         """Start all cep rules
-        
-        :return: None
+
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-        cep_rule_list = self.list()
-        for cep_rule in cep_rule_list:
-            try:
-                self.start(cep_rule['id'])
-            except:
-                pass
+        return BulkExecutor(self, workers).start([cep_rule['id'] for cep_rule in self.list()])
 
     def stop(self, id):
         """Stop cep rule
@@ -698,19 +694,16 @@ class CepRule(object):
         uri = self._console_url + "/api/cep/rules/" + str(id)
         data = {'status': 0}
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'CepRule')
         status_code_check(response.status_code, 200)
 
-    def stop_all(self):
+    def stop_all(self, workers=DEFAULT_WORKERS):
         """Stop all cep rules
-        
-        :return: None
+
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-        cep_rule_list = self.list()
-        for cep_rule in cep_rule_list:
-            try:
-                self.stop(cep_rule['id'])
-            except:
-                pass
+        return BulkExecutor(self, workers).stop([cep_rule['id'] for cep_rule in self.list()])
 
     def import_rule(self, localfile, strategy='skip'):
         """Import cep rule
@@ -737,6 +730,7 @@ class CepRule(object):
             uri = uri + '?strategy=' + strategy
             #print uri
         response = self._session.post(uri, json=response_content)
+        invalidate(self._session, 'CepRule')
         status_code_check(response.status_code, 200)
         return uri
 
@@ -4,6 +4,8 @@ import json
 
 from ._internal_utils import status_code_check, response_status_check
 from ._internal_utils import TemplateType, PatternOpType
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -55,8 +57,7 @@ class CepTemplate(object):
         :param name:  cep template type name
         :return: cep rule template info dict
         """
-        rule_temp_list = self.list()
-        return [rule_temp for rule_temp in rule_temp_list if rule_temp['name'] == name][0]
+        return lookup(self._session, 'CepTemplate', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create cep rule template by data
@@ -67,6 +68,7 @@ class CepTemplate(object):
         uri = self._console_url + '/api/cep/templates'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'CepTemplate')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 201)
         # response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -219,6 +221,7 @@ class CepTemplate(object):
             update_data['having'] = having
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'CepTemplate')
         #response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         # response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -231,19 +234,16 @@ class CepTemplate(object):
         """
         uri = self._console_url + '/api/cep/templates/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'CepTemplate')
         status_code_check(response.status_code, 204)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all cep rule templates
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-        rule_type_list = self.list()
-        for rule_type in rule_type_list:
-            try:
-                self.delete(rule_type['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([rule_type['id'] for rule_type in self.list()])
 
     def import_tpls(self, localfile):
         """Import template
@@ -256,6 +256,7 @@ class CepTemplate(object):
         with open(localfile) as pf:
             content = pf.read()
         response = self._session.post(uri, data=content)
+        invalidate(self._session, 'CepTemplate')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         if response_content:
@@ -6,6 +6,8 @@ from ._internal_utils import status_code_check, response_status_check
 from ._internal_utils import CollectorType, Charset
 
 from .eventparser import EventParser
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -64,8 +66,7 @@ class Collector(object):
         :return: collector info dict
         """
 
-        collector_list = self.list()
-        return [collector for collector in collector_list if collector['collectorName'] == name][0]
+        return lookup(self._session, 'Collector', self.list, 'collectorName', name)
 
     def create_by_data(self, data):
         """Create a collector by data
@@ -76,6 +77,7 @@ class Collector(object):
 
         uri = self._console_url + "/system/event/collector"
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'Collector')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -129,21 +131,18 @@ class Collector(object):
 
         uri = self._console_url + "/system/event/collector/" + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'Collector')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all collectors
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        for collector in self.list():
-            try:
-                self.delete(collector['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([collector['id'] for collector in self.list()])
 
     def update(self, id, data=None, **kwargs):
         """Update collector info
@@ -180,6 +179,7 @@ class Collector(object):
                     update_data['parseRules'].append(_event_parser.get(parser_rule))
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'Collector')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
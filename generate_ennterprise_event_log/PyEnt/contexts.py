@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 
@@ -88,15 +89,10 @@ class Contexts(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 204)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all contexts
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        context_list = self.list()
-        for context in context_list:
-            try:
-                self.delete(context['id'])
-            except Exception as ex:
-                pass
\ No newline at end of file
+        return BulkExecutor(self, workers).delete([context['id'] for context in self.list()])
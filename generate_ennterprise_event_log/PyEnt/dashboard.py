@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check, convert_date_time, EntityType, ShareType
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 from datetime import datetime, date, timedelta
 import logging
 
@@ -263,18 +264,13 @@ class Dashboard(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all assets
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        dashboard_list = self.list()
-        for dashboard in dashboard_list:
-            try:
-                self.delete(dashboard['id'])
-            except Exception as ex:
-                print ex
+        return BulkExecutor(self, workers).delete([dashboard['id'] for dashboard in self.list()])
 
     def get_share_type(self, id):
         """Get share type for dashboard
@@ -3,8 +3,11 @@
 import json
 import codecs
 import re
+import time
 from .assettype import AssetType
 from ._internal_utils import status_code_check, response_status_check
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 
@@ -103,8 +106,7 @@ class DVParser(object):
         :param name: parser name
         :return: parser info dict
         """
-        parsers = self.list()
-        return [parser for parser in parsers if parser['name'] == name][0]
+        return lookup(self._session, 'DVParser', self.list, 'name', name)
 
     def preview(self, data):
         """Preview for dv, get properties attr
@@ -130,6 +132,7 @@ class DVParser(object):
         uri = self._console_url + '/dv/resolver'
         header = {'Content-Encoding': 'UTF-8'}
         response = self._session.post(uri, json=data, headers=header)
+        invalidate(self._session, 'DVParser')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -184,6 +187,7 @@ class DVParser(object):
         header = {'Content-Encoding': 'UTF-8'}
 
         response = self._session.delete(uri, headers=header)
+        invalidate(self._session, 'DVParser')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -197,17 +201,13 @@ class DVParser(object):
         parser_id = self.get_by_name(name)['id']
         self.delete(parser_id)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all parsers
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        for parser in self.list():
-            try:
-                self.delete(parser['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([parser['id'] for parser in self.list()])
 
     def update(self, id, data=None, **kwargs):
         """Update parser
@@ -229,6 +229,7 @@ class DVParser(object):
                 # other kwargs handler
 
         response = self._session.post(uri, json=update_data, headers=header)
+        invalidate(self._session, 'DVParser')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -280,8 +281,7 @@ class DVSource(object):
         :param name: datasource name
         :return: None
         """
-        parsers = self.list()
-        return [parser for parser in parsers if parser['name'] == name][0]
+        return lookup(self._session, 'DVSource', self.list, 'name', name)
 
     def create(self, name=None, collector=None, resolver=None, source_data=None, data=None, **kwargs):
         """Create datasource
@@ -339,6 +339,7 @@ class DVSource(object):
         uri = self._console_url + '/dv/datasource'
         header = {'Content-Encoding': 'UTF-8'}
         response = self._session.post(uri, json=data, headers=header)
+        invalidate(self._session, 'DVSource')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -388,6 +389,7 @@ class DVSource(object):
         header = {'Content-Encoding': 'UTF-8'}
 
         response = self._session.put(uri, json=payload, headers=header)
+        invalidate(self._session, 'DVSource')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -419,6 +421,7 @@ class DVSource(object):
         header = {'Content-Encoding': 'UTF-8'}
 
         response = self._session.put(uri, json=payload, headers=header)
+        invalidate(self._session, 'DVSource')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -442,6 +445,7 @@ class DVSource(object):
         header = {'Content-Encoding': 'UTF-8'}
 
         response = self._session.delete(uri, headers=header)
+        invalidate(self._session, 'DVSource')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
@@ -455,32 +459,27 @@ class DVSource(object):
         source_id = self.get_by_name(name)['id']
         self.delete(source_id)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all datasources
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
+        return BulkExecutor(self, workers).delete([ds['id'] for ds in self.list()])
 
-        for ds in self.list():
-            try:
-                self.delete(ds['id'])
-            except Exception as ex:
-                pass
+    def stop_delete_all(self, workers=DEFAULT_WORKERS):
+        """Stop and delete all datasources, datasources are handled in parallel
 
-    def stop_delete_all(self):
-        """Stop and delete all datasources
-        
-        :return: None
+        :param workers: concurrent datasources
+        :return: bulk report, refer to BulkExecutor.map
         """
-        import time
-        for ds in self.list():
-            try:
-                self.stop(ds['id'])
-                time.sleep(5)
-                self.delete(ds['id'])
-                time.sleep(5)
-            except Exception as ex:
-                pass
+        def stop_delete(id):
+            self.stop(id)
+            time.sleep(5)
+            self.delete(id)
+            time.sleep(5)
+
+        return BulkExecutor(self, workers).map(stop_delete, [ds['id'] for ds in self.list()])
 
     def update(self, id, data=None, **kwargs):
         """Update datasource
@@ -502,6 +501,7 @@ class DVSource(object):
                 # other kwargs handler
 
         response = self._session.post(uri, json=update_data, headers=header)
+        invalidate(self._session, 'DVSource')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['status'], '200', response_content['message'])
\ No newline at end of file
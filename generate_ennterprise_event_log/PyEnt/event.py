@@ -1,14 +1,26 @@
 # -*- coding: utf-8 -*-
 
+import copy
 import json
+import threading
+
+try:
+    from Queue import Queue, Full
+except ImportError:
+    from queue import Queue, Full
 
 from ._internal_utils import status_code_check, response_status_check, convert_date_time
+from .cache import cached, invalidate
+from .sequence import SequenceCheck, DEFAULT_FIELD
 
 from datetime import datetime, date, timedelta
 import logging
 
 log = logging.getLogger(__name__)
 
+# rows returned by one event query, list() reads the first page only, iter_list() all of them
+PAGE_SIZE = 1000
+
 
 class Event(object):
     def __init__(self, console_url, session=None):
@@ -23,22 +35,32 @@ class Event(object):
     def session(self, value):
         self._session = value
 
-    def init_param(self):
-        uri = self._console_url + '/event/search/getInitParams'
+    def init_param(self, refresh=False):
+        """Get event search init params, cached per session with the metadata cache ttl
 
-        response = self._session.get(uri)
-        response_content = json.loads(response.content)
+        :param refresh: reload them from the server
+        :return: init params dict, keys: scene, eventAttrsMap, ...
+        """
+        return copy.deepcopy(self._init_param(refresh))
 
-        status_code_check(response.status_code, 200)
-        response_status_check(response_content['statusCode'], 0, response_content['messages'])
+    def _init_param(self, refresh=False):
+        def load():
+            uri = self._console_url + '/event/search/getInitParams'
 
-        return response_content['data']
+            response = self._session.get(uri)
+            response_content = json.loads(response.content)
+
+            status_code_check(response.status_code, 200)
+            response_status_check(response_content['statusCode'], 0, response_content['messages'])
+
+            return response_content['data']
+        return cached(self._session, 'EventInitParams', load, refresh)
 
     def get_col_show_list(self):
-        return self.init_param()['scene']['colShowList']
+        return copy.deepcopy(self._init_param()['scene']['colShowList'])
 
     def get_col_show_string(self):
-        return self.init_param()['scene']['colShow']
+        return self._init_param()['scene']['colShow']
 
     def set_col_show(self, fields):
         _col_list = []
@@ -50,6 +72,7 @@ class Event(object):
             'colShows': _col_list,
         }
         response = self._session.post(uri, json=payload)
+        invalidate(self._session, 'EventInitParams')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -61,7 +84,7 @@ class Event(object):
         :param name: attribute name, specially handled for event_content and original_log
         :return: event field dict
         """
-        attr_list = self.init_param()['eventAttrsMap']['attrDatasMap']
+        attr_list = self._init_param()['eventAttrsMap']['attrDatasMap']
         field_list = []
         for attr in attr_list.values():
             try:
@@ -112,8 +135,91 @@ class Event(object):
         :param end_time: query end time
         :param fields: query fields
         :param kwargs: other optional args
-        :return: event list
+        :return: event list, the first PAGE_SIZE events only, iter_list pages through all of them
+        """
+        payload = self._query_payload(start_time, end_time, fields, filter_expression)
+        return self._query_page(payload, 1, PAGE_SIZE)['list']
+
+    def iter_list(self, start_time=date.today(), end_time=date.today()+timedelta(days=1),
+                  fields=[u'发生时间',u'事件名称',u'事件级别',u'事件分类',u'源地址',u'目的地址',u'事件内容',u'原始日志'],
+                  filter_expression=None, page_size=PAGE_SIZE, prefetch=True):
+        """Iterate over all events of a query, page by page
+
+        Pages are fetched lazily. With prefetch the next page is fetched by a background
+        thread while the caller works on the current one, at most three pages are held.
+        The session is shared with that thread, do not use it elsewhere meanwhile.
+
+        :param start_time: query start time
+        :param end_time: query end time
+        :param fields: query fields
+        :param filter_expression: optional query filter
+        :param page_size: events per request
+        :param prefetch: fetch the next page ahead, default is True
+        :return: event generator
         """
+        payload = self._query_payload(start_time, end_time, fields, filter_expression)
+        return self._iter_pages(payload, page_size, prefetch)
+
+    def _iter_pages(self, payload, page_size, prefetch):
+        if not prefetch:
+            for rows in self._pages(payload, page_size):
+                for row in rows:
+                    yield row
+            return
+
+        pages = Queue(maxsize=1)
+        stop = threading.Event()
+
+        def put(item):
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return True
+                except Full:
+                    continue
+            return False
+
+        def fetch():
+            try:
+                for rows in self._pages(payload, page_size):
+                    if not put(rows):
+                        return
+            except Exception as ex:
+                put(ex)
+                return
+            put(None)
+
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+        try:
+            while True:
+                rows = pages.get()
+                if rows is None:
+                    return
+                if isinstance(rows, Exception):
+                    raise rows
+                for row in rows:
+                    yield row
+        finally:
+            stop.set()
+            thread.join()
+
+    def _pages(self, payload, page_size):
+        page = 1
+        fetched = 0
+        while True:
+            data = self._query_page(payload, page, page_size)
+            rows = data['list']
+            if rows:
+                yield rows
+            fetched += len(rows)
+            total = data.get('total')
+            if len(rows) < page_size or (total is not None and fetched >= total):
+                return
+            page += 1
+
+    def _query_payload(self, start_time, end_time, fields, filter_expression):
         assert fields
         _col_list = self._create_event_field_by_name(fields)
         # _event_attr = EventAttribute(self._console_url,self._session)
@@ -126,8 +232,6 @@ class Event(object):
             end_time = datetime.strptime(end_time, '%Y-%m-%d')
 
         payload = {
-            'page': 1,
-            'pageSize': 1000,
             'scene': {
                 'startTime': convert_date_time(start_time),
                 'endTime': convert_date_time(end_time),
@@ -136,13 +240,17 @@ class Event(object):
         }
         if filter_expression:
             payload['scene']['filters'] = dict(FilterExpression = filter_expression)
+        return payload
+
+    def _query_page(self, payload, page, page_size):
+        payload = dict(payload, page=page, pageSize=page_size)
         uri = self._console_url + '/event/search/event/query'
         response = self._session.post(uri, json=payload)
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
-        return response_content['data']['list']
+        return response_content['data']
 
     def get(self, id):
         """Get event by id
@@ -182,4 +290,37 @@ class Event(object):
                     if real_val != value:
                         object_valid = False
             if object_valid:
-                yield event
\ No newline at end of file
+                yield event
+
+    def check_run(self, run_id, start_time, end_time, field=DEFAULT_FIELD, slice_seconds=60, sent=None,
+                  fields=[u'发生时间', u'原始日志'], filter_expression=None, first_seq=0, ranges=100):
+        """Check a sequence tagged run for lost and duplicated events
+
+        The run window is queried slice by slice, every slice is paged through as iter_list does.
+        Slices are half open like Alarm.list, an event stamped on a slice boundary is fetched once.
+
+        :param run_id: run id of the SequenceTagger used by the generator
+        :param start_time: run start datetime, e.g. a little before the first msg was sent
+        :param end_time: run end datetime, leave time for the last events to be stored
+        :param field: tag field name
+        :param slice_seconds: loss is reported per slice of this length
+        :param sent: msgs tagged, an int for one stream or a dict of stream to count (fanout workers)
+        :param fields: query fields, one of them has to hold the tag, e.g. the original log
+        :param filter_expression: optional query filter, e.g. on the collector or event name
+        :param first_seq: first sequence number of every stream
+        :param ranges: max missing ranges listed per stream
+        :return: report dict, refer to SequenceCheck.report
+        """
+        check = SequenceCheck(run_id, field, first_seq)
+        payload = self._query_payload(start_time, end_time, fields, filter_expression)
+        step = timedelta(seconds=slice_seconds)
+        slice_start = start_time
+        while slice_start < end_time:
+            slice_end = min(slice_start + step, end_time)
+            scene = dict(payload['scene'], startTime=convert_date_time(slice_start),
+                         endTime=convert_date_time(slice_end) - 1)
+            found = check.add_slice(slice_start, slice_end,
+                                    self._iter_pages(dict(payload, scene=scene), PAGE_SIZE, True))
+            log.debug('%s - %s: %d tagged events', slice_start, slice_end, found)
+            slice_start = slice_end
+        return check.report(sent, ranges)
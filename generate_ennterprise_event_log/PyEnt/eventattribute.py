@@ -4,6 +4,7 @@ import json
 
 from ._internal_utils import status_code_check, response_status_check
 from .filter import EntObject, filter
+from .cache import lookup, invalidate
 
 
 class EventAttribute(object):
@@ -62,8 +63,7 @@ class EventAttribute(object):
         :param name: attribute name
         :return: event attribute
         """
-        attribute_list = self.list()
-        return [attribute for attribute in attribute_list if attribute['attrName'] == name][0]
+        return lookup(self._session, 'EventAttribute', self.list, 'attrName', name)
 
     def update(self, id, data=None, **kwargs):
         """Update event attribute by id
@@ -87,6 +87,7 @@ class EventAttribute(object):
                 update_data['attrDesc'] = desc
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'EventAttribute', 'EventInitParams')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -4,6 +4,7 @@ import json
 
 from ._internal_utils import status_code_check, response_status_check
 from .eventtype import EventType
+from .cache import lookup, invalidate
 
 import logging
 log = logging.getLogger(__name__)
@@ -58,8 +59,7 @@ class EventBase(object):
         :return:  event dict
         """
 
-        event_list = self.list()
-        return [event for event in event_list if event['name'] == name][0]
+        return lookup(self._session, 'EventBase', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create event
@@ -70,6 +70,7 @@ class EventBase(object):
         print data
         uri = self._console_url + '/security/eventBase'
         response = self.session.post(uri, json=data)
+        invalidate(self._session, 'EventBase')
         response_content = json.loads(response.content)
         print response.content
 
@@ -128,6 +129,7 @@ class EventBase(object):
                 update_data['keyword'] = keyword
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'EventBase')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -140,4 +142,5 @@ class EventBase(object):
         """
         uri = self._console_url + '/security/eventBase/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'EventBase')
         status_code_check(response.status_code, 200)
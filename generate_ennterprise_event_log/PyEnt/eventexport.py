@@ -0,0 +1,364 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.eventexport
+~~~~~~~~~~~~~~
+This module provides the event export engine: a time range written to a gzip JSONL or CSV file.
+
+The range is cut into slices fetched by a bounded pool of worker threads, each with its
+own copy of the logged in session. A worker pages through its slice and streams the rows
+into a gzip part file, one page in memory at a time. A slice holding more events than
+one query can page through (max_rows) is split in half and both halves go back to the
+queue, down to one second, the query precision. Slices are half open, [start, end), so
+an event on a boundary is exported once. Completed slices are appended to a state journal
+next to the output, an interrupted export started again skips them. When every slice is
+done the parts are concatenated in time order, gzip members chain into one valid file.
+"""
+
+import csv
+import gzip
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+
+try:
+    from Queue import Queue, Empty
+except ImportError:
+    from queue import Queue, Empty
+
+from . import session as _session
+from ._internal_utils import convert_date_time
+from .event import PAGE_SIZE
+
+import logging
+log = logging.getLogger(__name__)
+
+Format = ['jsonl', 'csv']
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# rows one query can page through before the server stops returning pages
+MAX_ROWS = 10000
+
+
+def row_value(row, field):
+    """Get a field of an Event.list row
+
+    :param row: event row
+    :param field: field text, e.g. u'原始日志'
+    :return: shown value, the raw value if there is none, None if the row lacks the field
+    """
+    for item in row.get('attrValueList', []):
+        if item.get('text') == field or item.get('realText') == field:
+            value = item.get('showVal')
+            return item.get('realVal') if value is None else value
+    return None
+
+
+def _cell(value):
+    if value is None:
+        return b''
+    if isinstance(value, bytes):
+        return value
+    if not isinstance(value, type(u'')):
+        value = u'%s' % value
+    return value.encode('utf-8')
+
+
+def _format_time(value):
+    return value.strftime(TIME_FORMAT)
+
+
+def _parse_time(value):
+    return datetime.strptime(value, TIME_FORMAT)
+
+
+class EventExport(object):
+    def __init__(self, event, output, start_time, end_time,
+                 fields=[u'发生时间', u'事件名称', u'事件级别', u'源地址', u'目的地址', u'原始日志'],
+                 filter_expression=None, fmt='jsonl', slice_seconds=300, workers=4, page_size=PAGE_SIZE,
+                 max_rows=MAX_ROWS):
+        """EventExport class init function
+
+        :param event: Event resource of a logged in PyEnt, its session is copied for every worker
+        :param output: output file, e.g. events.jsonl.gz, the state file and parts dir are put next to it
+        :param start_time: export start datetime
+        :param end_time: export end datetime
+        :param fields: query fields, the csv columns
+        :param filter_expression: optional query filter
+        :param fmt: refer to Format, jsonl writes the whole row, csv the shown field values
+        :param slice_seconds: seconds per initial slice
+        :param workers: concurrent queries, one session each
+        :param page_size: events per request
+        :param max_rows: rows one query can page through, a slice holding more is split
+        """
+        assert fmt in Format
+        assert fields
+        assert start_time < end_time
+        assert workers > 0 and slice_seconds > 0
+        assert max_rows >= page_size
+        self._event = event
+        self.output = output
+        self.start_time = start_time.replace(microsecond=0)
+        self.end_time = end_time.replace(microsecond=0)
+        self._fields = fields
+        self._filter = filter_expression
+        self._format = fmt
+        self._slice_seconds = slice_seconds
+        self._workers = workers
+        self._page_size = page_size
+        self._max_rows = max_rows
+        self.state_path = output + '.state'
+        self.parts_dir = output + '.parts'
+        self._lock = threading.Lock()
+
+    def slices(self):
+        """Cut the export range into the initial slices
+
+        :return: list of (start, end) datetime tuples
+        """
+        step = timedelta(seconds=self._slice_seconds)
+        result = []
+        start = self.start_time
+        while start < self.end_time:
+            end = min(start + step, self.end_time)
+            result.append((start, end))
+            start = end
+        return result
+
+    def run(self, resume=True):
+        """Export the range, blocks until every slice is written
+
+        :param resume: skip the slices completed by an earlier run with the same parameters, default is True,
+                       False starts over
+        :return: report dict, keys: output, rows, slices, splits, skipped (slices done before), truncated
+                 (one second slices holding more than max_rows), elapsed, rate
+        """
+        starttime = time.time()
+        self._error = None
+        self._stop = threading.Event()
+        state = self._load_state() if resume else None
+        if state is None:
+            if os.path.isdir(self.parts_dir):
+                shutil.rmtree(self.parts_dir)
+            state = {'params': self._params(), 'done': []}
+        if not os.path.isdir(self.parts_dir):
+            os.makedirs(self.parts_dir)
+        self._state = state
+        self._open_journal()
+        skipped = len(state['done'])
+
+        done = [(_parse_time(x['start']), _parse_time(x['end'])) for x in state['done']]
+        todo = self._remaining(done)
+        log.info('%d slices to export, %d done before', len(todo), skipped)
+
+        # the field lookup is done once, the payload is reused per slice
+        self._payload = self._event._query_payload(self.start_time, self.end_time, self._fields, self._filter)
+        self._splits = 0
+        self._truncated = []
+        self._pending = len(todo)
+        queue = Queue()
+        for item in todo:
+            queue.put(item)
+        threads = []
+        for i in range(min(self._workers, len(todo))):
+            event = self._event.__class__(self._event._console_url, _session.clone(self._event.session))
+            thread = threading.Thread(target=self._work, args=(event, queue))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        try:
+            # join with a timeout, a plain Queue.join is not interruptible by ctrl-c
+            while any(x.is_alive() for x in threads):
+                for thread in threads:
+                    thread.join(0.5)
+        finally:
+            self._stop.set()
+            with self._lock:
+                self._journal.close()
+        if self._error is not None:
+            raise self._error
+
+        rows = self._merge()
+        elapsed = time.time() - starttime
+        report = {
+            'output': self.output,
+            'rows': rows,
+            'slices': len(self._state['done']),
+            'splits': self._splits,
+            'skipped': skipped,
+            'truncated': self._truncated,
+            'elapsed': elapsed,
+            'rate': rows / elapsed if elapsed else 0.0,
+        }
+        if os.path.exists(self.state_path):
+            os.remove(self.state_path)
+        shutil.rmtree(self.parts_dir)
+        return report
+
+    def _params(self):
+        return {
+            'start': _format_time(self.start_time),
+            'end': _format_time(self.end_time),
+            'fields': self._fields,
+            'filter': self._filter,
+            'format': self._format,
+        }
+
+    def _load_state(self):
+        # journal: the params on the first line, then one line per completed slice
+        if not os.path.exists(self.state_path):
+            return None
+        with open(self.state_path) as f:
+            lines = f.read().splitlines()
+        try:
+            params = json.loads(lines[0])['params']
+        except (IndexError, KeyError, TypeError, ValueError):
+            params = None
+        if params != json.loads(json.dumps(self._params())):
+            log.warning('%s belongs to another export, starting over', self.state_path)
+            return None
+        state = {'params': params, 'done': []}
+        for line in lines[1:]:
+            try:
+                state['done'].append(json.loads(line))
+            except ValueError:
+                # the last entry was cut short, its slice is exported again
+                log.warning('%s: ignoring a truncated entry', self.state_path)
+                break
+        # a part without its state entry was cut short, it is written again
+        done = set(x['part'] for x in state['done'])
+        if os.path.isdir(self.parts_dir):
+            for name in os.listdir(self.parts_dir):
+                if name not in done:
+                    os.remove(os.path.join(self.parts_dir, name))
+        return state
+
+    def _open_journal(self):
+        # rewritten once per run, then every completed slice is one appended line
+        path = self.state_path + '.tmp'
+        with open(path, 'w') as f:
+            f.write(json.dumps({'params': self._state['params']}, sort_keys=True) + '\n')
+            for item in self._state['done']:
+                f.write(json.dumps(item, sort_keys=True) + '\n')
+        os.rename(path, self.state_path)
+        self._journal = open(self.state_path, 'a')
+
+    def _save_state(self, item):
+        self._state['done'].append(item)
+        self._journal.write(json.dumps(item, sort_keys=True) + '\n')
+        self._journal.flush()
+
+    def _remaining(self, done):
+        """Initial slices minus the spans already done, done spans never cross an initial slice"""
+        todo = []
+        for start, end in self.slices():
+            inner = sorted(x for x in done if start <= x[0] and x[1] <= end)
+            cursor = start
+            for begin, finish in inner:
+                if begin > cursor:
+                    todo.append((cursor, begin))
+                cursor = max(cursor, finish)
+            if cursor < end:
+                todo.append((cursor, end))
+        return todo
+
+    def _work(self, event, queue):
+        while not self._stop.is_set():
+            try:
+                start, end = queue.get(timeout=0.1)
+            except Empty:
+                with self._lock:
+                    if self._pending == 0:
+                        return
+                continue
+            try:
+                self._export_slice(event, queue, start, end)
+            except Exception as ex:
+                log.exception('%s - %s export failed', start, end)
+                with self._lock:
+                    if self._error is None:
+                        self._error = ex
+                self._stop.set()
+                return
+            finally:
+                with self._lock:
+                    self._pending -= 1
+
+    def _split(self, queue, start, end):
+        if end - start <= timedelta(seconds=1):
+            return False
+        # queries have second precision, halves are whole seconds
+        middle = start + timedelta(seconds=int((end - start).total_seconds()) // 2)
+        with self._lock:
+            self._pending += 2
+            self._splits += 1
+        queue.put((start, middle))
+        queue.put((middle, end))
+        log.debug('%s - %s over %d events, split at %s', start, end, self._max_rows, middle)
+        return True
+
+    def _export_slice(self, event, queue, start, end):
+        # half open like Alarm.list, the next slice starts at end
+        payload = dict(self._payload, scene=dict(self._payload['scene'], startTime=convert_date_time(start),
+                                                 endTime=convert_date_time(end) - 1))
+        data = event._query_page(payload, 1, self._page_size)
+        total = data.get('total')
+        if total is not None and total > self._max_rows and self._split(queue, start, end):
+            return
+
+        name = '%s-%s.gz' % (start.strftime('%Y%m%d%H%M%S'), end.strftime('%Y%m%d%H%M%S'))
+        path = os.path.join(self.parts_dir, name)
+        rows = 0
+        page = 1
+        f = gzip.open(path, 'wb')
+        try:
+            writer = csv.writer(f) if self._format == 'csv' else None
+            while True:
+                batch = data['list']
+                if writer is not None:
+                    writer.writerows([_cell(row_value(row, x)) for x in self._fields] for row in batch)
+                else:
+                    f.write(b''.join(json.dumps(row, sort_keys=True).encode('utf-8') + b'\n' for row in batch))
+                rows += len(batch)
+                if len(batch) < self._page_size or (total is not None and rows >= total):
+                    break
+                if rows >= self._max_rows:
+                    break
+                if self._stop.is_set():
+                    return
+                page += 1
+                data = event._query_page(payload, page, self._page_size)
+        finally:
+            f.close()
+
+        if rows >= self._max_rows and (total is None or total > rows):
+            # no total in the response and the page cap reached, the slice is fetched again in halves
+            if self._split(queue, start, end):
+                os.remove(path)
+                return
+            log.warning('%s - %s holds more than %d events, the rest is not exported', start, end, self._max_rows)
+            with self._lock:
+                self._truncated.append((_format_time(start), _format_time(end)))
+
+        with self._lock:
+            self._save_state({'start': _format_time(start), 'end': _format_time(end), 'rows': rows, 'part': name})
+        log.debug('%s - %s: %d events', start, end, rows)
+
+    def _merge(self):
+        done = sorted(self._state['done'], key=lambda x: x['start'])
+        path = self.output + '.tmp'
+        with open(path, 'wb') as out:
+            if self._format == 'csv':
+                header = gzip.GzipFile(fileobj=out, mode='wb')
+                csv.writer(header).writerow([_cell(x) for x in self._fields])
+                header.close()
+            for item in done:
+                with open(os.path.join(self.parts_dir, item['part']), 'rb') as f:
+                    shutil.copyfileobj(f, out, 1024 * 1024)
+        os.rename(path, self.output)
+        return sum(x['rows'] for x in done)
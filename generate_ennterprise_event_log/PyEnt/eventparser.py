@@ -7,6 +7,8 @@ from ._internal_utils import ParserType, MappingType
 from .eventtype import EventType
 from .assettype import AssetType
 from .exceptions import InvalidAttribute
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -62,8 +64,7 @@ class EventParser(object):
         :return: event parser info dict
         """
 
-        event_parser_list = self.list()
-        return [event_parser for event_parser in event_parser_list if event_parser['parserName'] == name][0]
+        return lookup(self._session, 'EventParser', self.list, 'parserName', name)
 
     def create_by_data(self, data):
         """Create event parser by data
@@ -75,6 +76,7 @@ class EventParser(object):
         uri = self._console_url + '/event/eventParser'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'EventParser')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -249,6 +251,7 @@ class EventParser(object):
                 pass
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'EventParser')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -262,20 +265,16 @@ class EventParser(object):
 
         uri = self._console_url + '/event/eventParser/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'EventParser')
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all event parsers
-        
-        :return: None
-        """
 
-        parser_list = self.list()
-        for parser in parser_list:
-            try:
-                self.delete(parser['id'])
-            except Exception as ex:
-                pass
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
+        """
+        return BulkExecutor(self, workers).delete([parser['id'] for parser in self.list()])
 
     def filter(self, **kwargs):
         pass
@@ -319,6 +318,7 @@ class EventParser(object):
         else:
             uri = uri + 'add'
         response = self._session.post(uri, data=content)
+        invalidate(self._session, 'EventParser')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
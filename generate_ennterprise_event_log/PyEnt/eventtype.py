@@ -4,6 +4,7 @@ import json
 
 from ._internal_utils import status_code_check, response_status_check
 from .eventattribute import EventAttribute
+from .cache import lookup, invalidate
 
 
 import logging
@@ -81,9 +82,7 @@ class EventType(object):
         :return:  event type
         """
 
-        event_type_list = self.list()
-        event_type_list.extend(self.list_sub_type())
-        return [event_type for event_type in event_type_list if event_type['typeName'] == name][0]
+        return lookup(self._session, 'EventType', lambda: self.list() + self.list_sub_type(), 'typeName', name)
 
     def create_by_data(self, data):
         """Create event type
@@ -93,6 +92,7 @@ class EventType(object):
         """
         uri = self._console_url + '/event/eventType'
         response = self.session.post(uri, json=data)
+        invalidate(self._session, 'EventType', 'EventInitParams')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -160,6 +160,7 @@ class EventType(object):
                 update_data['keyFields'] = key_fields
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'EventType', 'EventInitParams')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -173,5 +174,6 @@ class EventType(object):
 
         uri = self._console_url + '/event/eventType/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'EventType', 'EventInitParams')
         status_code_check(response.status_code, 200)
 
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.exporter
+~~~~~~~~~~~~~~
+This module provides the OpenMetrics exporter: sender counters and REST client latency over HTTP.
+
+A MetricsRegistry collects SenderMetrics instances by name and per endpoint request
+latency histograms, fed by a response hook on the requests session. MetricsExporter
+serves the registry as OpenMetrics text from a background thread, e.g. for Prometheus:
+
+    exporter = MetricsExporter(port=9464).start()
+    exporter.registry.add_sender('nta', sender.metrics)
+"""
+
+import re
+import threading
+import time
+
+try:
+    from urlparse import urlparse
+except ImportError:
+    from urllib.parse import urlparse
+
+try:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+except ImportError:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+
+import logging
+log = logging.getLogger(__name__)
+
+CONTENT_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# numeric ids, uuids and long hex ids in a path become {id}, one series per endpoint
+_ID_SEGMENT = re.compile(r'^(\d+|[0-9a-fA-F]{8}-[0-9a-fA-F-]{27}|[0-9a-fA-F]{16,})$')
+
+
+def endpoint_name(url):
+    """Get the endpoint of a request url, ids replaced by {id}
+
+    :param url: request url
+    :return: endpoint path, e.g. /api/node/alarm/{id}
+    """
+    path = urlparse(url).path or '/'
+    return '/'.join('{id}' if _ID_SEGMENT.match(x) else x for x in path.split('/'))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    return '{' + ','.join('%s="%s"' % (k, _escape(labels[k])) for k in sorted(labels)) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class LatencyHistogram(object):
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        """LatencyHistogram class init function
+
+        :param buckets: sorted upper bounds in seconds, +Inf is implicit
+        """
+        self.buckets = tuple(buckets) + (float('inf'),)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        self.count += 1
+        self.sum += seconds
+
+    def cumulative(self):
+        """Get cumulative bucket counts
+
+        :return: list of (upper bound, count of observations <= bound)
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class MetricsRegistry(object):
+    def __init__(self, buckets=DEFAULT_BUCKETS, prefix='pyent'):
+        """MetricsRegistry class init function
+
+        :param buckets: request latency histogram buckets in seconds
+        :param prefix: metric name prefix
+        """
+        self._buckets = buckets
+        self._prefix = prefix
+        self._lock = threading.Lock()
+        self._senders = {}
+        self._last_scrape = {}
+        self._latency = {}
+        self._requests = {}
+
+    def add_sender(self, name, metrics):
+        """Export a sender's counters
+
+        :param name: sender label value, unique within the registry
+        :param metrics: SenderMetrics instance, e.g. Sender(...).metrics
+        :return: None
+        """
+        with self._lock:
+            self._senders[name] = metrics
+            self._last_scrape.pop(name, None)
+
+    def remove_sender(self, name):
+        with self._lock:
+            self._senders.pop(name, None)
+            self._last_scrape.pop(name, None)
+
+    def observe_request(self, method, endpoint, seconds, status_code):
+        """Record one REST request
+
+        :param method: http method
+        :param endpoint: endpoint path, see endpoint_name
+        :param seconds: request latency
+        :param status_code: http status code
+        :return: None
+        """
+        with self._lock:
+            histogram = self._latency.get((method, endpoint))
+            if histogram is None:
+                histogram = self._latency[(method, endpoint)] = LatencyHistogram(self._buckets)
+            histogram.observe(seconds)
+            key = (method, endpoint, status_code)
+            self._requests[key] = self._requests.get(key, 0) + 1
+
+    def instrument(self, session):
+        """Record every request of a requests session, latency is time to response headers
+
+        :param session: requests.Session, e.g. the PyEnt session
+        :return: session
+        """
+        hooks = session.hooks.setdefault('response', [])
+        if not any(getattr(x, '__self__', None) is self for x in hooks):
+            hooks.append(self._response_hook)
+        return session
+
+    def _response_hook(self, response, *args, **kwargs):
+        request = response.request
+        self.observe_request(request.method, endpoint_name(request.url),
+                             response.elapsed.total_seconds(), response.status_code)
+
+    def render(self):
+        """Render all metrics as OpenMetrics text
+
+        :return: exposition text, ends with # EOF
+        """
+        prefix = self._prefix
+        lines = []
+        with self._lock:
+            senders = sorted(self._senders.items())
+            now = time.time()
+            snapshots = []
+            for name, metrics in senders:
+                snapshot = metrics.snapshot()
+                # eps since the previous scrape, the first scrape reports the run average
+                last = self._last_scrape.get(name)
+                if last is not None and now > last[0]:
+                    snapshot['scrape_eps'] = (snapshot['sent'] - last[1]) / (now - last[0])
+                else:
+                    snapshot['scrape_eps'] = snapshot['eps']
+                self._last_scrape[name] = (now, snapshot['sent'])
+                snapshots.append((name, snapshot))
+
+            for metric, key, help_text in (
+                    ('sender_sent', 'sent', 'Msgs sent'),
+                    ('sender_bytes', 'bytes', 'Bytes sent'),
+                    ('sender_gen_seconds', 'gen_time', 'Seconds spent generating msgs'),
+                    ('sender_send_seconds', 'send_time', 'Seconds spent in socket calls'),
+                    ('sender_wait_seconds', 'wait_time', 'Seconds spent waiting for the pacer')):
+                lines.append('# TYPE %s_%s counter' % (prefix, metric))
+                lines.append('# HELP %s_%s %s' % (prefix, metric, help_text))
+                for name, snapshot in snapshots:
+                    lines.append('%s_%s_total%s %s' % (prefix, metric, _labels(sender=name), _number(snapshot[key])))
+
+            lines.append('# TYPE %s_sender_errors counter' % prefix)
+            lines.append('# HELP %s_sender_errors Socket errors by errno' % prefix)
+            for name, snapshot in snapshots:
+                for err in sorted(snapshot['errors']):
+                    lines.append('%s_sender_errors_total%s %d' % (prefix, _labels(sender=name, errno=err),
+                                                                  snapshot['errors'][err]))
+
+            lines.append('# TYPE %s_sender_retries counter' % prefix)
+            lines.append('# HELP %s_sender_retries Sends retried after a full socket buffer, by errno' % prefix)
+            for name, snapshot in snapshots:
+                for err in sorted(snapshot.get('retries', {})):
+                    lines.append('%s_sender_retries_total%s %d' % (prefix, _labels(sender=name, errno=err),
+                                                                   snapshot['retries'][err]))
+
+            lines.append('# TYPE %s_sender_eps gauge' % prefix)
+            lines.append('# HELP %s_sender_eps Msgs per second since the previous scrape' % prefix)
+            for name, snapshot in snapshots:
+                lines.append('%s_sender_eps%s %s' % (prefix, _labels(sender=name), _number(snapshot['scrape_eps'])))
+
+            lines.append('# TYPE %s_request_duration_seconds histogram' % prefix)
+            lines.append('# UNIT %s_request_duration_seconds seconds' % prefix)
+            lines.append('# HELP %s_request_duration_seconds REST request latency per endpoint' % prefix)
+            for (method, endpoint), histogram in sorted(self._latency.items()):
+                for bound, count in histogram.cumulative():
+                    lines.append('%s_request_duration_seconds_bucket%s %d' % (
+                        prefix, _labels(method=method, endpoint=endpoint, le=_number(float(bound))), count))
+                lines.append('%s_request_duration_seconds_count%s %d' % (
+                    prefix, _labels(method=method, endpoint=endpoint), histogram.count))
+                lines.append('%s_request_duration_seconds_sum%s %s' % (
+                    prefix, _labels(method=method, endpoint=endpoint), _number(histogram.sum)))
+
+            lines.append('# TYPE %s_requests counter' % prefix)
+            lines.append('# HELP %s_requests REST requests per endpoint and status code' % prefix)
+            for (method, endpoint, code), count in sorted(self._requests.items()):
+                lines.append('%s_requests_total%s %d' % (
+                    prefix, _labels(method=method, endpoint=endpoint, code=code), count))
+        lines.append('# EOF')
+        return '\n'.join(lines) + '\n'
+
+
+# shared by PyEnt.export_metrics and the senders of one process
+default_registry = MetricsRegistry()
+
+
+class _ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = self.server.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        log.debug('%s %s', self.address_string(), fmt % args)
+
+
+class MetricsExporter(object):
+    def __init__(self, registry=None, host='127.0.0.1', port=9464):
+        """MetricsExporter class init function
+
+        :param registry: MetricsRegistry to serve, default is default_registry
+        :param host: listen address, default is localhost only
+        :param port: listen port, 0 picks a free one
+        """
+        self.registry = registry or default_registry
+        self._addr = (host, port)
+        self._server = None
+        self._thread = None
+
+    @property
+    def address(self):
+        """Get the bound (host, port), None before start()"""
+        return self._server.server_address if self._server else None
+
+    def start(self):
+        """Serve /metrics from a background thread
+
+        :return: self
+        """
+        self._server = _ThreadingHTTPServer(self._addr, _MetricsHandler)
+        self._server.registry = self.registry
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        log.info('metrics exporter listening on %s:%s', *self.address[:2])
+        return self
+
+    def stop(self):
+        """Stop serving
+
+        :return: None
+        """
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._thread.join()
+            self._server = None
+            self._thread = None
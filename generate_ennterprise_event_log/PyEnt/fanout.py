@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.fanout
+~~~~~~~~~~~~~~
+This module provides the multi-process sender, one workload split across N worker processes.
+
+Each worker opens its own Sender socket, reseeds `random` with seed + worker index
+and paces itself at its share of the global rate; the per-worker counters are merged
+into one report when all workers are done.
+"""
+
+import multiprocessing
+import random
+
+from .sender import Sender
+from .pacer import _clock
+
+import logging
+log = logging.getLogger(__name__)
+
+
+def split_share(total, parts):
+    """Split total into parts integer shares, remainder goes to the first shares
+
+    :param total: total to split
+    :param parts: number of shares
+    :return: share list
+    """
+    base, extra = divmod(int(total), parts)
+    return [base + (1 if i < extra else 0) for i in range(parts)]
+
+
+def merge_reports(reports):
+    """Merge per-worker counters into one report
+
+    :param reports: worker report list, keys: worker, seed, sent, bytes, elapsed, errors, retries, gen_time, send_time
+    :return: merged report dict, per-worker reports under workers, times summed over workers
+    """
+    sent = sum(x['sent'] for x in reports)
+    size = sum(x['bytes'] for x in reports)
+    elapsed = max([x['elapsed'] for x in reports] or [0.0])
+    errors = {}
+    retries = {}
+    for report in reports:
+        for name, count in report.get('errors', {}).items():
+            errors[name] = errors.get(name, 0) + count
+        for name, count in report.get('retries', {}).items():
+            retries[name] = retries.get(name, 0) + count
+    return {
+        'sent': sent,
+        'bytes': size,
+        'elapsed': elapsed,
+        'errors': errors,
+        'retries': retries,
+        'gen_time': sum(x.get('gen_time', 0.0) for x in reports),
+        'send_time': sum(x.get('send_time', 0.0) for x in reports),
+        'achieved_rate': sent / elapsed if elapsed else 0.0,
+        'achieved_bytes_rate': size / elapsed if elapsed else 0.0,
+        'workers': sorted(reports, key=lambda x: x['worker']),
+    }
+
+
+def _worker(task):
+    index, seed, host, port, rate, count, generator, batch_size, tagger = task
+    random.seed(seed)
+    sender = Sender(host, port, rate=rate, tagger=tagger)
+    starttime = _clock()
+    sent, size = sender.send_batch(generator(count), batch_size)
+    metrics = sender.metrics
+    return {
+        'worker': index,
+        'seed': seed,
+        'rate': rate,
+        'sent': sent,
+        'bytes': size,
+        'elapsed': _clock() - starttime,
+        'errors': dict(metrics.errors),
+        'retries': dict(metrics.retries),
+        'gen_time': metrics.gen_time,
+        'send_time': metrics.send_time,
+        'run_id': tagger.run_id if tagger is not None else None,
+        'tagged': tagger.next_seq if tagger is not None else None,
+    }
+
+
+class FanoutSender(object):
+    def __init__(self, host, port=514, workers=None, rate=0, seed=None, tagger=None):
+        """FanoutSender class init function
+
+        :param host: host server ip
+        :param port: host port, default is 514, SYSLOG port
+        :param workers: worker process count, default is cpu count
+        :param rate: global target events per second, split evenly across workers, 0 means unpaced
+        :param seed: base RNG seed, worker i uses seed + i, default is random
+        :param tagger: SequenceTagger, worker i tags its msgs as stream <run id>.<i>
+        """
+        self._addr = (host, port)
+        self._workers = workers or multiprocessing.cpu_count()
+        self._rate = rate
+        if seed is None:
+            seed = random.SystemRandom().randrange(1 << 31)
+        self._seed = seed
+        self._tagger = tagger
+
+    @property
+    def seed(self):
+        return self._seed
+
+    def send(self, generator, count, batch_size=1024):
+        """Send count msgs across all workers
+
+        :param generator: picklable callable, generator(n) returns an iterable of n encoded msgs,
+                          called inside each worker after `random` is seeded
+        :param count: total msgs to send
+        :param batch_size: msgs flushed per burst in each worker
+        :return: merged report dict, see merge_reports
+        """
+        counts = split_share(count, self._workers)
+        if self._rate:
+            rates = [self._rate / float(self._workers)] * self._workers
+        else:
+            rates = [0] * self._workers
+        tasks = [(i, self._seed + i, self._addr[0], self._addr[1], rates[i], counts[i], generator, batch_size,
+                  self._tagger.stream(i) if self._tagger is not None else None)
+                 for i in range(self._workers) if counts[i]]
+        if not tasks:
+            return merge_reports([])
+
+        pool = multiprocessing.Pool(len(tasks))
+        try:
+            reports = pool.map(_worker, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        report = merge_reports(reports)
+        report['seed'] = self._seed
+        report['run_id'] = self._tagger.run_id if self._tagger is not None else None
+        report['requested_rate'] = self._rate or None
+        log.info('fanout sent %d msgs in %.3fs by %d workers', report['sent'], report['elapsed'], len(tasks))
+        return report
@@ -0,0 +1,280 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.fieldgen
+~~~~~~~~~~~~~~
+This module provides batched generation of random log field values: IPs, ports and timestamps,
+and fixed cardinality value pools with uniform, zipf or hot-set popularity.
+
+Values are produced in blocks, one RNG pass per block instead of one per field. NumPy is
+used when installed, otherwise the stdlib RNG fills the block. Both paths are reproducible
+for a given seed, but they do not produce the same sequence.
+"""
+
+import random
+import socket
+import struct
+import time
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# first octets never used for public addresses, same as set_internetip/internet_ip
+INTRANET_FIRST_OCTET = [10, 127, 169, 172, 192]
+INTRANET_PREFIX = ['172.16', '192.168']
+
+
+class FieldGenerator(object):
+    def __init__(self, seed=None, use_numpy=True):
+        """FieldGenerator class init function
+
+        :param seed: RNG seed, default is random
+        :param use_numpy: use NumPy when installed, default is True
+        """
+        if seed is None:
+            seed = random.SystemRandom().randrange(1 << 31)
+        self._seed = seed
+        self._random = random.Random(seed)
+        if use_numpy and numpy is not None:
+            self._numpy = numpy.random.RandomState(seed)
+        else:
+            self._numpy = None
+        self._prefix = [x.encode('ascii') + b'.' for x in INTRANET_PREFIX]
+        self._octets = [str(i).encode('ascii') for i in range(256)]
+
+    @property
+    def seed(self):
+        return self._seed
+
+    def internet_ips(self, count):
+        """Generate public IPs, every octet in 1-255, first octet not in INTRANET_FIRST_OCTET
+
+        :param count: block size
+        :return: list of encoded IPs
+        """
+        pack = struct.pack
+        ntoa = socket.inet_ntoa
+        if self._numpy is not None:
+            values = self._numpy.randint(1, 256, size=(count, 4)).astype(numpy.uint32)
+            bad = numpy.isin(values[:, 0], INTRANET_FIRST_OCTET)
+            while bad.any():
+                values[bad, 0] = self._numpy.randint(1, 256, size=int(bad.sum()))
+                bad = numpy.isin(values[:, 0], INTRANET_FIRST_OCTET)
+            packed = ((values[:, 0] << 24) | (values[:, 1] << 16) | (values[:, 2] << 8) | values[:, 3]).astype('>u4')
+            raw = packed.tobytes()
+            return [ntoa(raw[i:i + 4]).encode('ascii') for i in range(0, 4 * count, 4)]
+
+        getrandbits = self._random.getrandbits
+        excluded = frozenset(INTRANET_FIRST_OCTET)
+        ips = []
+        append = ips.append
+        while len(ips) < count:
+            value = getrandbits(32)
+            # same distribution as four randrange(1, 256), rejecting zero octets
+            if (value >> 24) in excluded or not (value & 0xff and value & 0xff00 and value & 0xff0000 and value >> 24):
+                continue
+            append(ntoa(pack('!I', value)).encode('ascii'))
+        return ips
+
+    def intranet_ips(self, count):
+        """Generate private IPs under INTRANET_PREFIX, last two octets in 1-255
+
+        :param count: block size
+        :return: list of encoded IPs
+        """
+        octets = self._octets
+        prefix = self._prefix
+        if self._numpy is not None:
+            values = self._numpy.randint(0, 255 * 255 * len(prefix), size=count).tolist()
+        else:
+            randrange = self._random.randrange
+            values = [randrange(0, 255 * 255 * len(prefix)) for i in range(count)]
+        ips = []
+        append = ips.append
+        for value in values:
+            rest, low = divmod(value, 255)
+            index, high = divmod(rest, 255)
+            append(prefix[index] + octets[high + 1] + b'.' + octets[low + 1])
+        return ips
+
+    def ports(self, count, low=0, high=65536):
+        """Generate ports in [low, high)
+
+        :param count: block size
+        :param low: lowest port, default is 0
+        :param high: highest port + 1, default is 65536
+        :return: list of int ports
+        """
+        if self._numpy is not None:
+            return self._numpy.randint(low, high, size=count).tolist()
+        if low == 0 and high == 65536:
+            getrandbits = self._random.getrandbits
+            return [getrandbits(16) for i in range(count)]
+        randrange = self._random.randrange
+        return [randrange(low, high) for i in range(count)]
+
+    def timestamps(self, count, start=None, interval=0):
+        """Generate millisecond timestamps
+
+        :param count: block size
+        :param start: first timestamp in ms, default is current time
+        :param interval: ms between consecutive timestamps, e.g. 1000.0 / rate
+        :return: list of int timestamps
+        """
+        if start is None:
+            start = int(round(time.time() * 1000))
+        if not interval:
+            return [start] * count
+        if self._numpy is not None:
+            return (start + numpy.arange(count) * interval).astype(numpy.int64).tolist()
+        return [int(start + i * interval) for i in range(count)]
+
+
+Distribution = ['uniform', 'zipf', 'hotset']
+
+
+class ValuePool(object):
+    def __init__(self, values, distribution='uniform', seed=None, zipf_s=1.0, hot_fraction=0.1, hot_weight=0.9):
+        """ValuePool class init function, fixed set of values drawn by a chosen popularity
+
+        Non uniform distributions use an alias table (Walker/Vose), every draw costs
+        two random numbers and two array reads whatever the pool size.
+
+        :param values: distinct values, the pool cardinality is len(values)
+        :param distribution: refer to Distribution, default is uniform
+        :param seed: RNG seed, default is random
+        :param zipf_s: zipf exponent, value i is drawn with weight 1 / (i + 1) ** zipf_s
+        :param hot_fraction: hotset share of values that are hot
+        :param hot_weight: hotset share of draws that hit a hot value
+        """
+        assert values
+        assert distribution in Distribution
+        self._values = list(values)
+        self._distribution = distribution
+        self._random = random.Random(seed)
+        size = len(self._values)
+        if distribution == 'uniform':
+            self._prob = None
+            self._alias = None
+            return
+        if distribution == 'zipf':
+            weights = [1.0 / (i + 1) ** zipf_s for i in range(size)]
+        else:
+            hot = max(1, int(size * hot_fraction))
+            if hot >= size:
+                weights = [1.0] * size
+            else:
+                weights = [hot_weight / hot] * hot + [(1.0 - hot_weight) / (size - hot)] * (size - hot)
+        self._prob, self._alias = self._build_alias(weights)
+
+    @staticmethod
+    def _build_alias(weights):
+        size = len(weights)
+        total = float(sum(weights))
+        scaled = [w * size / total for w in weights]
+        prob = array('d', [1.0] * size)
+        alias = array('l', range(size))
+        small = [i for i, x in enumerate(scaled) if x < 1.0]
+        large = [i for i, x in enumerate(scaled) if x >= 1.0]
+        while small and large:
+            less = small.pop()
+            more = large.pop()
+            prob[less] = scaled[less]
+            alias[less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1.0
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        return prob, alias
+
+    def __len__(self):
+        return len(self._values)
+
+    @property
+    def values(self):
+        return self._values
+
+    @property
+    def distribution(self):
+        return self._distribution
+
+    def draw(self, rng=None):
+        """Draw one value
+
+        :param rng: random.Random to draw with, default is the pool own RNG
+        :return: value
+        """
+        rnd = (rng or self._random).random
+        index = int(rnd() * len(self._values))
+        if self._prob is not None and rnd() >= self._prob[index]:
+            index = self._alias[index]
+        return self._values[index]
+
+    def sample(self, count, rng=None):
+        """Draw a block of values
+
+        :param count: block size
+        :param rng: random.Random to draw with, default is the pool own RNG
+        :return: list of values
+        """
+        rnd = (rng or self._random).random
+        values = self._values
+        size = len(values)
+        if self._prob is None:
+            return [values[int(rnd() * size)] for i in range(count)]
+        prob = self._prob
+        alias = self._alias
+        block = []
+        append = block.append
+        for i in range(count):
+            index = int(rnd() * size)
+            if rnd() >= prob[index]:
+                index = alias[index]
+            append(values[index])
+        return block
+
+
+def ip_pool(size, kind='internet', distribution='uniform', seed=None, **kwargs):
+    """Build a pool of distinct IPs
+
+    :param size: number of distinct IPs
+    :param kind: internet or intranet, same ranges as FieldGenerator
+    :param distribution: refer to Distribution
+    :param seed: RNG seed, used for both the IPs and the draws
+    :param kwargs: ValuePool distribution args, zipf_s, hot_fraction and hot_weight
+    :return: ValuePool of encoded IPs
+    """
+    assert kind in ('internet', 'intranet')
+    if kind == 'intranet':
+        assert size <= 255 * 255 * len(INTRANET_PREFIX), 'Too many distinct intranet IPs'
+    fields = FieldGenerator(seed)
+    block = fields.internet_ips if kind == 'internet' else fields.intranet_ips
+    ips = []
+    seen = set()
+    while len(ips) < size:
+        for ip in block(size - len(ips)):
+            if ip not in seen:
+                seen.add(ip)
+                ips.append(ip)
+    return ValuePool(ips, distribution, seed, **kwargs)
+
+
+def port_pool(size, low=1024, high=65536, distribution='uniform', seed=None, **kwargs):
+    """Build a pool of distinct ports
+
+    :param size: number of distinct ports
+    :param low: lowest port, default is 1024
+    :param high: highest port + 1, default is 65536
+    :param distribution: refer to Distribution
+    :param seed: RNG seed, used for both the ports and the draws
+    :param kwargs: ValuePool distribution args, zipf_s, hot_fraction and hot_weight
+    :return: ValuePool of int ports
+    """
+    assert size <= high - low
+    ports = random.Random(seed).sample(range(low, high), size)
+    return ValuePool(ports, distribution, seed, **kwargs)
@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -280,18 +281,13 @@ class Knowledge(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all knowledges
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        knowledge_list = self.list()
-        for knowledge in knowledge_list:
-            try:
-                self.delete(knowledge['id'])
-            except Exception as ex:
-                pass
+        return BulkExecutor(self, workers).delete([knowledge['id'] for knowledge in self.list()])
 
     def upload_file(self, local_file):
         """Upload local file to knowledge database
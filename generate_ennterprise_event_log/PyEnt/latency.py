@@ -0,0 +1,303 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.latency
+~~~~~~~~~~~~~~
+This module provides the ingestion latency probe: time from sent over syslog to searchable in Enterprise.
+
+LatencyProbe sends uniquely tagged marker events at a low rate through a Sender, next
+to whatever background load runs, and polls the events of the run until each marker shows
+up; the query is filtered on the run id server side and every page is read.
+Latency is measured on the client clock, send time to the poll that found the marker,
+so it is exact to one poll interval. The server clock offset, estimated from the HTTP
+Date header, is applied to the marker log time and the query window, and, when the
+rows carry a server time attribute, to the server side latency as well.
+"""
+
+import email.utils
+import math
+import re
+import threading
+import time
+from datetime import datetime
+
+from .sender import Sender
+from .sequence import SequenceTagger, seq_pattern, _strings
+from .template import Template
+from .tool import build_filter, build_filter_base
+
+import logging
+log = logging.getLogger(__name__)
+
+PROBE_SAMPLE = r'<11>Feb 18 11:12:23 localhost waf: tag:waf_log_websec site_id:1428395845  protect_id:2442566278  dst_ip:172.17.100.105  dst_port:80  src_ip:211.22.90.249  src_port:28684  method:UNKNOWN  domain:None  uri:None  alertlevel:MEDIUM  event_type:HTTP_Protocol_Validation  stat_time:2017-02-18 11:12:19  policy_id:1  rule_id:0  action:Block  block:No  block_info:None  http:  alertinfo:request method begin with non-capital letters or over load content-lenth  proxy_info:None  characters:None  count_num:1  protocol_type:HTTP  wci:None  wsi:None'
+
+# server side run id filter: the original log contains the run id
+FILTER_LEFT = u'原始日志'
+FILTER_CLASS = 'Contain'
+
+_probe_template = Template(PROBE_SAMPLE, {
+    'stat_time': r'stat_time:(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{1,2}:\d{1,2})',
+})
+
+
+def percentile(values, pct):
+    """Nearest rank percentile
+
+    :param values: sorted values
+    :param pct: percentile, 0-100
+    :return: value, None if values is empty
+    """
+    if not values:
+        return None
+    rank = int(math.ceil(pct / 100.0 * len(values)))
+    return values[max(0, min(len(values), rank) - 1)]
+
+
+def _server_date(response):
+    value = response.headers.get('Date')
+    if not value:
+        return None
+    return email.utils.mktime_tz(email.utils.parsedate_tz(value))
+
+
+def estimate_clock_offset(session, url, timeout=3.0):
+    """Estimate server clock minus client clock from the HTTP Date header
+
+    The header has one second resolution, so requests are repeated until the server
+    second changes; the change is placed between the two requests that saw it, the
+    estimate is as good as their round trip.
+
+    :param session: requests session
+    :param url: any url of the server
+    :param timeout: max seconds spent
+    :return: tuple of offset seconds and error bound, (None, None) if the server sends no Date
+    """
+    deadline = time.time() + timeout
+    previous = None
+    while time.time() < deadline:
+        before = time.time()
+        response = session.get(url, allow_redirects=False)
+        after = time.time()
+        date = _server_date(response)
+        if date is None:
+            return None, None
+        current = (before + after) / 2.0
+        if previous is not None and date > previous[0]:
+            boundary = (previous[1] + current) / 2.0
+            return date - boundary, (current - previous[1] + after - before) / 2.0
+        previous = (date, current)
+    # no second change seen, the header alone is good to one second
+    return previous[0] + 0.5 - previous[1], 1.0
+
+
+class BackgroundLoad(object):
+    def __init__(self, host, port=514, rate=1000, transport='udp', msgs=None):
+        """BackgroundLoad class init function, paced load from a thread while a probe runs
+
+        :param host: collector ip
+        :param port: collector port
+        :param rate: events per second
+        :param transport: refer to Transport
+        :param msgs: encoded msgs sent in turn, default is the WAF sample
+        """
+        self._sender = Sender(host, port, rate=rate, transport=transport)
+        self._msgs = msgs or [PROBE_SAMPLE.encode('utf-8')]
+        self._stop = threading.Event()
+        self._thread = None
+        self.sent = 0
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the current burst
+
+        :return: msgs sent
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        return self.sent
+
+    def _run(self):
+        msgs = self._msgs
+        burst = [msgs[i % len(msgs)] for i in range(256)]
+        while not self._stop.is_set():
+            self.sent += self._sender.send_batch(burst, 256)[0]
+
+
+def _row_time(row, attr):
+    for item in row.get('attrValueList', []):
+        if item.get('realText') != attr and item.get('text') != attr:
+            continue
+        value = item.get('realVal', item.get('showVal'))
+        if isinstance(value, (int, long, float)) or (value and str(value).isdigit()):
+            value = float(value)
+            return value / 1000.0 if value > 1e11 else value
+        try:
+            return time.mktime(datetime.strptime(value[:19], '%Y-%m-%d %H:%M:%S').timetuple())
+        except (TypeError, ValueError):
+            return None
+    return None
+
+
+class LatencyProbe(object):
+    def __init__(self, event, sender, rate=1.0, poll_interval=1.0, timeout=300, field='proxy_info', sep=':',
+                 marker=None, fields=[u'发生时间', u'原始日志'], filter_left=FILTER_LEFT, filter_class=FILTER_CLASS,
+                 server_time_attr=None, window=60):
+        """LatencyProbe class init function
+
+        :param event: Event resource, e.g. PyEnt(...).get_resource('Event')
+        :param sender: Sender to the collector, markers go out next to the background load
+        :param rate: markers per second
+        :param poll_interval: seconds between event queries
+        :param timeout: seconds after which a marker not found counts as lost
+        :param field: marker field, replaced in the marker log, default is the unused WAF proxy_info
+        :param sep: marker field separator
+        :param marker: callable marker(log_time) returning the untagged marker log for a server
+                       time struct, default is the WAF sample with stat_time set
+        :param fields: query fields, one of them has to hold the marker, e.g. the original log
+        :param filter_left: filter attribute holding the marker, default is the original log; the query is
+                            filtered on the run id server side, build_filter('AND', [build_filter_base(...)])
+        :param filter_class: contains operator class (the @class of the expression), default is FILTER_CLASS;
+                             None lists every event of the poll window, all pages of it, and matches
+                             the markers client side, which is slow under load
+        :param server_time_attr: event attribute with the server side time, e.g. receive time, enables
+                                 server_latency, the send time corrected by the clock offset to it
+        :param window: seconds of slack before the oldest pending marker in the poll window
+        """
+        self._event = event
+        self._sender = sender
+        self._rate = rate
+        self._poll_interval = poll_interval
+        self._timeout = timeout
+        self._marker = marker or (lambda log_time: _probe_template.render({
+            'stat_time': time.strftime('%Y-%m-%d %H:%M:%S', log_time).encode('ascii')}))
+        self._fields = fields
+        self._server_time_attr = server_time_attr
+        self._window = window
+        self.tagger = SequenceTagger(field=field, sep=sep)
+        self._pattern = re.compile(seq_pattern(field))
+        self._filter = None
+        if filter_class:
+            assert filter_left, 'filter_class needs filter_left'
+            self._filter = build_filter('AND', [build_filter_base(filter_left, filter_class, self.tagger.run_id)])
+        self.offset = 0.0
+        self.offset_error = None
+
+    @property
+    def run_id(self):
+        return self.tagger.run_id
+
+    def sync_clock(self):
+        """Estimate the server clock offset, used for marker times and query windows
+
+        :return: offset seconds, server minus client
+        """
+        offset, error = estimate_clock_offset(self._event.session, self._event._console_url)
+        if offset is None:
+            log.warning('server sends no Date header, clock offset is assumed 0')
+            offset = 0.0
+        self.offset = offset
+        self.offset_error = error
+        log.info('server clock offset %.3fs (+-%.3fs)', offset, error or 0.0)
+        return offset
+
+    def run(self, count, sync=True):
+        """Send count markers at rate and wait for all of them
+
+        :param count: markers to send
+        :param sync: estimate the clock offset first, default is True
+        :return: report dict, keys: run_id, sent, found, lost, offset, offset_error, poll_interval,
+                 latency (count, mean, p50, p95, p99, max in seconds) and, with server_time_attr, server_latency
+        """
+        if sync:
+            self.sync_clock()
+        pending = {}
+        latencies = []
+        server_latencies = []
+        sent = 0
+        interval = 1.0 / self._rate
+        next_send = time.time()
+        next_poll = next_send + self._poll_interval
+        while sent < count or pending:
+            now = time.time()
+            if sent < count and now >= next_send:
+                seq = self.tagger.next_seq
+                msg = self.tagger.tag(self._marker(time.localtime(now + self.offset)))
+                self._sender.send_string(msg)
+                pending[seq] = time.time()
+                sent += 1
+                next_send += interval
+            if pending and now >= next_poll:
+                self._poll(pending, latencies, server_latencies)
+                next_poll = time.time() + self._poll_interval
+            waits = [next_poll] if pending else []
+            if sent < count:
+                waits.append(next_send)
+            if waits:
+                time.sleep(max(0.0, min(waits) - time.time()))
+
+        latencies.sort()
+        server_latencies.sort()
+        report = {
+            'run_id': self.run_id,
+            'sent': sent,
+            'found': len(latencies),
+            'lost': sent - len(latencies),
+            'offset': self.offset,
+            'offset_error': self.offset_error,
+            'poll_interval': self._poll_interval,
+            'latency': self.summarize(latencies),
+        }
+        if self._server_time_attr:
+            report['server_latency'] = self.summarize(server_latencies)
+        return report
+
+    @staticmethod
+    def summarize(values):
+        """Summarize sorted latencies
+
+        :param values: sorted seconds
+        :return: dict, keys: count, mean, p50, p95, p99, max
+        """
+        return {
+            'count': len(values),
+            'mean': sum(values) / len(values) if values else None,
+            'p50': percentile(values, 50),
+            'p95': percentile(values, 95),
+            'p99': percentile(values, 99),
+            'max': values[-1] if values else None,
+        }
+
+    def _poll(self, pending, latencies, server_latencies):
+        now = time.time()
+        # the window is in server time, event times are server times
+        start = datetime.fromtimestamp(int(min(pending.values()) + self.offset - self._window))
+        end = datetime.fromtimestamp(int(now + self.offset) + 2)
+        # all pages, under load the markers are not on the first one when the filter is off
+        rows = list(self._event.iter_list(start, end, self._fields, self._filter, prefetch=False))
+        seen = time.time()
+        run_id = self.run_id
+        for row in rows:
+            for text in _strings(row):
+                match = self._pattern.search(text)
+                if match is None:
+                    continue
+                if (match.group('stream') or b'').decode('ascii') == run_id:
+                    seq = int(match.group('seq'))
+                    sent_at = pending.pop(seq, None)
+                    if sent_at is not None:
+                        latencies.append(seen - sent_at)
+                        server_time = _row_time(row, self._server_time_attr) if self._server_time_attr else None
+                        if server_time is not None:
+                            server_latencies.append(server_time - (sent_at + self.offset))
+                break
+        for seq, sent_at in list(pending.items()):
+            if seen - sent_at > self._timeout:
+                log.warning('marker %s-%d not found after %ds', run_id, seq, self._timeout)
+                del pending[seq]
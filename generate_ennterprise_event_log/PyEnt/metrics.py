@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.metrics
+~~~~~~~~~~~~~~
+This module provides the sender metrics: counters, errors by errno and where the time goes.
+
+Counters are updated once per burst by the sender, not per msg. Generation time is
+the time spent pulling msgs out of the caller's iterator, send time is the time spent
+in socket calls and wait time is pacer sleep, so a slow generator, a slow network and
+a rate limit are told apart. Reports are emitted from the sending thread when an
+interval has passed, no extra thread runs.
+"""
+
+import errno
+import json
+import sys
+import time
+
+import logging
+log = logging.getLogger(__name__)
+
+ReportFormat = ['text', 'json']
+
+
+def errno_name(err):
+    """Get errno symbol, e.g. ENOBUFS
+
+    :param err: errno value
+    :return: symbol, or the number as a string if unknown
+    """
+    return errno.errorcode.get(err, str(err))
+
+
+class SenderMetrics(object):
+    def __init__(self, interval=0, stream=None, report_format='text', on_report=None):
+        """SenderMetrics class init function
+
+        :param interval: seconds between periodic reports, 0 disables them
+        :param stream: report stream, default is stderr
+        :param report_format: refer to ReportFormat, json writes one object per line
+        :param on_report: callable on_report(snapshot), called instead of writing to stream
+        """
+        assert report_format in ReportFormat
+        self._interval = interval
+        self._stream = stream
+        self._report_format = report_format
+        self._on_report = on_report
+        self.reset()
+
+    def reset(self):
+        """Zero all counters and restart the clock
+
+        :return: None
+        """
+        self.sent = 0
+        self.bytes = 0
+        self.errors = {}
+        self.retries = {}
+        self.gen_time = 0.0
+        self.send_time = 0.0
+        self.wait_time = 0.0
+        self.started = time.time()
+        self._last_report = self.started
+        self._last_sent = 0
+        self._last_bytes = 0
+
+    def add_sent(self, count, size, send_time=0.0):
+        self.sent += count
+        self.bytes += size
+        self.send_time += send_time
+        if self._interval:
+            self.tick()
+
+    def add_gen(self, gen_time):
+        self.gen_time += gen_time
+
+    def add_wait(self, wait_time):
+        self.wait_time += wait_time
+
+    def add_error(self, err):
+        name = errno_name(err)
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def add_retry(self, err):
+        name = errno_name(err)
+        self.retries[name] = self.retries.get(name, 0) + 1
+
+    @property
+    def error_count(self):
+        return sum(self.errors.values())
+
+    def snapshot(self):
+        """Get cumulative counters
+
+        :return: dict, keys: elapsed, sent, bytes, errors (msgs dropped, by errno symbol), error_count,
+                 retries (sends tried again after a full socket buffer, by errno symbol), eps, bytes_rate,
+                 gen_time, send_time and wait_time (pacer sleep)
+        """
+        elapsed = time.time() - self.started
+        return {
+            'elapsed': elapsed,
+            'sent': self.sent,
+            'bytes': self.bytes,
+            'errors': dict(self.errors),
+            'error_count': self.error_count,
+            'retries': dict(self.retries),
+            'eps': self.sent / elapsed if elapsed else 0.0,
+            'bytes_rate': self.bytes / elapsed if elapsed else 0.0,
+            'gen_time': self.gen_time,
+            'send_time': self.send_time,
+            'wait_time': self.wait_time,
+        }
+
+    def tick(self, force=False):
+        """Emit a periodic report if the interval has passed
+
+        :param force: report now regardless of the interval
+        :return: snapshot with interval_eps and interval_bytes_rate if reported, else None
+        """
+        now = time.time()
+        span = now - self._last_report
+        if not force and (not self._interval or span < self._interval):
+            return None
+        snapshot = self.snapshot()
+        snapshot['interval_eps'] = (self.sent - self._last_sent) / span if span else 0.0
+        snapshot['interval_bytes_rate'] = (self.bytes - self._last_bytes) / span if span else 0.0
+        self._last_report = now
+        self._last_sent = self.sent
+        self._last_bytes = self.bytes
+        self._emit(snapshot)
+        return snapshot
+
+    def summary(self, emit=True):
+        """Get the final summary
+
+        :param emit: write it like a periodic report, default is True
+        :return: snapshot dict
+        """
+        snapshot = self.snapshot()
+        snapshot['final'] = True
+        if emit:
+            self._emit(snapshot)
+        return snapshot
+
+    def _emit(self, snapshot):
+        if self._on_report is not None:
+            try:
+                self._on_report(snapshot)
+            except Exception as ex:
+                log.warning('report callback failed: %s', ex)
+            return
+        stream = self._stream or sys.stderr
+        if self._report_format == 'json':
+            stream.write(json.dumps(snapshot, sort_keys=True) + '\n')
+        else:
+            stream.write(self.format(snapshot) + '\n')
+        stream.flush()
+
+    @staticmethod
+    def format(snapshot):
+        """Format a snapshot as one text line
+
+        :param snapshot: snapshot dict
+        :return: text line
+        """
+        if snapshot.get('final'):
+            label = 'total '
+            rate = '%.0f EPS' % snapshot['eps']
+        else:
+            label = 'report'
+            rate = '%.0f EPS, %.0f avg' % (snapshot.get('interval_eps', snapshot['eps']), snapshot['eps'])
+        errors = ','.join('%s=%d' % (name, snapshot['errors'][name]) for name in sorted(snapshot['errors']))
+        retries = snapshot.get('retries', {})
+        retries = ','.join('%s=%d' % (name, retries[name]) for name in sorted(retries))
+        return '%s %8.1fs sent %d (%s) bytes %d errors %s retries %s gen %.2fs send %.2fs wait %.2fs' % (
+            label, snapshot['elapsed'], snapshot['sent'], rate, snapshot['bytes'], errors or '0', retries or '0',
+            snapshot['gen_time'], snapshot['send_time'], snapshot['wait_time'])
@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.pacer
+~~~~~~~~~~~~~~
+This module provides the events-per-second pacing engine shared by the log senders.
+
+The schedule is absolute: the number of events allowed at any moment is the
+integral of the rate profile since start, so sleep jitter and slow loops never
+accumulate into drift. Events are released in small slices (see `slice_time`)
+instead of once per second, which keeps bursts within collector buffers.
+"""
+
+import time
+import logging
+log = logging.getLogger(__name__)
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def ramp_profile(rate, ramp_up=0, hold=None, ramp_down=0):
+    """Build a ramp-up, hold, ramp-down rate profile
+
+    :param rate: events per second to hold
+    :param ramp_up: seconds to go from 0 to rate
+    :param hold: seconds to hold rate, None holds forever
+    :param ramp_down: seconds to go from rate to 0 after hold
+    :return: profile list of (seconds since start, events per second) points
+    """
+    profile = [(0, 0 if ramp_up else rate)]
+    if ramp_up:
+        profile.append((ramp_up, rate))
+    if hold is not None:
+        profile.append((ramp_up + hold, rate))
+        if ramp_down:
+            profile.append((ramp_up + hold + ramp_down, 0))
+    return profile
+
+
+class Pacer(object):
+    def __init__(self, rate=0, profile=None, slice_time=0.01, max_lag=1.0):
+        """Pacer class init function
+
+        :param rate: constant events per second, 0 means unlimited
+        :param profile: list of (seconds since start, events per second) points, rate is linearly
+                        interpolated between points and the last rate is held after the last point
+        :param slice_time: smoothing slice in seconds, at most this much of the schedule is released at once
+        :param max_lag: seconds of backlog kept for catching up, older backlog is dropped from the schedule
+        """
+        if profile:
+            self._profile = sorted(profile)
+            if self._profile[0][0] > 0:
+                self._profile.insert(0, (0, self._profile[0][1]))
+        elif rate:
+            self._profile = [(0, rate)]
+        else:
+            self._profile = None
+        self._slice_time = slice_time
+        self._max_lag = max_lag
+        self._start = None
+        self._offset = 0.0
+        self._dropped = 0.0
+        self._sent = 0
+
+    @property
+    def unlimited(self):
+        return self._profile is None
+
+    @property
+    def sent(self):
+        return self._sent
+
+    def start(self):
+        """Start the schedule, called implicitly by the first acquire
+
+        :return: None
+        """
+        self._start = _clock()
+        self._offset = 0.0
+        self._dropped = 0.0
+        self._sent = 0
+
+    def rate_at(self, elapsed):
+        """Get requested rate at a moment
+
+        :param elapsed: seconds since start
+        :return: events per second
+        """
+        if self._profile is None:
+            return 0
+        prev_t, prev_r = self._profile[0]
+        for t, r in self._profile[1:]:
+            if elapsed < t:
+                return prev_r + (r - prev_r) * (elapsed - prev_t) / float(t - prev_t)
+            prev_t, prev_r = t, r
+        return prev_r
+
+    def allowed_at(self, elapsed):
+        """Get number of events the schedule allows up to a moment
+
+        :param elapsed: seconds since start
+        :return: events allowed, float
+        """
+        if self._profile is None:
+            return float('inf')
+        total = 0.0
+        prev_t, prev_r = self._profile[0]
+        for t, r in self._profile[1:]:
+            if elapsed <= t:
+                cur_r = prev_r + (r - prev_r) * (elapsed - prev_t) / float(t - prev_t)
+                return total + (prev_r + cur_r) * (elapsed - prev_t) / 2.0
+            total += (prev_r + r) * (t - prev_t) / 2.0
+            prev_t, prev_r = t, r
+        return total + prev_r * (elapsed - prev_t)
+
+    def acquire(self, count=1):
+        """Block until count more events are allowed by the schedule
+
+        :param count: events about to be sent
+        :return: False if the profile has ramped down to 0 and nothing more will be allowed, else True
+        """
+        if self._start is None:
+            self.start()
+        if self._profile is not None:
+            while True:
+                debt = self._sent + count - self._allowed_now()
+                if debt <= 0:
+                    break
+                if self._expired():
+                    return False
+                self._sleep_for(debt)
+        self._sent += count
+        return True
+
+    def budget(self, limit):
+        """Block until at least one event is allowed, for batched senders
+
+        :param limit: max events wanted
+        :return: events the caller may send now, at most limit and one slice worth,
+                 0 if the profile has ramped down to 0 and nothing more will be allowed
+        """
+        if self._start is None:
+            self.start()
+        if self._profile is None:
+            self._sent += limit
+            return limit
+        while True:
+            allowed = int(self._allowed_now() - self._sent)
+            if allowed > 0:
+                break
+            if self._expired():
+                return 0
+            self._sleep_for(1)
+        elapsed = _clock() - self._start - self._offset
+        slice_count = max(1, int(self.rate_at(elapsed) * self._slice_time))
+        count = min(limit, allowed, slice_count)
+        self._sent += count
+        return count
+
+    def _allowed_now(self):
+        elapsed = _clock() - self._start
+        allowed = self.allowed_at(elapsed - self._offset)
+        # drop backlog older than max_lag, a stalled sender must not flood afterwards
+        backlog = allowed - self._sent
+        rate = self.rate_at(elapsed - self._offset)
+        keep = max(rate * self._max_lag, 1.0)
+        if rate > 0 and backlog > keep:
+            # move the schedule back to where keep events are left, found on the profile itself,
+            # dividing by the current rate overshoots while it ramps down to 0
+            low, high = 0.0, elapsed - self._offset
+            for i in range(50):
+                middle = (low + high) / 2.0
+                if self.allowed_at(middle) < self._sent + keep:
+                    low = middle
+                else:
+                    high = middle
+            allowed = self.allowed_at(high)
+            self._dropped += backlog - (allowed - self._sent)
+            self._offset = elapsed - high
+        return allowed
+
+    def _expired(self):
+        last_t, last_r = self._profile[-1]
+        return last_r <= 0 and _clock() - self._start - self._offset >= last_t
+
+    def _sleep_for(self, debt):
+        elapsed = _clock() - self._start
+        rate = self.rate_at(elapsed - self._offset)
+        if rate > 0:
+            time.sleep(min(self._slice_time, max(debt / rate, 0.0005)))
+        else:
+            time.sleep(self._slice_time)
+
+    def report(self):
+        """Get requested versus achieved rate
+
+        The backlog dropped after stalls (see max_lag) is left out of requested and reported
+        as dropped, so requested_rate compares with achieved_rate on the schedule actually kept.
+
+        :return: report dict, keys: sent, elapsed, requested, requested_rate, achieved_rate, dropped (events
+                 dropped from the schedule), dropped_time (seconds of schedule dropped)
+        """
+        if self._start is None:
+            elapsed = 0.0
+        else:
+            elapsed = _clock() - self._start
+        requested = self.allowed_at(elapsed - self._offset) if self._profile is not None else None
+        return {
+            'sent': self._sent,
+            'elapsed': elapsed,
+            'requested': requested,
+            'dropped': self._dropped,
+            'dropped_time': self._offset,
+            'requested_rate': requested / elapsed if (requested is not None and elapsed) else None,
+            'achieved_rate': self._sent / elapsed if elapsed else 0.0,
+        }
@@ -1,6 +1,8 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .cache import lookup, invalidate
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 
@@ -90,8 +92,7 @@ class Role(object):
         :return: role info dict
         """
 
-        role_list = self.list()
-        return [role for role in role_list if role['name'] == name][0]
+        return lookup(self._session, 'Role', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create role by data
@@ -102,6 +103,7 @@ class Role(object):
         uri = self._console_url + '/api/node/system/roles'
 
         response = self._session.post(uri, json=data)
+        invalidate(self._session, 'Role')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -156,6 +158,7 @@ class Role(object):
                 # other kwargs handler
 
         response = self._session.put(uri, json=update_data)
+        invalidate(self._session, 'Role')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -170,20 +173,16 @@ class Role(object):
 
         uri = self._console_url + '/api/node/system/roles/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'Role')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all roles
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        role_list = self.list()
-        for role in role_list:
-            try:
-                self.delete(role['id'])
-            except Exception as ex:
-                print 'delete role exception', role['id']
+        return BulkExecutor(self, workers).delete([role['id'] for role in self.list()])
 
@@ -1,20 +1,195 @@
 # -*- coding: utf-8 -*-
 
 import socket
+import errno
+import gzip
+import io
+import re
 import time
+import ctypes
+import ctypes.util
+from array import array
+from itertools import islice
+
+from .pacer import Pacer
+from .metrics import SenderMetrics
+
 import logging
 log = logging.getLogger(__name__)
 
 
+class _IOVec(ctypes.Structure):
+    _fields_ = [('iov_base', ctypes.c_void_p),
+                ('iov_len', ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [('msg_name', ctypes.c_void_p),
+                ('msg_namelen', ctypes.c_uint32),
+                ('msg_iov', ctypes.POINTER(_IOVec)),
+                ('msg_iovlen', ctypes.c_size_t),
+                ('msg_control', ctypes.c_void_p),
+                ('msg_controllen', ctypes.c_size_t),
+                ('msg_flags', ctypes.c_int)]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [('msg_hdr', _MsgHdr),
+                ('msg_len', ctypes.c_uint)]
+
+
+# sendmmsg(2) pushes a whole burst of datagrams in one syscall, Linux only.
+# The iovec table is filled from an array of (address, length) pairs, so the
+# array item size has to match the native pointer size.
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _sendmmsg = _libc.sendmmsg
+    _sendmmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MMsgHdr), ctypes.c_uint, ctypes.c_int]
+    _sendmmsg.restype = ctypes.c_int
+    if array('L').itemsize != ctypes.sizeof(ctypes.c_size_t):
+        _sendmmsg = None
+except (OSError, AttributeError, TypeError):
+    _sendmmsg = None
+
+# sendmsg(2) gathers many records into one stream write, used by spool replay over tcp
+try:
+    _sendmsg = _libc.sendmsg
+    _sendmsg.argtypes = [ctypes.c_int, ctypes.POINTER(_MsgHdr), ctypes.c_int]
+    _sendmsg.restype = ctypes.c_ssize_t
+    if array('L').itemsize != ctypes.sizeof(ctypes.c_size_t):
+        _sendmsg = None
+except (NameError, AttributeError, TypeError):
+    _sendmsg = None
+
+_IOV_MAX = 1024
+
+# largest payload of one udp datagram, longer lines are skipped by send_file
+_MAX_DATAGRAM = 65507
+
+# a msg rejected with these is sent again after a short backoff, counted as a retry,
+# and dropped as an error once _RETRY_LIMIT attempts failed
+_RETRY_ERRNO = (errno.ENOBUFS, errno.EAGAIN)
+_RETRY_LIMIT = 50
+_RETRY_DELAY = 0.0005
+_RETRY_MAX_DELAY = 0.05
+# a msg rejected with these is counted as an error and dropped, the burst goes on;
+# ECONNREFUSED is the icmp port unreachable of a connected udp socket, the sink is down
+_DROP_ERRNO = (errno.EMSGSIZE, errno.ECONNREFUSED)
+
+# udp: one datagram per msg, tcp: newline framed stream, tcp_octet: RFC 6587 octet counting
+Transport = ['udp', 'tcp', 'tcp_octet']
+
+
+def _backoff(attempt):
+    # give the socket buffer time to drain instead of spinning on the syscall
+    time.sleep(min(_RETRY_DELAY * 2 ** attempt, _RETRY_MAX_DELAY))
+
+
+def frame_msg(msg, transport):
+    """Frame msg for a stream transport
+
+    :param msg: encoded msg
+    :param transport: refer to Transport
+    :return: framed msg, msg itself for udp
+    """
+    if transport == 'tcp_octet':
+        return str(len(msg)).encode('ascii') + b' ' + msg
+    if transport == 'udp' or msg.endswith(b'\n'):
+        return msg
+    return msg + b'\n'
+
+
+def open_log(path):
+    """Open a log file for streaming, gzip is detected by content, not by name
+
+    :param path: file path
+    :return: binary file object, iterating it yields lines
+    """
+    with open(path, 'rb') as pf:
+        magic = pf.read(2)
+    if magic == b'\x1f\x8b':
+        return io.BufferedReader(gzip.GzipFile(path, 'rb'), 1024 * 1024)
+    return open(path, 'rb')
+
+
+def time_parser(time_format='%Y-%m-%d %H:%M:%S'):
+    """Build a log time parser, the last parsed value is cached
+
+    :param time_format: strptime format, or epoch / epoch_ms for numeric times
+    :return: callable parse(value) returning epoch seconds, raising ValueError if malformed
+    """
+    cache = {}
+
+    def parse(value):
+        if value in cache:
+            return cache[value]
+        if time_format == 'epoch':
+            stamp = float(value)
+        elif time_format == 'epoch_ms':
+            stamp = float(value) / 1000.0
+        else:
+            stamp = time.mktime(time.strptime(value.decode('ascii'), time_format))
+        # consecutive lines mostly share the second, one entry is enough
+        cache.clear()
+        cache[value] = stamp
+        return stamp
+    return parse
+
+
 class Sender(object):
-    def __init__(self, host, port=514):
+    def __init__(self, host, port=514, rate=0, pacer=None, transport='udp',
+                 buffer_size=256 * 1024, reconnect_retries=5, metrics=None, tagger=None):
         """Sender class init function
         
         :param host: host server ip
         :param port: host port, default is 514, SYSLOG port
+        :param rate: target events per second, default is 0, unpaced
+        :param pacer: Pacer instance, overrides rate, e.g. for ramp profiles
+        :param transport: refer to Transport, default is udp
+        :param buffer_size: tcp write buffer size, framed msgs are written once this much is queued
+        :param reconnect_retries: tcp reconnect attempts before giving up, with doubling backoff
+        :param metrics: SenderMetrics instance, e.g. with periodic reports, default is a silent one
+        :param tagger: SequenceTagger, every msg is tagged with run id and sequence number as it is sent,
+                       or written by write_spool; replay sends spooled msgs as they are
         """
+        assert transport in Transport
         self._addr = (host, port)
-        self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._pacer = pacer or Pacer(rate)
+        self._metrics = metrics or SenderMetrics()
+        self._tagger = tagger
+        self._transport = transport
+        self._buffer_size = buffer_size
+        self._reconnect_retries = reconnect_retries
+        self._write_buffer = []
+        self._write_buffered = 0
+        if transport == 'udp':
+            self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        else:
+            self._socket = None
+        self._connected = False
+        self._mmsg_size = 0
+        self._mmsg_iov = None
+        self._mmsg_hdrs = None
+        self._iov = None
+        self._msghdr = None
+        self._written = 0
+        self.skipped = 0
+
+    @property
+    def pacer(self):
+        return self._pacer
+
+    @pacer.setter
+    def pacer(self, value):
+        self._pacer = value
+
+    @property
+    def metrics(self):
+        return self._metrics
+
+    @property
+    def tagger(self):
+        return self._tagger
 
     def get_local_ip(self):
         """Get local IP
@@ -30,25 +205,482 @@ class Sender(object):
         :param count: send count
         :return: None
         """
+        self._send(msg, count)
+        self.flush()
+
+    def _send(self, msg, count):
+        tag = self._tagger.tag if self._tagger is not None else None
+        if self._transport != 'udp':
+            frame = self._frame(msg)
+            for i in range(count):
+                if not self._pacer.acquire():
+                    return
+                if tag is not None:
+                    frame = self._frame(tag(msg))
+                self._write_buffer.append(frame)
+                self._write_buffered += len(frame)
+                self._metrics.add_sent(1, len(frame))
+                if self._write_buffered >= self._buffer_size:
+                    self.flush()
+            return
+
+        sock = self._socket
+        if self._connected:
+            send = sock.send
+        else:
+            send = lambda data: sock.sendto(data, self._addr)
+        data = msg
         for i in range(count):
-            try:
-                self._socket.sendto(msg, self._addr)
-            except Exception:
-                raise Exception
+            if not self._pacer.acquire():
+                return
+            if tag is not None:
+                data = tag(msg)
+            starttime = time.time()
+            size = self._send_datagram(send, data)
+            if size is not None:
+                self._metrics.add_sent(1, size, time.time() - starttime)
+
+    def send_file(self, file, loops=1, duration=None, speed=None, time_pattern=None,
+                  time_format='%Y-%m-%d %H:%M:%S', batch_size=1024):
+        """Replay a log file to host server, one msg per line
+
+        The file is streamed, plain or gzip, memory does not grow with its size.
+        Blank lines, lines too long for a datagram and, when replaying the original
+        timing, lines without a parsable time are skipped.
 
-    def send_file(self, file, count=1):
-        """Send file content to host server
-        
         :param file: file path
-        :param count: send count per line
+        :param loops: times to send the whole file, None loops until duration ends
+        :param duration: seconds to send, default is no limit
+        :param speed: replay the original inter-arrival times, scaled by speed (2.0 is twice
+                      as fast), needs time_pattern; the pacer is not used then.
+                      Default is None, lines are sent as fast as the pacer allows
+        :param time_pattern: regex, group 1 is the line time, e.g. r'stat_time:(\S+ \S+)'
+        :param time_format: refer to time_parser
+        :param batch_size: msgs per burst
+        :return: tuple of sent msg count and sent bytes
+        """
+        assert not speed or time_pattern, 'speed needs time_pattern'
+        deadline = time.time() + duration if duration else None
+        self.skipped = 0
+        lines = self._file_lines(file, loops, deadline)
+        if speed:
+            if not isinstance(time_pattern, bytes):
+                time_pattern = time_pattern.encode('ascii')
+            sent = self._send_timed(lines, speed, re.compile(time_pattern), time_parser(time_format),
+                                    batch_size, deadline)
+        else:
+            sent = self.send_batch((line for loop, line in lines), batch_size)
+        if self.skipped:
+            log.warning('%s: skipped %d malformed lines', file, self.skipped)
+        return sent
+
+    def _file_lines(self, file, loops, deadline):
+        max_length = _MAX_DATAGRAM if self._transport == 'udp' else None
+        loop = 0
+        while loops is None or loop < loops:
+            loop += 1
+            with open_log(file) as pf:
+                for line in pf:
+                    if deadline is not None and time.time() >= deadline:
+                        return
+                    line = line.strip()
+                    if not line or (max_length and len(line) > max_length):
+                        self.skipped += 1
+                        continue
+                    yield loop, line
+
+    def _send_timed(self, lines, speed, pattern, parse, batch_size, deadline):
+        tag = self._tagger.tag if self._tagger is not None else None
+        self._connect()
+        sent_count = 0
+        sent_bytes = 0
+        batch = []
+        current = None
+        first = None
+        base = 0.0
+        due = 0.0
+        for loop, line in lines:
+            match = pattern.search(line)
+            try:
+                stamp = parse(match.group(1))
+            except (AttributeError, ValueError):
+                self.skipped += 1
+                continue
+            if loop != current:
+                # every loop replays the file timeline again, right after the previous one
+                current = loop
+                first = stamp
+                base = max(due, time.time())
+            due = base + (stamp - first) / speed
+            if deadline is not None and due >= deadline:
+                break
+            wait = due - time.time()
+            if wait > 0 or len(batch) >= batch_size:
+                if batch:
+                    count, size = self._send_burst(batch)
+                    sent_count += count
+                    sent_bytes += size
+                    batch = []
+                if wait > 0:
+                    time.sleep(wait)
+                    self._metrics.add_wait(wait)
+            batch.append(tag(line) if tag is not None else line)
+        if batch:
+            count, size = self._send_burst(batch)
+            sent_count += count
+            sent_bytes += size
+        return sent_count, sent_bytes
+
+    def send_batch(self, msgs, batch_size=1024):
+        """Send pre-encoded msgs to host server in bursts
+
+        The socket is connected to the host once, then msgs are flushed
+        batch_size at a time, by one sendmmsg call per batch where available,
+        or one framed write per batch over tcp. With a pacer the bursts are cut down to what the schedule allows.
+
+        :param msgs: list or iterator of encoded msgs
+        :param batch_size: msgs flushed per burst
+        :return: tuple of sent msg count and sent bytes, msgs dropped by the socket are not counted
+        """
+        assert batch_size > 0
+        self._connect()
+        if self._tagger is not None:
+            msgs = self._tagger.tag_all(msgs)
+
+        clock = time.time
+        metrics = self._metrics
+        sent_count = 0
+        sent_bytes = 0
+        if self._pacer.unlimited:
+            batch = []
+            starttime = clock()
+            for msg in msgs:
+                batch.append(msg)
+                if len(batch) >= batch_size:
+                    metrics.add_gen(clock() - starttime)
+                    count, size = self._send_burst(batch)
+                    sent_count += count
+                    sent_bytes += size
+                    batch = []
+                    starttime = clock()
+            metrics.add_gen(clock() - starttime)
+            if batch:
+                count, size = self._send_burst(batch)
+                sent_count += count
+                sent_bytes += size
+            return sent_count, sent_bytes
+
+        msgs = iter(msgs)
+        pending = []
+        while True:
+            if not pending:
+                starttime = clock()
+                pending = list(islice(msgs, batch_size))
+                metrics.add_gen(clock() - starttime)
+                if not pending:
+                    break
+            starttime = clock()
+            count = self._pacer.budget(len(pending))
+            metrics.add_wait(clock() - starttime)
+            if not count:
+                break
+            batch, pending = pending[:count], pending[count:]
+            count, size = self._send_burst(batch)
+            sent_count += count
+            sent_bytes += size
+        return sent_count, sent_bytes
+
+    def write_spool(self, path, msgs, batch_size=1024):
+        """Write msgs to a spool file instead of sending them, framed for this sender transport
+
+        :param path: spool file path, overwritten
+        :param msgs: list or iterator of encoded msgs
+        :param batch_size: records joined per file write
+        :return: tuple of written msg count and framed bytes
+        """
+        from .spool import SpoolWriter
+        if self._tagger is not None:
+            msgs = self._tagger.tag_all(msgs)
+        with SpoolWriter(path, self._transport) as writer:
+            return writer.write_batch(msgs, batch_size)
+
+    def replay(self, spool, loops=1, batch_size=1024, duration=None):
+        """Send a spool file straight from its memory map
+
+        Records are handed to sendmmsg (udp) or sendmsg (tcp) as (address, length)
+        pairs into the map, no msg is copied. The pacer applies as in send_batch.
+        Tags are the ones written with the spool, each loop sends the same sequence numbers again.
+
+        :param spool: spool file path, or Spool instance
+        :param loops: times to send the whole spool, None loops until duration or the pacer profile ends
+        :param batch_size: msgs per burst
+        :param duration: seconds to send, default is no limit
+        :return: tuple of sent msg count and sent bytes
+        """
+        from .spool import Spool
+        assert batch_size > 0
+        owned = not isinstance(spool, Spool)
+        if owned:
+            spool = Spool(spool)
+        try:
+            assert spool.transport == self._transport, 'spool framed for %s, sender is %s' % (
+                spool.transport, self._transport)
+            self._connect()
+            deadline = time.time() + duration if duration else None
+            sent_count = 0
+            sent_bytes = 0
+            loop = 0
+            while loops is None or loop < loops:
+                loop += 1
+                offset = spool.start
+                while offset < spool.end:
+                    starttime = time.time()
+                    count = self._pacer.budget(batch_size)
+                    self._metrics.add_wait(time.time() - starttime)
+                    if not count or (deadline is not None and time.time() >= deadline):
+                        return sent_count, sent_bytes
+                    starttime = time.time()
+                    table, offset = spool.scan(offset, count)
+                    self._metrics.add_gen(time.time() - starttime)
+                    starttime = time.time()
+                    count, size = self._flush_table(table, spool)
+                    self._metrics.add_sent(count, size, time.time() - starttime)
+                    sent_count += count
+                    sent_bytes += size
+            return sent_count, sent_bytes
+        finally:
+            if owned:
+                spool.close()
+
+    def flush(self):
+        """Write queued tcp msgs to host server
+
         :return: None
         """
-        with open(file) as pf:
-            for line in pf:
-                line = line.strip()
-                if not line:
+        if self._write_buffer:
+            frames = self._write_buffer
+            self._write_buffer = []
+            self._write_buffered = 0
+            self._write(frames)
+
+    def _frame(self, msg):
+        return frame_msg(msg, self._transport)
+
+    def _connect(self):
+        if self._connected:
+            return
+        if self._transport == 'udp':
+            self._socket.connect(self._addr)
+            self._connected = True
+            return
+
+        delay = 0.1
+        for attempt in range(self._reconnect_retries + 1):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4 * 1024 * 1024)
+            try:
+                sock.connect(self._addr)
+            except socket.error as ex:
+                sock.close()
+                if attempt == self._reconnect_retries:
+                    raise
+                log.warning('connect %s:%s failed: %s, retry in %.1fs', self._addr[0], self._addr[1], ex, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            self._socket = sock
+            self._connected = True
+            return
+
+    def _disconnect(self):
+        try:
+            self.flush()
+            self._socket.close()
+        except:
+            pass
+        self._socket = None
+        self._connected = False
+
+    def _send_burst(self, batch):
+        starttime = time.time()
+        count, size = self._flush(batch)
+        self._metrics.add_sent(count, size, time.time() - starttime)
+        return count, size
+
+    def _write(self, frames):
+        # a broken stream is reconnected and a new stream starts at a record boundary, like
+        # _flush_table: the record cut short by the break is written again whole, the ones before it are not
+        data = b''.join(frames)
+        view = memoryview(data)
+        start = 0
+        for attempt in range(self._reconnect_retries + 1):
+            self._connect()
+            written = start
+            try:
+                while written < len(data):
+                    written += self._socket.send(view[written:])
+                return len(data)
+            except socket.error as ex:
+                self._metrics.add_error(ex.errno)
+                self._disconnect()
+                if attempt == self._reconnect_retries:
+                    raise
+                log.warning('write to %s:%s failed: %s, reconnecting', self._addr[0], self._addr[1], ex)
+            start = 0
+            for frame in frames:
+                if start + len(frame) > written:
                     break
-                self.send_string(line, count)
+                start += len(frame)
+
+    def _flush(self, batch):
+        if self._transport != 'udp':
+            return len(batch), self._write([self._frame(msg) for msg in batch])
+
+        if _sendmmsg is not None:
+            return self._flush_mmsg(batch)
+
+        send = self._socket.send
+        send_datagram = self._send_datagram
+        sent_count = 0
+        sent_bytes = 0
+        for msg in batch:
+            size = send_datagram(send, msg)
+            if size is not None:
+                sent_count += 1
+                sent_bytes += size
+        return sent_count, sent_bytes
+
+    def _send_datagram(self, send, data):
+        # one udp msg under the _RETRY_ERRNO/_DROP_ERRNO policy, None when it was dropped
+        attempt = 0
+        while True:
+            try:
+                return send(data)
+            except socket.error as ex:
+                if ex.errno in _RETRY_ERRNO and attempt < _RETRY_LIMIT:
+                    self._metrics.add_retry(ex.errno)
+                    _backoff(attempt)
+                    attempt += 1
+                    continue
+                self._metrics.add_error(ex.errno)
+                if ex.errno in _DROP_ERRNO or ex.errno in _RETRY_ERRNO:
+                    return None
+                raise
+
+    def _flush_mmsg(self, batch):
+        # one buffer for the whole burst, iovecs point into it
+        buf = ctypes.create_string_buffer(b''.join(batch))
+        pos = ctypes.addressof(buf)
+        iov_table = array('L')
+        append = iov_table.append
+        for msg in batch:
+            length = len(msg)
+            append(pos)
+            append(length)
+            pos += length
+        return self._sendmmsg_table(iov_table)
+
+    def _sendmmsg_table(self, iov_table):
+        count = len(iov_table) // 2
+        if count > self._mmsg_size:
+            self._mmsg_iov = (_IOVec * count)()
+            self._mmsg_hdrs = (_MMsgHdr * count)()
+            for i in range(count):
+                self._mmsg_hdrs[i].msg_hdr.msg_iov = ctypes.pointer(self._mmsg_iov[i])
+                self._mmsg_hdrs[i].msg_hdr.msg_iovlen = 1
+            self._mmsg_size = count
+        ctypes.memmove(self._mmsg_iov, iov_table.buffer_info()[0], len(iov_table) * iov_table.itemsize)
+
+        fd = self._socket.fileno()
+        hdrs = self._mmsg_hdrs
+        sent_count = count
+        sent_bytes = sum(iov_table[1::2])
+        done = 0
+        attempt = 0
+        while done < count:
+            ret = _sendmmsg(fd, ctypes.byref(hdrs[done]), count - done, 0)
+            if ret < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in _RETRY_ERRNO and attempt < _RETRY_LIMIT:
+                    self._metrics.add_retry(err)
+                    _backoff(attempt)
+                    attempt += 1
+                    continue
+                self._metrics.add_error(err)
+                if err in _DROP_ERRNO or err in _RETRY_ERRNO:
+                    # the msg at done was rejected, or kept failing, skip it
+                    sent_count -= 1
+                    sent_bytes -= iov_table[2 * done + 1]
+                    done += 1
+                    attempt = 0
+                    continue
+                raise socket.error(err, errno.errorcode.get(err, 'sendmmsg failed'))
+            done += ret
+            attempt = 0
+        return sent_count, sent_bytes
+
+    def _flush_table(self, iov_table, spool):
+        if self._transport == 'udp':
+            if _sendmmsg is not None:
+                return self._sendmmsg_table(iov_table)
+            return self._flush([spool.read(iov_table[i], iov_table[i + 1]) for i in range(0, len(iov_table), 2)])
+
+        sent_count = len(iov_table) // 2
+        sent_bytes = sum(iov_table[1::2])
+        if _sendmsg is None:
+            self._write([spool.read(iov_table[i], iov_table[i + 1]) for i in range(0, len(iov_table), 2)])
+            return sent_count, sent_bytes
+        # same reconnect policy as _write, but a new stream starts at a record boundary:
+        # the record cut short by the break is written again whole, the ones before it are not
+        self._written = 0
+        for attempt in range(self._reconnect_retries + 1):
+            self._connect()
+            try:
+                self._writev(iov_table, self._written)
+                return sent_count, sent_bytes
+            except socket.error as ex:
+                self._metrics.add_error(ex.errno)
+                self._disconnect()
+                if attempt == self._reconnect_retries:
+                    raise
+                log.warning('write to %s:%s failed: %s, reconnecting', self._addr[0], self._addr[1], ex)
+
+    def _writev(self, iov_table, first=0):
+        # the table is left as it is, self._written counts the records fully written so far
+        if self._iov is None:
+            self._iov = (_IOVec * _IOV_MAX)()
+            self._msghdr = _MsgHdr()
+            self._msghdr.msg_iov = ctypes.cast(self._iov, ctypes.POINTER(_IOVec))
+        fd = self._socket.fileno()
+        address, length = iov_table.buffer_info()
+        itemsize = iov_table.itemsize
+        pairs = length // 2
+        offset = 0
+        while first < pairs:
+            count = min(pairs - first, _IOV_MAX)
+            ctypes.memmove(self._iov, address + 2 * first * itemsize, 2 * count * itemsize)
+            if offset:
+                self._iov[0].iov_base += offset
+                self._iov[0].iov_len -= offset
+            self._msghdr.msg_iovlen = count
+            ret = _sendmsg(fd, ctypes.byref(self._msghdr), 0)
+            if ret < 0:
+                err = ctypes.get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err == errno.EAGAIN:
+                    _backoff(0)
+                    continue
+                raise socket.error(err, errno.errorcode.get(err, 'sendmsg failed'))
+            # skip fully written records, remember how far into a partially written one
+            ret += offset
+            while first < pairs and ret >= iov_table[2 * first + 1]:
+                ret -= iov_table[2 * first + 1]
+                first += 1
+                self._written = first
+            offset = ret
 
     def __del__(self):
         """Sender class destruct function
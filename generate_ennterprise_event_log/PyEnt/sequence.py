@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.sequence
+~~~~~~~~~~~~~~
+This module provides sequence tagging of generated msgs and the loss check of a tagged run.
+
+A SequenceTagger writes <run id>-<n> into a field of every msg, n counting up from 0.
+The field is replaced when the msg already has it, e.g. an unused WAF field the parser
+maps to an event attribute, otherwise it is appended. The same tag is parsed by the
+loopback sink and by SequenceCheck, which collects the tags found in Event.list results
+slice by slice and reports missing ranges, duplicates and loss per time slice.
+"""
+
+import re
+import uuid
+
+import logging
+log = logging.getLogger(__name__)
+
+DEFAULT_FIELD = 'pyent_seq'
+
+# kv: field<sep>value in a syslog line, json: "field": "value" in a json object
+Style = ['kv', 'json']
+
+
+def new_run_id():
+    """Generate a run id, hex so it never holds the - separating it from the sequence number
+
+    :return: 12 hex digit run id
+    """
+    return uuid.uuid4().hex[:12]
+
+
+def seq_pattern(field=DEFAULT_FIELD):
+    """Build the regex matching a tag in kv or json form
+
+    :param field: tag field name
+    :return: bytes regex, groups stream (run id, optional) and seq
+    """
+    if not isinstance(field, bytes):
+        field = field.encode('ascii')
+    return re.escape(field) + br'["\']?\s*[=:]\s*["\']?(?:(?P<stream>[\w.]+)-)?(?P<seq>\d+)'
+
+
+class SequenceTagger(object):
+    def __init__(self, run_id=None, field=DEFAULT_FIELD, style='kv', sep='=', start=0):
+        """SequenceTagger class init function
+
+        :param run_id: run id, [A-Za-z0-9_.] only, default is new_run_id()
+        :param field: tag field name
+        :param style: refer to Style, default is kv
+        :param sep: kv separator, e.g. : for the WAF log, default is =
+        :param start: first sequence number
+        """
+        assert style in Style
+        self.run_id = run_id or new_run_id()
+        assert re.match(r'^[\w.]+$', self.run_id), 'Bad run id %s' % self.run_id
+        self.field = field
+        self.style = style
+        self.sep = sep
+        self.next_seq = start
+        field = field.encode('ascii')
+        if style == 'kv':
+            self._prefix = field + sep.encode('ascii')
+            self._existing = re.compile(re.escape(self._prefix) + br'\S*')
+        else:
+            self._prefix = b'"' + field + b'": "'
+            self._existing = re.compile(br'"' + re.escape(field) + br'"\s*:\s*("(?:[^"\\]|\\.)*"|[^,}\s]*)')
+
+    def stream(self, index):
+        """Get a tagger for one of several parallel senders, e.g. fanout workers
+
+        :param index: sender index
+        :return: SequenceTagger with run id <run id>.<index>, counting from 0
+        """
+        return SequenceTagger('%s.%d' % (self.run_id, index), self.field, self.style, self.sep)
+
+    def value(self):
+        """Take the next tag value
+
+        :return: <run id>-<n>
+        """
+        value = '%s-%d' % (self.run_id, self.next_seq)
+        self.next_seq += 1
+        return value
+
+    def tag(self, msg):
+        """Tag one msg with the next sequence number
+
+        :param msg: encoded msg
+        :return: tagged msg
+        """
+        value = self.value().encode('ascii')
+        if self.style == 'kv':
+            item = self._prefix + value
+            tagged, found = self._existing.subn(lambda m: item, msg, 1)
+            return tagged if found else msg + b' ' + item
+        item = self._prefix + value + b'"'
+        tagged, found = self._existing.subn(lambda m: item, msg, 1)
+        if found:
+            return tagged
+        end = msg.rindex(b'}')
+        head = msg[:end].rstrip()
+        return head + (b', ' if not head.endswith(b'{') else b'') + item + msg[end:]
+
+    def tag_all(self, msgs):
+        """Tag msgs as they are pulled
+
+        :param msgs: list or iterator of encoded msgs
+        :return: iterator of tagged msgs
+        """
+        tag = self.tag
+        for msg in msgs:
+            yield tag(msg)
+
+
+def _strings(value):
+    if isinstance(value, dict):
+        for item in value.values():
+            for text in _strings(item):
+                yield text
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            for text in _strings(item):
+                yield text
+    elif isinstance(value, bytes):
+        yield value
+    elif isinstance(value, type(u'')):
+        yield value.encode('utf-8')
+
+
+class SequenceCheck(object):
+    def __init__(self, run_id, field=DEFAULT_FIELD, first_seq=0):
+        """SequenceCheck class init function
+
+        :param run_id: run id to check, fanout streams <run id>.<n> are included
+        :param field: tag field name
+        :param first_seq: first sequence number of every stream
+        """
+        self.run_id = run_id
+        self.first_seq = first_seq
+        self._pattern = re.compile(seq_pattern(field))
+        self._slices = []
+        self._seen = {}
+
+    def add_slice(self, start, end, records):
+        """Collect the tags of one time slice
+
+        :param start: slice start
+        :param end: slice end
+        :param records: records found in the slice, e.g. Event.list rows, every string in them is searched
+        :return: tags found
+        """
+        index = len(self._slices)
+        item = {'start': start, 'end': end, 'received': 0, 'duplicates': 0, 'missing': 0}
+        self._slices.append(item)
+        run_id = self.run_id
+        found = 0
+        for record in records:
+            for text in _strings(record):
+                match = self._pattern.search(text)
+                if match is None:
+                    continue
+                stream = (match.group('stream') or b'').decode('ascii')
+                if stream != run_id and not stream.startswith(run_id + '.'):
+                    continue
+                seen = self._seen.setdefault(stream, {})
+                seq = int(match.group('seq'))
+                item['received'] += 1
+                found += 1
+                if seq in seen:
+                    item['duplicates'] += 1
+                    seen[seq][0] += 1
+                else:
+                    seen[seq] = [1, index]
+                break
+        return found
+
+    def report(self, sent=None, ranges=100):
+        """Get the loss report
+
+        A missing range is counted in the slice of the msg received right before it,
+        missing msgs at the head of a stream in the slice of its first msg.
+
+        :param sent: msgs sent, an int for a single stream or a dict of stream to count, the tail
+                     after the last received msg is missing only when this is given
+        :param ranges: max missing ranges listed per stream
+        :return: dict, keys: run_id, received, unique, duplicates, missing, loss, streams (per stream
+                 counts and missing_ranges) and slices (start, end, received, duplicates, missing, loss)
+        """
+        slices = [dict(x) for x in self._slices]
+        streams = {}
+        if isinstance(sent, dict):
+            expected = sent
+        else:
+            expected = {self.run_id: sent} if sent is not None else {}
+        for stream in set(self._seen) | set(expected):
+            seen = self._seen.get(stream, {})
+            order = sorted(seen)
+            missing = 0
+            missing_ranges = []
+            previous = self.first_seq - 1
+            # a stream with nothing received is counted in the first slice
+            previous_slice = seen[order[0]][1] if order else (0 if slices else None)
+            tail = []
+            if expected.get(stream) is not None:
+                end = self.first_seq + expected[stream]
+                if not order or end > order[-1]:
+                    tail = [end]
+            for seq in order + tail:
+                if seq > previous + 1:
+                    gap = seq - previous - 1
+                    missing += gap
+                    if len(missing_ranges) < ranges:
+                        missing_ranges.append((previous + 1, seq - 1))
+                    if previous_slice is not None:
+                        slices[previous_slice]['missing'] += gap
+                previous = seq
+                if seq in seen:
+                    previous_slice = seen[seq][1]
+            unique = len(seen)
+            streams[stream] = {
+                'received': sum(x[0] for x in seen.values()),
+                'unique': unique,
+                'duplicates': sum(x[0] - 1 for x in seen.values()),
+                'missing': missing,
+                'loss': 100.0 * missing / (unique + missing) if unique + missing else 0.0,
+                'missing_ranges': missing_ranges,
+            }
+
+        for item in slices:
+            unique = item['received'] - item['duplicates']
+            item['loss'] = 100.0 * item['missing'] / (unique + item['missing']) if unique + item['missing'] else 0.0
+
+        unique = sum(x['unique'] for x in streams.values())
+        missing = sum(x['missing'] for x in streams.values())
+        return {
+            'run_id': self.run_id,
+            'received': sum(x['received'] for x in streams.values()),
+            'unique': unique,
+            'duplicates': sum(x['duplicates'] for x in streams.values()),
+            'missing': missing,
+            'loss': 100.0 * missing / (unique + missing) if unique + missing else 0.0,
+            'streams': streams,
+            'slices': slices,
+        }
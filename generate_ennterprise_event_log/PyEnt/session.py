@@ -20,6 +20,21 @@ def clean():
     return session
 
 
+def clone(session):
+    """Copy a logged in session, headers and cookies, for use from another thread
+
+    :param session: logged in session
+    :return: new session sharing the login token
+    """
+    # no with block, leaving it would close the copy before the caller gets it
+    copy = requests.Session()
+    copy.headers.update(session.headers)
+    copy.cookies.update(session.cookies)
+    copy.verify = session.verify
+    copy.hooks = dict((key, list(value)) for key, value in session.hooks.items())
+    return copy
+
+
 def login(console_url, username, password):
     user_agent = '{0}/{1}'.format(__title__, __version__)
 
@@ -0,0 +1,480 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.sink
+~~~~~~~~~~~~~~
+This module provides the loopback ingestion sink, a stand-in collector for end to end sender benchmarks.
+
+The sink listens on udp and tcp ports (syslog 514 and the NTA port 9293 by default), counts
+msgs and bytes per listener and, when msgs carry a sequence number, tracks loss,
+duplicates and reordering per stream. A stream is the run id embedded next to the
+sequence number, or the peer address if there is none; a tcp sender reconnecting with
+the same run id goes on with the same stream. Udp drops done by the kernel
+because the sink could not keep up are read from /proc/net/udp and reported apart,
+so a slow sink is not mistaken for a lossy sender.
+"""
+
+import bisect
+import os
+import re
+import socket
+import threading
+import time
+
+from .sequence import seq_pattern
+
+import logging
+log = logging.getLogger(__name__)
+
+# pyent_seq=<run>-<n> in syslog, "pyent_seq": "<run>-<n>" in json, as written by SequenceTagger
+SEQ_PATTERN = seq_pattern()
+
+# digits of an octet counting length prefix, longer is a framing error
+_MAX_OCTET_DIGITS = 10
+
+
+def udp_drops(sock):
+    """Get the kernel drop counter of a udp socket, Linux only
+
+    :param sock: bound udp socket
+    :return: datagrams dropped by the kernel, None if unknown
+    """
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        for path in ('/proc/net/udp', '/proc/net/udp6'):
+            with open(path) as f:
+                next(f)
+                for line in f:
+                    fields = line.split()
+                    if len(fields) > 12 and fields[9] == inode:
+                        return int(fields[12])
+    except (IOError, OSError, ValueError):
+        pass
+    return None
+
+
+class SequenceTracker(object):
+    def __init__(self, first=0, max_gaps=100000):
+        """SequenceTracker class init function
+
+        :param first: first sequence number the sender uses
+        :param max_gaps: missing ranges kept for late arrivals, the oldest are forgotten beyond it,
+                         a late msg of a forgotten range counts as duplicate
+        """
+        self.first = first
+        self.next = first
+        self.received = 0
+        self.missing = 0
+        self.duplicates = 0
+        self.reordered = 0
+        self._max_gaps = max_gaps
+        self._starts = []
+        self._ends = []
+
+    def add(self, seq):
+        """Record one received sequence number
+
+        :param seq: sequence number
+        :return: None
+        """
+        self.received += 1
+        if seq == self.next:
+            self.next += 1
+            return
+        if seq > self.next:
+            self._starts.append(self.next)
+            self._ends.append(seq)
+            self.missing += seq - self.next
+            self.next = seq + 1
+            if len(self._starts) > self._max_gaps:
+                del self._starts[0]
+                del self._ends[0]
+            return
+
+        # behind the head, either a late msg filling a gap or a duplicate
+        index = bisect.bisect_right(self._starts, seq) - 1
+        if index < 0 or seq >= self._ends[index]:
+            self.duplicates += 1
+            return
+        self.reordered += 1
+        self.missing -= 1
+        start, end = self._starts[index], self._ends[index]
+        if end - start == 1:
+            del self._starts[index]
+            del self._ends[index]
+        elif seq == start:
+            self._starts[index] = seq + 1
+        elif seq == end - 1:
+            self._ends[index] = seq
+        else:
+            self._ends[index] = seq
+            self._starts.insert(index + 1, seq + 1)
+            self._ends.insert(index + 1, end)
+
+    @property
+    def expected(self):
+        return self.next - self.first
+
+    @property
+    def loss(self):
+        """Missing share of expected msgs, in percent"""
+        return 100.0 * self.missing / self.expected if self.expected else 0.0
+
+    def missing_ranges(self, limit=None):
+        """Get missing sequence ranges
+
+        :param limit: max ranges, oldest first, default is all
+        :return: list of inclusive (first, last) tuples
+        """
+        ranges = [(start, end - 1) for start, end in zip(self._starts, self._ends)]
+        return ranges[:limit] if limit else ranges
+
+    def stats(self):
+        return {
+            'received': self.received,
+            'expected': self.expected,
+            'missing': self.missing,
+            'duplicates': self.duplicates,
+            'reordered': self.reordered,
+            'loss': self.loss,
+            'next': self.next,
+        }
+
+
+class _Counter(object):
+    """Counters owned by one receiving thread, summed by Sink.stats"""
+
+    def __init__(self):
+        self.received = 0
+        self.bytes = 0
+        self.framing_errors = 0
+
+
+class _Listener(object):
+    def __init__(self, sink, transport, sock):
+        self.sink = sink
+        self.transport = transport
+        self.socket = sock
+        self.addr = sock.getsockname()
+        self.counters = [_Counter()]
+        # stream -> SequenceTracker, shared by all connections of the listener, guarded by lock
+        self.sequences = {}
+        self.lock = threading.Lock()
+
+    def new_counter(self):
+        counter = _Counter()
+        with self.lock:
+            self.counters.append(counter)
+        return counter
+
+
+class Sink(object):
+    def __init__(self, host='0.0.0.0', udp_ports=(514, 9293), tcp_ports=(514, 9293), seq_pattern=SEQ_PATTERN,
+                 first_seq=0, rcvbuf=32 * 1024 * 1024):
+        """Sink class init function
+
+        :param host: listen address
+        :param udp_ports: udp ports, 0 picks a free port
+        :param tcp_ports: tcp ports, newline framed or octet counted (detected per connection)
+        :param seq_pattern: regex with a seq group and an optional stream group, None disables
+                            sequence tracking, which is the fastest setting
+        :param first_seq: first sequence number of every stream, earlier numbers count as duplicates
+        :param rcvbuf: socket receive buffer size
+        """
+        self._host = host
+        self._udp_ports = list(udp_ports)
+        self._tcp_ports = list(tcp_ports)
+        self._pattern = re.compile(seq_pattern) if seq_pattern else None
+        self._first_seq = first_seq
+        self._rcvbuf = rcvbuf
+        self._listeners = []
+        self._threads = []
+        self._drops_base = {}
+        self._last_report = None
+        self.running = False
+        self.started = None
+
+    @property
+    def addresses(self):
+        """Get bound addresses
+
+        :return: list of (transport, (host, port))
+        """
+        return [(x.transport, x.addr) for x in self._listeners]
+
+    def address(self, transport, index=0):
+        """Get the bound address of the index-th listener of a transport
+
+        :param transport: udp or tcp
+        :param index: listener index in the ports list
+        :return: (host, port)
+        """
+        return [x.addr for x in self._listeners if x.transport == transport][index]
+
+    def start(self):
+        """Bind all ports and receive in background threads
+
+        :return: self
+        """
+        self.running = True
+        for port in self._udp_ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, self._rcvbuf)
+            sock.bind((self._host, port))
+            sock.settimeout(0.2)
+            self._add_listener('udp', sock, self._serve_udp)
+        for port in self._tcp_ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            sock.bind((self._host, port))
+            sock.listen(64)
+            sock.settimeout(0.2)
+            self._add_listener('tcp', sock, self._serve_tcp)
+        self.reset()
+        return self
+
+    def stop(self):
+        """Stop receiving and close all sockets
+
+        :return: final stats, see stats()
+        """
+        self.running = False
+        for thread in self._threads:
+            thread.join()
+        stats = self.stats()
+        for listener in self._listeners:
+            listener.socket.close()
+        self._listeners = []
+        self._threads = []
+        return stats
+
+    def reset(self):
+        """Zero all counters and sequence state
+
+        :return: None
+        """
+        for listener in self._listeners:
+            with listener.lock:
+                for counter in listener.counters:
+                    counter.received = 0
+                    counter.bytes = 0
+                    counter.framing_errors = 0
+                listener.sequences = {}
+            if listener.transport == 'udp':
+                self._drops_base[listener.addr] = udp_drops(listener.socket)
+        self.started = time.time()
+        self._last_report = (self.started, 0)
+
+    def stats(self):
+        """Get receive stats
+
+        :return: dict, keys: elapsed, received, bytes, rate, bytes_rate, kernel_drops, framing_errors (tcp
+                 connections dropped for a malformed octet count), listeners and, with sequence tracking,
+                 streams, expected, missing, duplicates, reordered, loss
+        """
+        elapsed = time.time() - self.started if self.started else 0.0
+        total = {'received': 0, 'bytes': 0, 'expected': 0, 'missing': 0, 'duplicates': 0, 'reordered': 0,
+                 'streams': 0, 'kernel_drops': 0, 'framing_errors': 0}
+        listeners = []
+        for listener in self._listeners:
+            with listener.lock:
+                counters = list(listener.counters)
+                trackers = list(listener.sequences.values())
+            item = {'transport': listener.transport, 'port': listener.addr[1],
+                    'received': sum(x.received for x in counters), 'bytes': sum(x.bytes for x in counters),
+                    'framing_errors': sum(x.framing_errors for x in counters)}
+            if listener.transport == 'udp':
+                drops = udp_drops(listener.socket)
+                base = self._drops_base.get(listener.addr)
+                item['kernel_drops'] = drops - base if drops is not None and base is not None else None
+                total['kernel_drops'] += item['kernel_drops'] or 0
+            for tracker in trackers:
+                total['streams'] += 1
+                for key in ('expected', 'missing', 'duplicates', 'reordered'):
+                    total[key] += getattr(tracker, key)
+            total['received'] += item['received']
+            total['bytes'] += item['bytes']
+            total['framing_errors'] += item['framing_errors']
+            listeners.append(item)
+
+        stats = {
+            'elapsed': elapsed,
+            'received': total['received'],
+            'bytes': total['bytes'],
+            'rate': total['received'] / elapsed if elapsed else 0.0,
+            'bytes_rate': total['bytes'] / elapsed if elapsed else 0.0,
+            'kernel_drops': total['kernel_drops'],
+            'framing_errors': total['framing_errors'],
+            'listeners': listeners,
+        }
+        if self._pattern is not None:
+            for key in ('streams', 'expected', 'missing', 'duplicates', 'reordered'):
+                stats[key] = total[key]
+            stats['loss'] = 100.0 * total['missing'] / total['expected'] if total['expected'] else 0.0
+        return stats
+
+    def sequences(self):
+        """Get the sequence trackers of all streams
+
+        :return: dict of (transport, port, stream) to SequenceTracker
+        """
+        result = {}
+        for listener in self._listeners:
+            with listener.lock:
+                for stream, tracker in listener.sequences.items():
+                    result[(listener.transport, listener.addr[1], stream)] = tracker
+        return result
+
+    def report(self):
+        """Get stats with the receive rate since the previous report
+
+        :return: stats dict plus interval_rate
+        """
+        stats = self.stats()
+        now = time.time()
+        last_time, last_received = self._last_report
+        stats['interval_rate'] = (stats['received'] - last_received) / (now - last_time) if now > last_time else 0.0
+        self._last_report = (now, stats['received'])
+        return stats
+
+    @staticmethod
+    def format(stats):
+        """Format stats as one text line
+
+        :param stats: stats or report dict
+        :return: text line
+        """
+        line = '%8.1fs received %d (%.0f msgs/s, %.0f avg) bytes %d kernel drops %d' % (
+            stats['elapsed'], stats['received'], stats.get('interval_rate', stats['rate']), stats['rate'],
+            stats['bytes'], stats['kernel_drops'])
+        if stats.get('framing_errors'):
+            line += ' framing errors %d' % stats['framing_errors']
+        if 'loss' in stats:
+            line += ' streams %d missing %d (%.3f%%) duplicates %d reordered %d' % (
+                stats['streams'], stats['missing'], stats['loss'], stats['duplicates'], stats['reordered'])
+        return line
+
+    def _add_listener(self, transport, sock, target):
+        listener = _Listener(self, transport, sock)
+        self._listeners.append(listener)
+        thread = threading.Thread(target=target, args=(listener,))
+        thread.daemon = True
+        thread.start()
+        self._threads.append(thread)
+
+    def _track(self, listener, msgs, peer):
+        search = self._pattern.search
+        named = 'stream' in self._pattern.groupindex
+        seqs = []
+        for data in msgs:
+            match = search(data)
+            if match is not None:
+                seqs.append(((match.group('stream') if named else None) or peer, int(match.group('seq'))))
+        if not seqs:
+            return
+        # matched outside the lock, one acquisition per received chunk
+        with listener.lock:
+            sequences = listener.sequences
+            for key, seq in seqs:
+                tracker = sequences.get(key)
+                if tracker is None:
+                    tracker = sequences[key] = SequenceTracker(self._first_seq)
+                tracker.add(seq)
+
+    def _serve_udp(self, listener):
+        sock = listener.socket
+        counter = listener.counters[0]
+        tracking = self._pattern is not None
+        while self.running:
+            try:
+                if tracking:
+                    data, peer = sock.recvfrom(65535)
+                else:
+                    data = sock.recv(65535)
+            except socket.timeout:
+                continue
+            except socket.error:
+                if self.running:
+                    raise
+                return
+            counter.received += 1
+            counter.bytes += len(data)
+            if tracking:
+                self._track(listener, (data,), '%s:%d' % peer)
+
+    def _serve_tcp(self, listener):
+        while self.running:
+            try:
+                conn, peer = listener.socket.accept()
+            except socket.timeout:
+                continue
+            except socket.error:
+                if self.running:
+                    raise
+                return
+            thread = threading.Thread(target=self._serve_conn, args=(listener, conn, '%s:%d' % peer))
+            thread.daemon = True
+            thread.start()
+
+    def _serve_conn(self, listener, conn, peer):
+        counter = listener.new_counter()
+        tracking = self._pattern is not None
+        conn.settimeout(0.2)
+        pending = b''
+        octet = None
+        try:
+            while self.running:
+                try:
+                    data = conn.recv(1024 * 1024)
+                except socket.timeout:
+                    continue
+                if not data:
+                    break
+                pending += data
+                if octet is None:
+                    # RFC 6587 octet counting starts with the msg length, syslog and json never do
+                    octet = pending[:1].isdigit()
+                msgs, pending = self._split_octet(pending) if octet else self._split_lines(pending)
+                counter.received += len(msgs)
+                counter.bytes += sum(len(x) for x in msgs)
+                if tracking and msgs:
+                    self._track(listener, msgs, peer)
+                if pending is None:
+                    # no msg boundary to resync on, the rest of the stream is unreadable
+                    counter.framing_errors += 1
+                    log.warning('%s: malformed octet count, connection dropped', peer)
+                    break
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _split_lines(pending):
+        lines = pending.split(b'\n')
+        rest = lines.pop()
+        return [x for x in lines if x], rest
+
+    @staticmethod
+    def _split_octet(pending):
+        """Split RFC 6587 octet counted msgs
+
+        :param pending: received bytes
+        :return: tuple of complete msgs and the incomplete rest, rest is None after a malformed length prefix
+        """
+        msgs = []
+        pos = 0
+        while True:
+            space = pending.find(b' ', pos, pos + _MAX_OCTET_DIGITS + 1)
+            if space < 0:
+                if len(pending) - pos > _MAX_OCTET_DIGITS:
+                    return msgs, None
+                break
+            length = pending[pos:space]
+            if not length.isdigit():
+                return msgs, None
+            end = space + 1 + int(length)
+            if end > len(pending):
+                break
+            msgs.append(pending[space + 1:end])
+            pos = end
+        return msgs, pending[pos:]
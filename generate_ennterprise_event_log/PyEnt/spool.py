@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.spool
+~~~~~~~~~~~~~~
+This module provides the binary spool file, rendered msgs written once and replayed at full rate.
+
+Layout: a header (magic, transport, msg count), then one record per msg, a 4 byte big
+endian length followed by the msg, already framed for the transport. Replay maps the
+file and hands (address, length) pairs of the mapped records to the kernel, no msg is
+copied into a Python object, memory stays flat whatever the spool size.
+"""
+
+import ctypes
+import mmap
+import struct
+from array import array
+
+from .sender import Transport, frame_msg
+
+MAGIC = b'PYENTSP1'
+_HEADER = struct.Struct('!8s16sQ')
+_LENGTH = struct.Struct('!I')
+
+
+class SpoolWriter(object):
+    def __init__(self, path, transport='udp'):
+        """SpoolWriter class init function
+
+        :param path: spool file path, overwritten
+        :param transport: refer to Transport, msgs are framed for it at write time
+        """
+        assert transport in Transport
+        self._file = open(path, 'wb')
+        self._transport = transport
+        self._file.write(_HEADER.pack(MAGIC, transport.encode('ascii'), 0))
+        self.count = 0
+        self.bytes = 0
+
+    def write(self, msg):
+        """Append one msg
+
+        :param msg: encoded msg
+        :return: None
+        """
+        frame = frame_msg(msg, self._transport)
+        self._file.write(_LENGTH.pack(len(frame)) + frame)
+        self.count += 1
+        self.bytes += len(frame)
+
+    def write_batch(self, msgs, batch_size=1024):
+        """Append msgs, batch_size records per file write
+
+        :param msgs: list or iterator of encoded msgs
+        :param batch_size: records joined per write
+        :return: tuple of written msg count and framed bytes
+        """
+        pack = _LENGTH.pack
+        transport = self._transport
+        count = 0
+        size = 0
+        chunk = []
+        for msg in msgs:
+            frame = frame_msg(msg, transport)
+            chunk.append(pack(len(frame)))
+            chunk.append(frame)
+            count += 1
+            size += len(frame)
+            if len(chunk) >= 2 * batch_size:
+                self._file.write(b''.join(chunk))
+                chunk = []
+        if chunk:
+            self._file.write(b''.join(chunk))
+        self.count += count
+        self.bytes += size
+        return count, size
+
+    def close(self):
+        """Write the msg count into the header and close
+
+        :return: None
+        """
+        if self._file.closed:
+            return
+        self._file.seek(0)
+        self._file.write(_HEADER.pack(MAGIC, self._transport.encode('ascii'), self.count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class Spool(object):
+    def __init__(self, path):
+        """Spool class init function, maps a spool file written by SpoolWriter
+
+        :param path: spool file path
+        """
+        with open(path, 'rb') as f:
+            # copy-on-write mapping: writable for ctypes, never written, never copied
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, transport, count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError('%s is not a spool file' % path)
+        self._transport = transport.rstrip(b'\0').decode('ascii')
+        self._count = count
+        self._buffer = (ctypes.c_char * len(self._map)).from_buffer(self._map)
+        self._address = ctypes.addressof(self._buffer)
+
+    @property
+    def transport(self):
+        return self._transport
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def start(self):
+        """Offset of the first record"""
+        return _HEADER.size
+
+    @property
+    def end(self):
+        """Offset past the last record"""
+        return len(self._map)
+
+    def scan(self, offset, limit):
+        """Locate up to limit records starting at offset
+
+        :param offset: record offset, start for the first record
+        :param limit: max records
+        :return: tuple of iov table, array of (address, length) pairs, and the next record offset
+        """
+        unpack_from = _LENGTH.unpack_from
+        mapped = self._map
+        end = len(mapped)
+        base = self._address
+        table = array('L')
+        append = table.append
+        for i in range(limit):
+            if offset >= end:
+                break
+            length = unpack_from(mapped, offset)[0]
+            offset += 4
+            if offset + length > end:
+                raise ValueError('Truncated spool record at offset %d' % (offset - 4))
+            append(base + offset)
+            append(length)
+            offset += length
+        return table, offset
+
+    def read(self, address, length):
+        """Copy a record out of the map, for senders without sendmmsg/sendmsg
+
+        :param address: record address from scan()
+        :param length: record length from scan()
+        :return: framed msg
+        """
+        offset = address - self._address
+        return self._map[offset:offset + length]
+
+    def close(self):
+        """Unmap the spool
+
+        :return: None
+        """
+        if self._buffer is not None:
+            # the ctypes export has to go before the map can close
+            self._buffer = None
+            self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
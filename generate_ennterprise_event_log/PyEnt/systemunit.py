@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check
+from .cache import lookup, invalidate
 
 
 import logging
@@ -62,8 +63,7 @@ class SystemUnit(object):
         :return: system unit info dict
         """
 
-        unit_list = self.list()
-        return [unit for unit in unit_list if unit['name'] == name][0]
+        return lookup(self._session, 'SystemUnit', self.list, 'name', name)
 
     def create_by_data(self, data):
         """Create system unit by data
@@ -74,6 +74,7 @@ class SystemUnit(object):
 
         uri = self._console_url + "/system/unit"
         response = self._session.put(uri, json=data)
+        invalidate(self._session, 'SystemUnit')
         response_content = json.loads(response.content)
 
         status_code_check(response.status_code, 200)
@@ -127,6 +128,7 @@ class SystemUnit(object):
             if description:
                 update_data['description'] = description
         response = self._session.post(uri, json=update_data)
+        invalidate(self._session, 'SystemUnit')
         response_content = json.loads(response.content)
         status_code_check(response.status_code, 200)
         response_status_check(response_content['statusCode'], 0, response_content['messages'])
@@ -140,5 +142,6 @@ class SystemUnit(object):
 
         uri = self._console_url + '/system/unit/' + id
         response = self._session.delete(uri)
+        invalidate(self._session, 'SystemUnit')
         status_code_check(response.status_code, 200)
 
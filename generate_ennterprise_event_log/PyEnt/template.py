@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+
+
+"""
+pyent.template
+~~~~~~~~~~~~~~
+This module provides the compiled log template, for high rate log generation.
+
+A sample log is parsed once into literal segments and named slots. Rendering is a
+single bytes format over pre-encoded fragments, no regex runs per message.
+"""
+
+import re
+import time
+
+
+class Template(object):
+    def __init__(self, sample, slots, encoding='utf-8'):
+        """Template class init function
+
+        :param sample: sample log
+        :param slots: dict of slot name to regex, group 1 of the regex marks the slot value in sample
+        :param encoding: sample encoding, default is utf-8
+        """
+        if isinstance(sample, bytes):
+            sample = sample.decode(encoding)
+        spans = []
+        for name, pattern in slots.items():
+            match = re.search(pattern, sample)
+            if not match:
+                raise ValueError('Slot %s pattern %s not found in sample' % (name, pattern))
+            spans.append((match.start(1), match.end(1), name))
+        spans.sort()
+
+        self._names = []
+        self._defaults = {}
+        segments = []
+        pos = 0
+        for start, end, name in spans:
+            if start < pos:
+                raise ValueError('Slot %s overlaps another slot' % name)
+            segments.append(sample[pos:start].encode(encoding).replace(b'%', b'%%'))
+            segments.append(b'%(' + name.encode('ascii') + b')s')
+            self._names.append(name)
+            self._defaults[name] = sample[start:end].encode(encoding)
+            pos = end
+        segments.append(sample[pos:].encode(encoding).replace(b'%', b'%%'))
+        self._format = b''.join(segments)
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @property
+    def defaults(self):
+        """Get slot values found in sample
+
+        :return: dict of slot name to encoded value
+        """
+        return dict(self._defaults)
+
+    def render(self, values):
+        """Render one log
+
+        :param values: dict of slot name to encoded value, every slot is required
+        :return: encoded log
+        """
+        return self._format % values
+
+    def render_many(self, rows):
+        """Render logs lazily
+
+        :param rows: iterable of slot value dicts
+        :return: encoded log generator
+        """
+        fmt = self._format
+        for values in rows:
+            yield fmt % values
+
+
+class CachedClock(object):
+    def __init__(self, fmt='%Y-%m-%d %H:%M:%S', offset=0, encoding='utf-8'):
+        """CachedClock class init function, strftime runs at most once per second
+
+        :param fmt: strftime format
+        :param offset: seconds added to current time, e.g. -86400 for the same time yesterday
+        :param encoding: output encoding, default is utf-8
+        """
+        self._fmt = fmt
+        self._offset = offset
+        self._encoding = encoding
+        self._second = None
+        self._value = None
+
+    def __call__(self, now=None):
+        """Get formatted time
+
+        :param now: epoch seconds, default is current time
+        :return: encoded time string
+        """
+        second = int(now if now is not None else time.time()) + self._offset
+        if second != self._second:
+            self._second = second
+            self._value = time.strftime(self._fmt, time.localtime(second)).encode(self._encoding)
+        return self._value
@@ -3,6 +3,7 @@
 import json
 
 from ._internal_utils import status_code_check, response_status_check, convert_date_time, EntityType, ShareType, ReportFileFormat
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 from datetime import datetime, date, timedelta
 import logging
 
@@ -167,18 +168,13 @@ class TimeReport(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
+    def delete_all(self, workers=DEFAULT_WORKERS):
         """Delete all time report
 
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        report_list = self.list()
-        for report in report_list:
-            try:
-                self.delete(report['id'])
-            except:
-                pass
+        return BulkExecutor(self, workers).delete([report['id'] for report in self.list()])
 
     def get_share_type(self, id):
         """Get share type for time report
@@ -7,6 +7,7 @@ from ._internal_utils import status_code_check, response_status_check
 from .systemunit import SystemUnit
 from .role import Role
 from .tool import generate_menu_item_dict
+from .bulk import BulkExecutor, DEFAULT_WORKERS
 
 import logging
 log = logging.getLogger(__name__)
@@ -256,19 +257,13 @@ class User(object):
         response = self._session.delete(uri)
         status_code_check(response.status_code, 200)
 
-    def delete_all(self):
-        """Delete user
+    def delete_all(self, workers=DEFAULT_WORKERS):
+        """Delete all users
 
-        :param id: user id
-        :return: None
+        :param workers: concurrent requests
+        :return: bulk report, refer to BulkExecutor.map, failures are listed in errors
         """
-
-        user_list = self.list()
-        for user in user_list:
-            try:
-                self.delete(user['id'])
-            except Exception as ex:
-                print 'delete user exception', user['id']
+        return BulkExecutor(self, workers).delete([user['id'] for user in self.list()])
 
     def get_login_info(self):
         """Get current login info
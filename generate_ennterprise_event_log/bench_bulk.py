@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+Bulk CRUD throughput benchmark against a local keep-alive HTTP server with console like latency
+
+    python bench_bulk.py -n 2000 --latency 20 -w 1,4,8,16
+
+Every run creates then deletes n items, once with the plain per item loop the *_all
+methods used, then with BulkExecutor at each worker count; connections counts the TCP
+connections the server accepted, it stays at the worker count with keep-alive.
+"""
+
+import argparse
+import json
+import threading
+import time
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from SocketServer import ThreadingMixIn
+
+from PyEnt import session
+from PyEnt.bulk import BulkExecutor
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, latency):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), _Handler)
+        self.latency = latency
+        self.connections = 0
+        self.next_id = 0
+        self.lock = threading.Lock()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, data):
+        time.sleep(self.server.latency)
+        body = json.dumps({'statusCode': 0, 'messages': [], 'data': data})
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        with self.server.lock:
+            self.server.next_id += 1
+            id = self.server.next_id
+        self._reply({'id': str(id)})
+
+    def do_DELETE(self):
+        self._reply(None)
+
+
+class _Items(object):
+    """Minimal resource, shaped like the PyEnt ones"""
+
+    def __init__(self, console_url, session=None):
+        self._console_url = console_url
+        self._session = session
+
+    @property
+    def session(self):
+        return self._session
+
+    def create_by_data(self, data):
+        response = self._session.post(self._console_url + '/api/items', json=data)
+        return json.loads(response.content)['data']['id']
+
+    def delete(self, id):
+        self._session.delete(self._console_url + '/api/items/' + id)
+
+
+def report(name, count, cost, server, failed=0):
+    print '%-14s %8d calls %8.3fs %10.1f calls/s connections %4d failed %d' % (
+        name, count, cost, count / cost, server.connections, failed)
+    server.connections = 0
+
+
+def bench_loop(server, url, items):
+    resource = _Items(url, session.clean())
+    starttime = time.time()
+    ids = [resource.create_by_data(item) for item in items]
+    for id in ids:
+        resource.delete(id)
+    report('loop', 2 * len(items), time.time() - starttime, server)
+    resource.session.close()
+
+
+def bench_bulk(server, url, items, workers):
+    resource = _Items(url, session.clean())
+    executor = BulkExecutor(resource, workers)
+    starttime = time.time()
+    created = executor.create_by_data(items)
+    deleted = executor.delete([x for x in created['results'] if x is not None])
+    report('bulk x%d' % workers, created['total'] + deleted['total'], time.time() - starttime, server,
+           created['failed'] + deleted['failed'])
+    resource.session.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk CRUD throughput benchmark')
+    parser.add_argument('-n', '--number', type=int, default=2000, help='items per run')
+    parser.add_argument('--latency', type=float, default=20, help='server ms per request, default is 20')
+    parser.add_argument('-w', '--workers', default='1,4,8,16', help='comma separated worker counts')
+    args = parser.parse_args()
+
+    server = _Server(args.latency / 1000.0)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    url = 'http://127.0.0.1:%d' % server.server_address[1]
+    items = [{'name': 'bench_%d' % i} for i in range(args.number)]
+    try:
+        bench_loop(server, url, items)
+        for workers in [int(x) for x in args.workers.split(',')]:
+            bench_bulk(server, url, items, workers)
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
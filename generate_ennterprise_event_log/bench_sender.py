@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+
+"""
+Sender throughput benchmark against a local UDP or TCP sink
+
+    python bench_sender.py -n 200000 -b 1024 -t udp
+    python bench_sender.py -n 200000 -b 1024 -t tcp_octet
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+from PyEnt.sender import Sender, Transport
+from PyEnt.sink import Sink
+
+content = r'<11>Feb 18 11:12:23 localhost waf: tag:waf_log_websec site_id:1428395845  protect_id:2442566278  dst_ip:172.17.100.105  dst_port:80  src_ip:211.22.90.249  src_port:28684  method:UNKNOWN  domain:None  uri:None  alertlevel:MEDIUM  event_type:HTTP_Protocol_Validation  stat_time:2017-02-18 11:12:19  policy_id:1  rule_id:0  action:Block  block:No  block_info:None  http:  alertinfo:request method begin with non-capital letters or over load content-lenth  proxy_info:None  characters:None  count_num:1  protocol_type:HTTP  wci:None  wsi:None'
+
+
+def report(name, count, size, cost, sink):
+    time.sleep(0.5)
+    received = sink.stats()['received']
+    print '%-12s %10d msgs %12d bytes %8.3fs %12.0f msgs/s %14.0f bytes/s received %d (%.1f%%)' % (
+        name, count, size, cost, count / cost, size / cost, received, 100.0 * received / count)
+    sink.reset()
+
+
+def bench_send_string(sink, msgs, transport):
+    sender = Sender(*sink.addresses[0][1], transport=transport)
+    starttime = time.time()
+    for msg in msgs:
+        sender.send_string(msg)
+    cost = time.time() - starttime
+    # framed bytes of the msgs actually sent, as send_batch and replay count them
+    report('send_string', sender.metrics.sent, sender.metrics.bytes, cost, sink)
+
+
+def bench_send_batch(sink, msgs, batch_size, transport):
+    sender = Sender(*sink.addresses[0][1], transport=transport)
+    starttime = time.time()
+    count, size = sender.send_batch(msgs, batch_size)
+    cost = time.time() - starttime
+    report('send_batch', count, size, cost, sink)
+
+
+def bench_replay(sink, msgs, batch_size, transport):
+    sender = Sender(*sink.addresses[0][1], transport=transport)
+    fd, path = tempfile.mkstemp(suffix='.spool')
+    os.close(fd)
+    try:
+        sender.write_spool(path, msgs)
+        starttime = time.time()
+        count, size = sender.replay(path, batch_size=batch_size)
+        cost = time.time() - starttime
+    finally:
+        os.remove(path)
+    report('replay', count, size, cost, sink)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sender throughput benchmark')
+    parser.add_argument('-n', '--number', type=int, default=200000, help='msgs per run')
+    parser.add_argument('-b', '--batch-size', type=int, default=1024, help='send_batch burst size')
+    parser.add_argument('-t', '--transport', choices=Transport, default='udp', help='sender transport')
+    args = parser.parse_args()
+
+    msgs = [content.encode('utf-8')] * args.number
+    if args.transport == 'udp':
+        sink = Sink('127.0.0.1', udp_ports=[0], tcp_ports=[], seq_pattern=None)
+    else:
+        sink = Sink('127.0.0.1', udp_ports=[], tcp_ports=[0], seq_pattern=None)
+    sink.start()
+    try:
+        bench_send_string(sink, msgs, args.transport)
+        bench_send_batch(sink, msgs, args.batch_size, args.transport)
+        bench_replay(sink, msgs, args.batch_size, args.transport)
+    finally:
+        sink.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+WAF log generation benchmark, regex substitution against the compiled template
+
+    python bench_template.py -n 200000
+"""
+
+import argparse
+import datetime
+import re
+import time
+
+from PyEnt.template import Template, CachedClock
+
+content = r'<11>Feb 18 11:12:23 localhost waf: tag:waf_log_websec site_id:1428395845  protect_id:2442566278  dst_ip:172.17.100.105  dst_port:80  src_ip:211.22.90.249  src_port:28684  method:UNKNOWN  domain:None  uri:None  alertlevel:MEDIUM  event_type:HTTP_Protocol_Validation  stat_time:2017-02-18 11:12:19  policy_id:1  rule_id:0  action:Block  block:No  block_info:None  http:  alertinfo:request method begin with non-capital letters or over load content-lenth  proxy_info:None  characters:None  count_num:1  protocol_type:HTTP  wci:None  wsi:None'
+
+src_ips = ['211.22.90.%d' % i for i in range(1, 251)]
+dst_ips = ['172.17.100.%d' % i for i in range(1, 251)]
+
+
+def _sub_dst_ip(dst_ip, content):
+    return re.sub(r'dst_ip:((?:\d{1,3}\.){3}\d{1,3})', 'dst_ip:' + dst_ip, content)
+
+
+def _sub_src_ip(src_ip, content):
+    return re.sub(r'src_ip:((?:\d{1,3}\.){3}\d{1,3})', 'src_ip:'+ src_ip, content)
+
+
+def _sub_stat_time(time, content):
+    return re.sub(r'stat_time:(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{1,2}:\d{1,2})','stat_time:'+ time, content)
+
+
+def bench_regex(number):
+    starttime = time.time()
+    for i in range(number):
+        dt = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        _sub_stat_time(dt, _sub_dst_ip(dst_ips[i % 250], _sub_src_ip(src_ips[i % 250], content)))
+    return time.time() - starttime
+
+
+def bench_template(number):
+    template = Template(content, {
+        'dst_ip': r'dst_ip:((?:\d{1,3}\.){3}\d{1,3})',
+        'src_ip': r'src_ip:((?:\d{1,3}\.){3}\d{1,3})',
+        'stat_time': r'stat_time:(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{1,2}:\d{1,2})',
+    })
+    stat_time = CachedClock()
+    src = [x.encode('ascii') for x in src_ips]
+    dst = [x.encode('ascii') for x in dst_ips]
+    render = template.render
+    starttime = time.time()
+    for i in range(number):
+        render({'src_ip': src[i % 250], 'dst_ip': dst[i % 250], 'stat_time': stat_time()})
+    return time.time() - starttime
+
+
+def main():
+    parser = argparse.ArgumentParser(description='WAF log generation benchmark')
+    parser.add_argument('-n', '--number', type=int, default=200000, help='msgs per run')
+    args = parser.parse_args()
+
+    regex_cost = bench_regex(args.number)
+    template_cost = bench_template(args.number)
+    print '%-10s %10d msgs %8.3fs %12.0f msgs/s' % ('regex', args.number, regex_cost, args.number / regex_cost)
+    print '%-10s %10d msgs %8.3fs %12.0f msgs/s' % ('template', args.number, template_cost, args.number / template_cost)
+    print 'speedup %.1fx' % (regex_cost / template_cost)
+
+
+if __name__ == '__main__':
+    main()
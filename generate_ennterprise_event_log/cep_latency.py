@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+
+"""
+Event to alarm latency of the enabled CEP rules, under an optional background load
+
+    python cep_latency.py --console https://172.16.106.150 -u admin -p *** --host 172.16.106.150
+    python cep_latency.py ... --background-rate 2000 --rule 通用web攻击-网络安全-攻击-警告
+
+Import the rule packs and enable the rules first, see readme.txt. Every rule gets WAF
+events from a fresh src_ip, threshold + 1 of them for having rules. Rules with an event
+filter or where condition, and having rules whose threshold key the template does not
+tell (see --threshold-key), are reported as skipped.
+"""
+
+import argparse
+import json
+
+from PyEnt import PyEnt
+from PyEnt.ceplatency import AlarmLatencyHarness
+from PyEnt.latency import BackgroundLoad
+from PyEnt.sender import Sender, Transport
+
+
+def main():
+    parser = argparse.ArgumentParser(description='CEP rule event to alarm latency')
+    parser.add_argument('--console', required=True, help='console url, e.g. https://172.16.106.150')
+    parser.add_argument('-u', '--username', required=True)
+    parser.add_argument('-p', '--password', required=True)
+    parser.add_argument('--host', required=True, help='collector ip')
+    parser.add_argument('--port', type=int, default=514, help='collector port, default is 514')
+    parser.add_argument('-t', '--transport', choices=Transport, default='udp', help='sender transport')
+    parser.add_argument('--rule', action='append', help='rule name, repeatable, default is every enabled rule')
+    parser.add_argument('--spacing', type=float, default=5.0, help='seconds between rule triggers, default is 5')
+    parser.add_argument('--poll-interval', type=float, default=2.0, help='seconds between polls, default is 2')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds before a rule counts as missed')
+    parser.add_argument('--background-rate', type=float, default=0, help='background WAF events per second')
+    parser.add_argument('--threshold-key', action='append', default=[],
+                        help='templateId=having key holding the count threshold, e.g. 1=n2, repeatable')
+    parser.add_argument('-s', '--seed', type=int, help='src ip RNG seed')
+    parser.add_argument('-o', '--output', help='report json file, default is stdout')
+    args = parser.parse_args()
+
+    threshold_keys = {}
+    for item in args.threshold_key:
+        template_id, key = item.split('=', 1)
+        threshold_keys[int(template_id)] = key
+
+    ent = PyEnt(args.console, username=args.username, password=args.password)
+    harness = AlarmLatencyHarness(ent.get_resource('CepRule'), ent.get_resource('Alarm'),
+                                  Sender(args.host, args.port, transport=args.transport), spacing=args.spacing,
+                                  poll_interval=args.poll_interval, timeout=args.timeout, seed=args.seed,
+                                  cep_template=ent.get_resource('CepTemplate'), threshold_keys=threshold_keys)
+    rules = harness.enabled_rules()
+    if args.rule:
+        names = set(x.decode('utf-8') for x in args.rule)
+        rules = [x for x in rules if x['name'] in names]
+
+    background = None
+    if args.background_rate:
+        background = BackgroundLoad(args.host, args.port, args.background_rate, args.transport).start()
+    try:
+        report = harness.run(rules)
+    finally:
+        background_sent = background.stop() if background is not None else 0
+    report['background_rate'] = args.background_rate
+    report['background_sent'] = background_sent
+
+    for item in report['rules']:
+        if item['skipped']:
+            status = 'skipped, %s' % item['skipped']
+        else:
+            status = '%.1fs' % item['latency'] if item['latency'] is not None else 'missed'
+        print '%-40s events %3d %s' % (item['name'].encode('utf-8'), item['events'], status)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print json.dumps(report, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+"""
+Loss check of a sequence tagged run, lists missing ranges, duplicates and loss per time slice
+
+    python check_run.py --console https://172.16.106.150 -u admin -p *** --results nta_results.json
+    python check_run.py --console https://172.16.106.150 -u admin -p *** --run-id 3f2a9c01d4e7 \
+        --start '2017-09-28 10:00:00' --end '2017-09-28 10:30:00' --sent 1800000
+
+--results reads run_id, tagged, started and finished from the results json of
+send_nta_log_to_enterprise.py, the window is widened by --settle for late events.
+"""
+
+import argparse
+import json
+from datetime import datetime, timedelta
+
+from PyEnt import PyEnt
+from PyEnt.sequence import DEFAULT_FIELD
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _parse_time(value):
+    return datetime.strptime(value[:19].replace('T', ' '), TIME_FORMAT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Check a sequence tagged run for lost events')
+    parser.add_argument('--console', required=True, help='console url, e.g. https://172.16.106.150')
+    parser.add_argument('-u', '--username', required=True)
+    parser.add_argument('-p', '--password', required=True)
+    parser.add_argument('--results', help='results json of send_nta_log_to_enterprise.py')
+    parser.add_argument('--run-id', help='run id, instead of --results')
+    parser.add_argument('--start', type=_parse_time, help='run start, %s' % TIME_FORMAT.replace('%', '%%'))
+    parser.add_argument('--end', type=_parse_time, help='run end, %s' % TIME_FORMAT.replace('%', '%%'))
+    parser.add_argument('--sent', type=int, help='msgs tagged, default is the tagged count in --results')
+    parser.add_argument('--field', default=DEFAULT_FIELD, help='tag field name, default is pyent_seq')
+    parser.add_argument('--slice', type=int, default=60, help='seconds per slice, default is 60')
+    parser.add_argument('--settle', type=int, default=60, help='seconds added around the run window, default is 60')
+    parser.add_argument('-o', '--output', help='report json file, default is stdout')
+    args = parser.parse_args()
+
+    run_id, start, end, sent = args.run_id, args.start, args.end, args.sent
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+        run_id = run_id or results['run_id']
+        start = start or _parse_time(results['started'])
+        end = end or _parse_time(results['finished'])
+        if sent is None:
+            sent = results.get('tagged')
+    if not (run_id and start and end):
+        parser.error('run id, start and end are required, directly or from --results')
+
+    ent = PyEnt(args.console, username=args.username, password=args.password)
+    settle = timedelta(seconds=args.settle)
+    report = ent.get_resource('Event').check_run(run_id, start - settle, end + settle, args.field,
+                                                 args.slice, sent)
+    for item in report['slices']:
+        if item['received'] or item['missing']:
+            print '%s - %s received %d duplicates %d missing %d (%.3f%%)' % (
+                item['start'], item['end'], item['received'], item['duplicates'], item['missing'], item['loss'])
+    for stream, item in sorted(report['streams'].items()):
+        print '%s: unique %d duplicates %d missing %d (%.3f%%) ranges %s' % (
+            stream, item['unique'], item['duplicates'], item['missing'], item['loss'], item['missing_ranges'][:10])
+    print 'total: received %d duplicates %d missing %d (%.3f%%)' % (
+        report['received'], report['duplicates'], report['missing'], report['loss'])
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True, default=str)
+
+
+if __name__ == '__main__':
+    main()
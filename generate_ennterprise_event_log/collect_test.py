@@ -8,6 +8,8 @@ sys.setdefaultencoding('utf-8')
 import socket
 from PyEnt import PyEnt
 from PyEnt.sender import Sender
+from PyEnt.template import Template, CachedClock
+from PyEnt.fieldgen import FieldGenerator
 from pprint import pprint
 #local_host = socket.gethostbyname(socket.getfqdn(socket.gethostname()))
 local_host = '172.16.106.150'
@@ -152,30 +154,37 @@ def intranet_ip():
     ip = ".".join([str(prefixIp), str(randrange(1, 256)), str(randrange(1, 256))])
     return ip
 
-def _send_event_log(send_days = 30, log_perday = 100, srcip_type = 'external', dstip_type = 'external'):
-    import time
-    import datetime
-    content = r'<11>Feb 18 11:12:23 localhost waf: tag:waf_log_websec site_id:1428395845  protect_id:2442566278  dst_ip:172.17.100.105  dst_port:80  src_ip:211.22.90.249  src_port:28684  method:UNKNOWN  domain:None  uri:None  alertlevel:MEDIUM  event_type:HTTP_Protocol_Validation  stat_time:2017-02-18 11:12:19  policy_id:1  rule_id:0  action:Block  block:No  block_info:None  http:  alertinfo:request method begin with non-capital letters or over load content-lenth  proxy_info:None  characters:None  count_num:1  protocol_type:HTTP  wci:None  wsi:None'
+waf_content = r'<11>Feb 18 11:12:23 localhost waf: tag:waf_log_websec site_id:1428395845  protect_id:2442566278  dst_ip:172.17.100.105  dst_port:80  src_ip:211.22.90.249  src_port:28684  method:UNKNOWN  domain:None  uri:None  alertlevel:MEDIUM  event_type:HTTP_Protocol_Validation  stat_time:2017-02-18 11:12:19  policy_id:1  rule_id:0  action:Block  block:No  block_info:None  http:  alertinfo:request method begin with non-capital letters or over load content-lenth  proxy_info:None  characters:None  count_num:1  protocol_type:HTTP  wci:None  wsi:None'
+
+waf_template = Template(waf_content, {
+    'dst_ip': r'dst_ip:((?:\d{1,3}\.){3}\d{1,3})',
+    'src_ip': r'src_ip:((?:\d{1,3}\.){3}\d{1,3})',
+    'stat_time': r'stat_time:(\d{4}-\d{2}-\d{2}\s+\d{1,2}:\d{1,2}:\d{1,2})',
+})
+
+
+def _send_event_log(send_days = 30, log_perday = 100, srcip_type = 'external', dstip_type = 'external', seed=None, src_pool=None, dst_pool=None, tagger=None):
+    # src_pool/dst_pool, e.g. ip_pool(10000, distribution='zipf'), bound the distinct ips
+    # tagger, e.g. SequenceTagger(field='proxy_info', sep=':'), puts run id and sequence number in an unused waf field
+    sender = Sender(host=host, port=514, tagger=tagger)
+    fields = FieldGenerator(seed)
+    src_block = fields.intranet_ips if srcip_type == 'internal' else fields.internet_ips
+    dst_block = fields.intranet_ips if dstip_type == 'internal' else fields.internet_ips
+    if src_pool is not None:
+        src_block = src_pool.sample
+    if dst_pool is not None:
+        dst_block = dst_pool.sample
     for n in range(send_days):
+        stat_time = CachedClock(offset=-n * 86400)
+        # src_ip changes every 5 logs, dst_ip every 2 logs
+        src_ips = src_block((log_perday + 4) // 5)
+        dst_ips = dst_block((log_perday + 1) // 2)
         for i in range(log_perday):
-            if i%5 == 0:
-                if srcip_type == 'internal':
-                    src_ip = intranet_ip()
-                else:
-                    src_ip = internet_ip()
-            if i%2 == 0:
-                if dstip_type == 'internal':
-                    dst_ip = intranet_ip()
-                else:
-                    dst_ip = internet_ip()
-
-            dt = (datetime.datetime.now()+datetime.timedelta(days=-n)).strftime("%Y-%m-%d %H:%M:%S")
-            #dt = time.strftime("%Y-%m-%d %X", time.localtime())
-            send_cont = _sub_stat_time(dt, _sub_dst_ip(dst_ip, _sub_src_ip(src_ip, content)))
+            src_ip = src_ips[i // 5]
+            dst_ip = dst_ips[i // 2]
+
+            send_cont = waf_template.render({'src_ip': src_ip, 'dst_ip': dst_ip, 'stat_time': stat_time()})
             print send_cont
-            # dt = time.strftime("%Y-%m-%d %X", time.gmtime(time.mktime((2016, 2, 17, 1, 1, 1, 1, 1, 0))))
-            # send_cont = _sub_stat_time(dt, content)
-            sender = Sender(host=host, port=514)
             sender.send_string(send_cont)
             #time.sleep(3)
 
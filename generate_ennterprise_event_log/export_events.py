@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+"""
+Export the events of a time range to a gzip JSONL or CSV file, slices fetched in parallel
+
+    python export_events.py --console https://172.16.106.150 -u admin -p *** \
+        --start '2017-09-28 00:00:00' --end '2017-09-29 00:00:00' -o events.jsonl.gz
+    python export_events.py ... --format csv --fields 发生时间,源地址,原始日志 -o events.csv.gz
+
+An interrupted export run again with the same arguments resumes from the slices it
+completed, --restart starts over.
+"""
+
+import argparse
+import json
+import logging
+from datetime import datetime
+
+from PyEnt import PyEnt
+from PyEnt.event import PAGE_SIZE
+from PyEnt.eventexport import EventExport, Format, MAX_ROWS, TIME_FORMAT
+
+
+def _parse_time(value):
+    return datetime.strptime(value[:19].replace('T', ' '), TIME_FORMAT)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Parallel time sliced event export')
+    parser.add_argument('--console', required=True, help='console url, e.g. https://172.16.106.150')
+    parser.add_argument('-u', '--username', required=True)
+    parser.add_argument('-p', '--password', required=True)
+    parser.add_argument('--start', type=_parse_time, required=True, help=TIME_FORMAT.replace('%', '%%'))
+    parser.add_argument('--end', type=_parse_time, required=True, help=TIME_FORMAT.replace('%', '%%'))
+    parser.add_argument('--fields', default=u'发生时间,事件名称,事件级别,源地址,目的地址,原始日志',
+                        help='comma separated query fields, the csv columns')
+    parser.add_argument('--format', choices=Format, default='jsonl', help='output format, default is jsonl')
+    parser.add_argument('--slice', type=int, default=300, help='seconds per slice, default is 300')
+    parser.add_argument('--workers', type=int, default=4, help='concurrent queries, default is 4')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE, help='events per request')
+    parser.add_argument('--max-rows', type=int, default=MAX_ROWS,
+                        help='rows one query can page through, bigger slices are split, default is %d' % MAX_ROWS)
+    parser.add_argument('--restart', action='store_true', help='discard the progress of an earlier run')
+    parser.add_argument('-o', '--output', required=True, help='output file, e.g. events.jsonl.gz')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+
+    fields = args.fields if isinstance(args.fields, type(u'')) else args.fields.decode('utf-8')
+    ent = PyEnt(args.console, username=args.username, password=args.password)
+    export = EventExport(ent.get_resource('Event'), args.output, args.start, args.end, fields.split(u','),
+                         fmt=args.format, slice_seconds=args.slice, workers=args.workers,
+                         page_size=args.page_size, max_rows=args.max_rows)
+    report = export.run(resume=not args.restart)
+    print json.dumps(report, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
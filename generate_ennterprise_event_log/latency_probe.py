@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+End to end ingestion latency, sent over syslog to searchable in Enterprise
+
+    python latency_probe.py --console https://172.16.106.150 -u admin -p *** --host 172.16.106.150 -n 100
+    python latency_probe.py ... --background-rate 5000 --probe-rate 0.5 -n 300
+
+Markers are WAF logs tagged in proxy_info, so the collector needs the WAF parser
+(see readme.txt). --background-rate adds WAF load from a second sender while the
+markers run, other load, e.g. send_nta_log_to_enterprise.py, can run next to it.
+"""
+
+import argparse
+import json
+
+from PyEnt import PyEnt
+from PyEnt.latency import LatencyProbe, BackgroundLoad, FILTER_LEFT, FILTER_CLASS
+from PyEnt.sender import Sender, Transport
+
+
+def main():
+    parser = argparse.ArgumentParser(description='End to end ingestion latency probe')
+    parser.add_argument('--console', required=True, help='console url, e.g. https://172.16.106.150')
+    parser.add_argument('-u', '--username', required=True)
+    parser.add_argument('-p', '--password', required=True)
+    parser.add_argument('--host', required=True, help='collector ip')
+    parser.add_argument('--port', type=int, default=514, help='collector port, default is 514')
+    parser.add_argument('-t', '--transport', choices=Transport, default='udp', help='sender transport')
+    parser.add_argument('-n', '--count', type=int, default=60, help='markers to send, default is 60')
+    parser.add_argument('--probe-rate', type=float, default=1.0, help='markers per second, default is 1')
+    parser.add_argument('--poll-interval', type=float, default=1.0, help='seconds between polls, default is 1')
+    parser.add_argument('--timeout', type=float, default=300, help='seconds before a marker counts as lost')
+    parser.add_argument('--filter-left', default=FILTER_LEFT,
+                        help='filter attribute holding the marker, default is the original log')
+    parser.add_argument('--filter-class', default=FILTER_CLASS,
+                        help='contains operator class of the run id filter, default is %s' % FILTER_CLASS)
+    parser.add_argument('--no-filter', action='store_true',
+                        help='list every event of the poll window and match the markers client side')
+    parser.add_argument('--server-time-attr', help='event attribute with the server receive time')
+    parser.add_argument('--background-rate', type=float, default=0, help='background WAF events per second')
+    parser.add_argument('-o', '--output', help='report json file, default is stdout')
+    args = parser.parse_args()
+
+    ent = PyEnt(args.console, username=args.username, password=args.password)
+    filter_left = args.filter_left if isinstance(args.filter_left, type(u'')) else args.filter_left.decode('utf-8')
+    probe = LatencyProbe(ent.get_resource('Event'), Sender(args.host, args.port, transport=args.transport),
+                         args.probe_rate, args.poll_interval, args.timeout, filter_left=filter_left,
+                         filter_class=None if args.no_filter else args.filter_class,
+                         server_time_attr=args.server_time_attr)
+
+    background = None
+    if args.background_rate:
+        background = BackgroundLoad(args.host, args.port, args.background_rate, args.transport).start()
+    try:
+        report = probe.run(args.count)
+    finally:
+        background_sent = background.stop() if background is not None else 0
+    report['background_rate'] = args.background_rate
+    report['background_sent'] = background_sent
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    else:
+        print json.dumps(report, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+
+"""
+Loopback ingestion sink, receives what Sender, send_nta_log_to_enterprise and collect_test send
+and reports receive rate, loss, duplicates and reordering, no Enterprise install needed
+
+    python loopback_sink.py
+    python loopback_sink.py --udp 514 9293 --tcp 514 -i 1 -d 60 --format json
+    python ../send_nta_log_to_enterprise/send_nta_log_to_enterprise.py --host 127.0.0.1 ...
+
+Ports below 1024 need root. Loss and reordering need msgs with an embedded sequence
+number, pyent_seq=<run>-<n> by default, --seq-pattern sets another regex with a seq group
+and an optional stream group.
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from PyEnt.sink import Sink, SEQ_PATTERN
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Loopback ingestion sink')
+    parser.add_argument('--host', default='0.0.0.0', help='listen address, default is 0.0.0.0')
+    parser.add_argument('--udp', type=int, nargs='*', default=[514, 9293], help='udp ports, default is 514 9293')
+    parser.add_argument('--tcp', type=int, nargs='*', default=[514, 9293], help='tcp ports, default is 514 9293')
+    parser.add_argument('-i', '--interval', type=float, default=5, help='seconds between reports, default is 5')
+    parser.add_argument('-d', '--duration', type=float, help='seconds to run, default is until Ctrl-C')
+    parser.add_argument('--format', choices=['text', 'json'], default='text', help='report format')
+    parser.add_argument('--seq-pattern', default=SEQ_PATTERN.decode('ascii'),
+                        help='sequence number regex, empty disables loss tracking')
+    parser.add_argument('--first-seq', type=int, default=0, help='first sequence number of every stream')
+    parser.add_argument('--ranges', type=int, default=10, help='missing ranges listed per stream at exit')
+    args = parser.parse_args()
+
+    sink = Sink(args.host, udp_ports=args.udp, tcp_ports=args.tcp,
+                seq_pattern=args.seq_pattern.encode('ascii') if args.seq_pattern else None,
+                first_seq=args.first_seq)
+    sink.start()
+    for transport, addr in sink.addresses:
+        sys.stderr.write('listening on %s %s:%d\n' % (transport, addr[0], addr[1]))
+
+    def emit(stats):
+        if args.format == 'json':
+            sys.stdout.write(json.dumps(stats, sort_keys=True) + '\n')
+        else:
+            sys.stdout.write(Sink.format(stats) + '\n')
+        sys.stdout.flush()
+
+    deadline = time.time() + args.duration if args.duration else None
+    try:
+        while deadline is None or time.time() < deadline:
+            time.sleep(args.interval if deadline is None else max(0, min(args.interval, deadline - time.time())))
+            emit(sink.report())
+    except KeyboardInterrupt:
+        pass
+
+    sequences = sink.sequences()
+    stats = sink.stop()
+    stats['final'] = True
+    emit(stats)
+    for (transport, port, stream), tracker in sorted(sequences.items()):
+        if tracker.missing or tracker.duplicates:
+            sys.stderr.write('%s/%d %s: %s missing ranges %s\n' % (
+                transport, port, stream, json.dumps(tracker.stats(), sort_keys=True),
+                tracker.missing_ranges(args.ranges)))
+
+
+if __name__ == '__main__':
+    main()
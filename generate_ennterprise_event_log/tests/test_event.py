@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+
+"""
+Event.check_run slicing against a fake console
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt._internal_utils import convert_date_time
+from PyEnt.event import Event
+
+START = datetime(2020, 1, 1)
+
+
+class FakeEvent(Event):
+    """Serves stored rows, the time window is inclusive at both ends like the console"""
+
+    def __init__(self, rows):
+        Event.__init__(self, 'http://console')
+        self.rows = rows
+
+    def _create_event_field_by_name(self, name_list):
+        return [{'text': x} for x in name_list]
+
+    def _query_page(self, payload, page, page_size):
+        scene = payload['scene']
+        rows = [x for x in self.rows if scene['startTime'] <= x['time'] <= scene['endTime']]
+        return {'list': rows[(page - 1) * page_size:page * page_size], 'total': len(rows)}
+
+
+def row(seconds, seq):
+    return {'time': convert_date_time(START + timedelta(seconds=seconds)),
+            u'原始日志': 'stat_time=1 pyent_seq=run1-%d' % seq}
+
+
+class CheckRunTest(unittest.TestCase):
+    def test_boundary_event_counted_once(self):
+        # seq 1 and 2 are stamped exactly on the slice boundary at 60s
+        event = FakeEvent([row(0, 0), row(60, 1), row(60, 2), row(90, 3)])
+        report = event.check_run('run1', START, START + timedelta(seconds=120), slice_seconds=60, sent=4)
+        self.assertEqual(report['received'], 4)
+        self.assertEqual(report['duplicates'], 0)
+        self.assertEqual(report['missing'], 0)
+        self.assertEqual([x['received'] for x in report['slices']], [1, 3])
+
+    def test_missing(self):
+        event = FakeEvent([row(0, 0), row(30, 2)])
+        report = event.check_run('run1', START, START + timedelta(seconds=60), sent=4)
+        self.assertEqual(report['missing'], 2)
+        self.assertEqual(report['streams']['run1']['missing_ranges'], [(1, 1), (3, 3)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+"""
+EventExport resume arithmetic
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt.eventexport import EventExport
+
+START = datetime(2020, 1, 1)
+
+
+def at(seconds):
+    return START + timedelta(seconds=seconds)
+
+
+class RemainingTest(unittest.TestCase):
+    def setUp(self):
+        # slices [0, 300), [300, 600), [600, 700)
+        self.export = EventExport(None, 'events.jsonl.gz', START, at(700), slice_seconds=300)
+
+    def test_slices(self):
+        self.assertEqual(self.export.slices(), [(at(0), at(300)), (at(300), at(600)), (at(600), at(700))])
+
+    def test_nothing_done(self):
+        self.assertEqual(self.export._remaining([]), self.export.slices())
+
+    def test_all_done(self):
+        self.assertEqual(self.export._remaining(self.export.slices()), [])
+
+    def test_partial_slice(self):
+        done = [(at(0), at(300)), (at(300), at(450))]
+        self.assertEqual(self.export._remaining(done), [(at(450), at(600)), (at(600), at(700))])
+
+    def test_gaps_inside_slice(self):
+        done = [(at(0), at(300)), (at(400), at(450)), (at(300), at(350)), (at(500), at(600)),
+                (at(600), at(700))]
+        self.assertEqual(self.export._remaining(done), [(at(350), at(400)), (at(450), at(500))])
+
+    def test_short_last_slice(self):
+        done = [(at(0), at(300)), (at(300), at(600)), (at(600), at(650))]
+        self.assertEqual(self.export._remaining(done), [(at(650), at(700))])
+
+
+if __name__ == '__main__':
+    unittest.main()
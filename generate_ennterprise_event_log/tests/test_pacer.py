@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+"""
+Pacer schedules and ramps, on a fake clock
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt import pacer
+from PyEnt.pacer import Pacer, ramp_profile
+
+
+class FakeClock(object):
+    """Replaces pacer._clock and pacer.time, sleeping advances the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class PacerTest(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self._saved = pacer._clock, pacer.time
+        pacer._clock = self.clock
+        pacer.time = self.clock
+
+    def tearDown(self):
+        pacer._clock, pacer.time = self._saved
+
+    def test_ramp_profile(self):
+        self.assertEqual(ramp_profile(50), [(0, 50)])
+        self.assertEqual(ramp_profile(100, ramp_up=10, hold=20, ramp_down=5), [(0, 0), (10, 100), (30, 100), (35, 0)])
+
+    def test_schedule_integrates_the_profile(self):
+        p = Pacer(profile=ramp_profile(100, ramp_up=10, hold=20, ramp_down=5))
+        self.assertAlmostEqual(p.rate_at(5), 50)
+        self.assertAlmostEqual(p.allowed_at(10), 500)
+        self.assertAlmostEqual(p.allowed_at(30), 2500)
+        self.assertAlmostEqual(p.allowed_at(35), 2750)
+        self.assertAlmostEqual(p.allowed_at(60), 2750)
+
+    def test_unlimited(self):
+        p = Pacer()
+        self.assertTrue(p.unlimited)
+        self.assertEqual(p.budget(500), 500)
+        self.assertEqual(self.clock.now, 1000.0)
+
+    def test_constant_rate(self):
+        p = Pacer(100)
+        for i in range(1000):
+            self.assertTrue(p.acquire())
+        # the 1000th event is due at 9.99s
+        self.assertAlmostEqual(self.clock.now - 1000.0, 9.99, delta=0.01)
+        self.assertEqual(p.sent, 1000)
+
+    def test_budget_stays_within_a_slice(self):
+        p = Pacer(1000, slice_time=0.01)
+        counts = [p.budget(100) for i in range(50)]
+        self.assertTrue(all(0 < x <= 10 for x in counts))
+        self.assertLessEqual(p.sent, p.allowed_at(self.clock.now - 1000.0) + 1)
+
+    def test_ramp_down_ends(self):
+        p = Pacer(profile=ramp_profile(100, hold=1, ramp_down=1))
+        total = 0
+        while True:
+            count = p.budget(1000)
+            if not count:
+                break
+            total += count
+        self.assertAlmostEqual(total, 150, delta=1)
+        self.assertFalse(p.acquire())
+
+    def test_stall_backlog_is_dropped(self):
+        p = Pacer(100, max_lag=1.0)
+        p.acquire()
+        self.clock.now += 10
+        p.acquire()
+        report = p.report()
+        # about 1001 due after the stall with 1 sent, one second (100) of backlog kept
+        self.assertAlmostEqual(report['dropped'], 900, delta=1)
+        self.assertAlmostEqual(report['requested'] - report['sent'], 99, delta=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+
+"""
+frame_msg framing per transport, tcp stream restarts, udp error accounting
+
+    python -m unittest discover -s tests
+"""
+
+import errno
+import os
+import socket
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt.sender import Sender, frame_msg
+
+
+class FrameMsgTest(unittest.TestCase):
+    def test_udp_unchanged(self):
+        self.assertEqual(frame_msg(b'<14>hello', 'udp'), b'<14>hello')
+
+    def test_tcp_newline(self):
+        self.assertEqual(frame_msg(b'<14>hello', 'tcp'), b'<14>hello\n')
+        self.assertEqual(frame_msg(b'<14>hello\n', 'tcp'), b'<14>hello\n')
+
+    def test_tcp_octet_counts_bytes(self):
+        self.assertEqual(frame_msg(b'<14>hello', 'tcp_octet'), b'9 <14>hello')
+        msg = u'<14>事件'.encode('utf-8')
+        self.assertEqual(frame_msg(msg, 'tcp_octet'), b'10 ' + msg)
+
+    def test_tcp_octet_keeps_newline(self):
+        self.assertEqual(frame_msg(b'a\n', 'tcp_octet'), b'2 a\n')
+
+
+
+class BrokenSocket(object):
+    """Takes at most chunk bytes per send, the stream breaks once limit bytes went out"""
+
+    def __init__(self, limit=None, chunk=7):
+        self.data = b''
+        self.limit = limit
+        self.chunk = chunk
+
+    def send(self, data):
+        if self.limit is not None and len(self.data) >= self.limit:
+            raise socket.error(errno.EPIPE, 'Broken pipe')
+        data = data[:self.chunk].tobytes()
+        self.data += data
+        return len(data)
+
+    def close(self):
+        pass
+
+
+class StreamSender(Sender):
+    def __init__(self, sockets, transport='tcp_octet'):
+        Sender.__init__(self, '127.0.0.1', transport=transport)
+        self.sockets = list(sockets)
+        self.used = []
+
+    def _connect(self):
+        if not self._connected:
+            self._socket = self.sockets.pop(0)
+            self.used.append(self._socket)
+            self._connected = True
+
+
+class WriteRestartTest(unittest.TestCase):
+    def test_restart_at_record_boundary(self):
+        msgs = [b'record-%d' % i for i in range(5)]
+        frames = [frame_msg(x, 'tcp_octet') for x in msgs]
+        # the first stream breaks inside the third record
+        sender = StreamSender([BrokenSocket(limit=len(frames[0]) + len(frames[1]) + 3), BrokenSocket()])
+        self.assertEqual(sender.send_batch(msgs), (5, sum(len(x) for x in frames)))
+        first, second = [x.data for x in sender.used]
+        self.assertTrue(first.startswith(frames[0] + frames[1]))
+        self.assertEqual(second, b''.join(frames[2:]))
+
+    def test_flush_restart(self):
+        sender = StreamSender([BrokenSocket(limit=0), BrokenSocket()], transport='tcp')
+        sender.send_string(b'a')
+        sender.send_string(b'b')
+        self.assertEqual(sender.used[1].data, b'a\nb\n')
+
+
+
+class FullSocket(object):
+    """Rejects the first failures sends with err"""
+
+    def __init__(self, err, failures):
+        self.err = err
+        self.failures = failures
+        self.data = []
+
+    def send(self, data):
+        if self.failures:
+            self.failures -= 1
+            raise socket.error(self.err, 'rejected')
+        self.data.append(data)
+        return len(data)
+
+    def sendto(self, data, address):
+        return self.send(data)
+
+
+class UdpErrorTest(unittest.TestCase):
+    def test_send_string_retries(self):
+        sender = Sender('127.0.0.1')
+        sender._socket = FullSocket(errno.ENOBUFS, 2)
+        sender.send_string(b'hello')
+        self.assertEqual(sender._socket.data, [b'hello'])
+        self.assertEqual(sender.metrics.retries, {'ENOBUFS': 2})
+        self.assertEqual(sender.metrics.errors, {})
+        self.assertEqual(sender.metrics.sent, 1)
+
+    def test_send_string_refused_is_an_error(self):
+        sender = Sender('127.0.0.1')
+        sender._socket = FullSocket(errno.ECONNREFUSED, 1)
+        sender.send_string(b'lost')
+        sender.send_string(b'kept')
+        self.assertEqual(sender._socket.data, [b'kept'])
+        self.assertEqual(sender.metrics.errors, {'ECONNREFUSED': 1})
+        self.assertEqual(sender.metrics.retries, {})
+        self.assertEqual(sender.metrics.sent, 1)
+
+    def test_closed_port_counts_errors(self):
+        probe = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        probe.bind(('127.0.0.1', 0))
+        port = probe.getsockname()[1]
+        probe.close()
+        sender = Sender('127.0.0.1', port)
+        for i in range(20):
+            sender.send_batch([b'x'] * 10, 10)
+        self.assertTrue(sender.metrics.errors.get('ECONNREFUSED'))
+        self.assertNotIn('ECONNREFUSED', sender.metrics.retries)
+
+
+if __name__ == '__main__':
+    unittest.main()
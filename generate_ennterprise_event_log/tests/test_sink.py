@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+"""
+SequenceTracker accounting and octet counted framing
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt.sink import SequenceTracker, Sink
+
+
+def track(seqs, **kwargs):
+    tracker = SequenceTracker(**kwargs)
+    for seq in seqs:
+        tracker.add(seq)
+    return tracker
+
+
+class SequenceTrackerTest(unittest.TestCase):
+    def test_in_order(self):
+        tracker = track(range(10))
+        self.assertEqual(tracker.stats()['missing'], 0)
+        self.assertEqual(tracker.expected, 10)
+        self.assertEqual(tracker.loss, 0.0)
+
+    def test_gaps(self):
+        tracker = track([0, 1, 4, 5, 9])
+        self.assertEqual(tracker.missing, 5)
+        self.assertEqual(tracker.missing_ranges(), [(2, 3), (6, 8)])
+        self.assertEqual(tracker.missing_ranges(1), [(2, 3)])
+        self.assertAlmostEqual(tracker.loss, 50.0)
+
+    def test_first(self):
+        tracker = track([100, 102], first=100)
+        self.assertEqual(tracker.expected, 3)
+        self.assertEqual(tracker.missing_ranges(), [(101, 101)])
+
+    def test_duplicates(self):
+        tracker = track([0, 1, 1, 2, 0])
+        self.assertEqual(tracker.duplicates, 2)
+        self.assertEqual(tracker.missing, 0)
+        self.assertEqual(tracker.received, 5)
+
+    def test_reordering_fills_gaps(self):
+        tracker = track([0, 3, 1, 2])
+        self.assertEqual(tracker.reordered, 2)
+        self.assertEqual(tracker.missing, 0)
+        self.assertEqual(tracker.missing_ranges(), [])
+
+    def test_reordering_splits_range(self):
+        tracker = track([0, 10, 5])
+        self.assertEqual(tracker.missing_ranges(), [(1, 4), (6, 9)])
+        tracker.add(1)
+        tracker.add(9)
+        self.assertEqual(tracker.missing_ranges(), [(2, 4), (6, 8)])
+        self.assertEqual(tracker.missing, 6)
+        tracker.add(5)
+        self.assertEqual(tracker.duplicates, 1)
+
+    def test_max_gaps(self):
+        tracker = track([0, 2, 4, 6], max_gaps=2)
+        self.assertEqual(tracker.missing_ranges(), [(3, 3), (5, 5)])
+        tracker.add(1)
+        # the forgotten range counts a late msg as duplicate, missing keeps it
+        self.assertEqual(tracker.duplicates, 1)
+        self.assertEqual(tracker.missing, 3)
+
+
+class SplitOctetTest(unittest.TestCase):
+    def test_complete_and_rest(self):
+        msgs, rest = Sink._split_octet(b'5 hello3 abc4 te')
+        self.assertEqual(msgs, [b'hello', b'abc'])
+        self.assertEqual(rest, b'4 te')
+
+    def test_partial_prefix(self):
+        self.assertEqual(Sink._split_octet(b'12'), ([], b'12'))
+
+    def test_utf8_length_in_bytes(self):
+        msg = u'事件'.encode('utf-8')
+        self.assertEqual(Sink._split_octet(b'6 ' + msg), ([msg], b''))
+
+    def test_bad_prefix(self):
+        self.assertEqual(Sink._split_octet(b'3 abcx1 b'), ([b'abc'], None))
+        self.assertEqual(Sink._split_octet(b'1' * 11), ([], None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+"""
+Spool write and scan round-trip
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt.spool import Spool, SpoolWriter
+
+MSGS = [b'<14>first', u'<14>第二'.encode('utf-8'), b'<14>third\n']
+
+
+class SpoolTest(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'test.spool')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read_all(self, spool, limit=2):
+        frames = []
+        offset = spool.start
+        while offset < spool.end:
+            table, offset = spool.scan(offset, limit)
+            for i in range(0, len(table), 2):
+                frames.append(spool.read(table[i], table[i + 1]))
+        return frames
+
+    def test_round_trip(self):
+        with SpoolWriter(self.path, 'tcp_octet') as writer:
+            writer.write(MSGS[0])
+            self.assertEqual(writer.write_batch(MSGS[1:], batch_size=1), (2, 26))
+        with Spool(self.path) as spool:
+            self.assertEqual(spool.transport, 'tcp_octet')
+            self.assertEqual(spool.count, 3)
+            self.assertEqual(self.read_all(spool),
+                             [b'9 <14>first', b'10 ' + MSGS[1], b'10 <14>third\n'])
+
+    def test_udp_unframed(self):
+        with SpoolWriter(self.path) as writer:
+            writer.write_batch(MSGS)
+        with Spool(self.path) as spool:
+            self.assertEqual(spool.transport, 'udp')
+            self.assertEqual(self.read_all(spool, limit=1024), MSGS)
+
+    def test_truncated(self):
+        with SpoolWriter(self.path) as writer:
+            writer.write_batch(MSGS)
+        with open(self.path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.path) - 1)
+        with Spool(self.path) as spool:
+            self.assertRaises(ValueError, spool.scan, spool.start, 10)
+
+    def test_bad_magic(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\0' * 64)
+        self.assertRaises(ValueError, Spool, self.path)
+
+
+if __name__ == '__main__':
+    unittest.main()
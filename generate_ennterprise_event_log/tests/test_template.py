@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+"""
+Template parsing and rendering
+
+    python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from PyEnt.template import Template
+
+SAMPLE = u'<14>2020-01-02 03:04:05 src=10.0.0.1 msg=上传 100% seq=7'
+SLOTS = {
+    'time': r'<14>(\S+ \S+)',
+    'src': r'src=(\S+)',
+    'seq': r'seq=(\d+)',
+}
+
+
+class TemplateTest(unittest.TestCase):
+    def test_names_in_sample_order(self):
+        self.assertEqual(Template(SAMPLE, SLOTS).names, ['time', 'src', 'seq'])
+
+    def test_defaults(self):
+        self.assertEqual(Template(SAMPLE, SLOTS).defaults,
+                         {'time': b'2020-01-02 03:04:05', 'src': b'10.0.0.1', 'seq': b'7'})
+
+    def test_render_defaults_gives_sample(self):
+        template = Template(SAMPLE, SLOTS)
+        self.assertEqual(template.render(template.defaults), SAMPLE.encode('utf-8'))
+
+    def test_render_keeps_percent_literals(self):
+        template = Template(SAMPLE, SLOTS)
+        values = {'time': b'2021-05-06 07:08:09', 'src': b'192.168.1.2', 'seq': b'42'}
+        self.assertEqual(template.render(values),
+                         u'<14>2021-05-06 07:08:09 src=192.168.1.2 msg=上传 100% seq=42'.encode('utf-8'))
+
+    def test_render_many(self):
+        template = Template(b'a=1 b=2', {'a': r'a=(\d+)', 'b': r'b=(\d+)'})
+        rows = [{'a': str(i).encode('ascii'), 'b': b'x'} for i in range(3)]
+        self.assertEqual(list(template.render_many(rows)), [b'a=0 b=x', b'a=1 b=x', b'a=2 b=x'])
+
+    def test_missing_slot(self):
+        self.assertRaises(ValueError, Template, SAMPLE, {'dst': r'dst=(\S+)'})
+
+    def test_overlapping_slots(self):
+        self.assertRaises(ValueError, Template, SAMPLE, {'src': r'src=(\S+)', 'ip': r'src=10\.(0\.0)'})
+
+
+if __name__ == '__main__':
+    unittest.main()
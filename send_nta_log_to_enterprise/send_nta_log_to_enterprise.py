@@ -1,11 +1,31 @@
 # -*- coding:utf-8 -*-
 
 import os
+import sys
 import json
 import time
+import random
 from random import randrange
 import socket
 import re
+import functools
+import multiprocessing
+import argparse
+import bisect
+import traceback
+from Queue import Empty
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'generate_ennterprise_event_log'))
+from PyEnt.pacer import Pacer, ramp_profile
+from PyEnt.fanout import FanoutSender
+from PyEnt.template import Template
+from PyEnt.fieldgen import FieldGenerator, Distribution, ip_pool, port_pool
+from PyEnt.sender import Sender
+from PyEnt.spool import SpoolWriter
+from PyEnt.metrics import SenderMetrics, ReportFormat
+from PyEnt.exporter import MetricsExporter
+from PyEnt.sequence import SequenceTagger, DEFAULT_FIELD
 
 
 #
@@ -60,50 +80,446 @@ def parse_json(raw_log_file):
         return json_log
 
 
-def update_json_log(raw_log_file):
-
-    data = []
-
-    update_json = json.loads(parse_json(raw_log_file), 'utf-8')
-
-    if update_json.has_key('timestamp'):
-        update_json['timestamp'] = set_timestamp()
-    else:
-        update_json['@timestamp'] = set_timestamp()
-    update_json['src_ip'] = set_internetip()
-    update_json['dst_ip'] = set_internetip()
-    update_json['src_port'] = randrange(0, 65536)
-    update_json['dst_port'] = randrange(0, 65536)
-    data = json.dumps(update_json)
-
-    return data
-
-
-def send_json(raw_log_file, host, iter_times):
-    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+json_templates = {}
+
+
+def build_json_template(raw_log_file, slots):
+    """Serialize sample with slots
+
+    :param raw_log_file: sample file path
+    :param slots: dict of slot name to (key path tuple, quoted), quoted slots render as json
+                  strings, the others as bare numbers, missing keys are added at their path
+    :return: Template
+    """
+    skeleton = json.loads(parse_json(raw_log_file), 'utf-8')
+    patterns = {}
+    for name, (path, quoted) in slots.items():
+        node = skeleton
+        for key in path[:-1]:
+            node = node.setdefault(key, {})
+        node[path[-1]] = '__slot_%s__' % name
+        if quoted:
+            patterns[name] = r'"(__slot_%s__)"' % name
+        else:
+            patterns[name] = r'("__slot_%s__")' % name
+    return Template(json.dumps(skeleton), patterns)
+
+
+def load_json_template(raw_log_file):
+    """Load sample once, serialize it with slots for the log_field values
+
+    :param raw_log_file: sample file path
+    :return: Template, rendered with timestamp, src_ip, dst_ip, src_port and dst_port
+    """
+    template = json_templates.get(raw_log_file)
+    if template is not None:
+        return template
+
+    time_key = 'timestamp' if json.loads(parse_json(raw_log_file)).has_key('timestamp') else '@timestamp'
+    # ips stay quoted json strings, timestamp and ports become bare numbers
+    template = build_json_template(raw_log_file, {
+        'timestamp': ((time_key,), False),
+        'src_ip': (('src_ip',), True),
+        'dst_ip': (('dst_ip',), True),
+        'src_port': (('src_port',), False),
+        'dst_port': (('dst_port',), False),
+    })
+    json_templates[raw_log_file] = template
+    return template
+
+
+def send_json(raw_log_file, host, iter_times, rate=1000, pacer=None, seed=None, metrics=None, tagger=None):
+    metrics = metrics or SenderMetrics()
+    sender = Sender(host, 9293, rate=rate, pacer=pacer, metrics=metrics, tagger=tagger)
 
     try:
-        HOST = host
-        PORT = 9293
-        s.connect((HOST, PORT))
-
-        count = 0
-        # print send_json_log
-
-        for i in range(int(iter_times)):
-
-            send_json_log = update_json_log(raw_log_file)
-            s.sendall(send_json_log)
+        count, size = sender.send_batch(generate_json(raw_log_file, int(iter_times), seed, rate), 256)
+    except (socket.error, IOError, ValueError) as err:
+        print "Send '%s' file failed: %s" % (raw_log_file, err)
+        print SenderMetrics.format(metrics.summary(emit=False))
+        return None
+
+    print "Send '%s' file '%s' times success." % (raw_log_file, count)
+    report = sender.pacer.report()
+    summary = metrics.summary(emit=False)
+    print "Achieved rate: %.1f EPS, requested rate: %s EPS" % (
+        summary['eps'], '%.1f' % report['requested_rate'] if report['requested_rate'] else 'unlimited')
+    print SenderMetrics.format(summary)
+    return count
+
+
+def _pooled(pools, name, rng, func):
+    pool = (pools or {}).get(name)
+    if pool is None:
+        return func
+    return lambda n: pool.sample(n, rng)
+
+
+def generate_json(raw_log_file, count, seed=None, rate=0, block_size=1024, pools=None, start_time=None):
+    template = load_json_template(raw_log_file)
+    if seed is None:
+        seed = random.getrandbits(31)
+    fields = FieldGenerator(seed)
+    # pools are shared by every generator, draw with a per generator RNG
+    rng = random.Random(seed)
+    src_ip_block = _pooled(pools, 'src_ip', rng, fields.internet_ips)
+    dst_ip_block = _pooled(pools, 'dst_ip', rng, fields.internet_ips)
+    src_port_block = _pooled(pools, 'src_port', rng, fields.ports)
+    dst_port_block = _pooled(pools, 'dst_port', rng, fields.ports)
+    interval = 1000.0 / rate if rate else 0
+    render = template.render
+    # one timeline over all blocks: with a rate it runs count / rate seconds from start_time,
+    # unpaced it follows the clock; it never goes back either way
+    cursor = start_time
+    start = 0
+    while start < count:
+        size = min(block_size, count - start)
+        start += size
+        if cursor is None or not interval:
+            cursor = max(cursor, int(round(time.time() * 1000)))
+        timestamps = fields.timestamps(size, start=cursor, interval=interval)
+        cursor += size * interval
+        src_ips = src_ip_block(size)
+        dst_ips = dst_ip_block(size)
+        src_ports = src_port_block(size)
+        dst_ports = dst_port_block(size)
+        for i in range(size):
+            yield render({
+                'timestamp': '%d' % timestamps[i],
+                'src_ip': src_ips[i],
+                'dst_ip': dst_ips[i],
+                'src_port': '%d' % src_ports[i],
+                'dst_port': '%d' % dst_ports[i],
+            })
+
+
+def send_json_fanout(raw_log_file, host, iter_times, workers=None, rate=0, seed=None, tagger=None):
+    fanout = FanoutSender(host, 9293, workers=workers, rate=rate, seed=seed, tagger=tagger)
+    report = fanout.send(functools.partial(generate_json, raw_log_file), int(iter_times))
+    for worker in report['workers']:
+        print "Worker %d (seed %d) sent %d in %.3fs" % (worker['worker'], worker['seed'], worker['sent'], worker['elapsed'])
+    print "Send '%s' file '%s' times by %d workers, %.1f EPS." % (
+        raw_log_file, report['sent'], len(report['workers']), report['achieved_rate'])
+    print "Errors: %s, generation %.2fs, send %.2fs (summed over workers)" % (
+        report['errors'] or 0, report['gen_time'], report['send_time'])
+    return report
+
+
+def load_protocol_samples(path=raw_log_path):
+    samples = {}
+    for log_file in sorted(os.listdir(path)):
+        protocol = json.loads(parse_json(path + log_file))['protocol']
+        samples.setdefault(protocol, []).append(path + log_file)
+    return samples
+
+
+# seconds between producer liveness checks while waiting for a block
+PRODUCER_POLL = 1.0
+
+
+def _json_blocks(raw_log_file, count, seed, rate, block_size, pools, start_time):
+    block = []
+    for send_json_log in generate_json(raw_log_file, count, seed, rate, block_size, pools, start_time):
+        block.append(send_json_log)
+        if len(block) >= block_size:
+            yield block
+            block = []
+    if block:
+        yield block
+
+
+def _produce_json(raw_log_file, count, seed, rate, block_size, pools, start_time, queue):
+    try:
+        for block in _json_blocks(raw_log_file, count, seed, rate, block_size, pools, start_time):
+            queue.put(block)
+    except Exception:
+        # the traceback goes to the consumer, the exception itself may not pickle
+        queue.put(RuntimeError('Producer of %s failed:\n%s' % (raw_log_file, traceback.format_exc())))
 
-            count = count + 1
-            if count % 1000 == 0:
-                time.sleep(1)
 
-        print "Send '%s' file '%s' times success." % (raw_log_file, count)
-    except BaseException as err:
-        print "Send '%s' file failed, check it please!" % raw_log_file
-    finally:
-        s.close()
+def _next_block(queue, producer):
+    while True:
+        try:
+            block = queue.get(timeout=PRODUCER_POLL)
+        except Empty:
+            if producer.is_alive():
+                continue
+            # an exited producer has flushed everything it put
+            try:
+                block = queue.get(timeout=PRODUCER_POLL)
+            except Empty:
+                raise RuntimeError('Producer %s exited with code %s before its msgs were sent' % (
+                    producer.name, producer.exitcode))
+        if isinstance(block, Exception):
+            raise block
+        return block
+
+
+class JsonMix(object):
+    def __init__(self, count, weights=None, seed=None, rate=0, block_size=256, path=raw_log_path, pools=None,
+                 processes=True):
+        """Weighted mix of all protocol samples, interleaved into one stream
+
+        Each sample file is rendered by its own producer process, the consumer
+        interleaves them by smooth weighted round-robin, so every window of the
+        stream keeps the protocol proportions.
+
+        :param count: total msgs
+        :param weights: dict of protocol to weight, default is equal weights, samples
+                        of the same protocol (e.g. dns.txt and nta40_dns.txt) share its weight
+        :param seed: base RNG seed, sample i uses seed + i
+        :param rate: total events per second, used for timestamp spacing
+        :param block_size: msgs per block handed over by producers
+        :param path: sample directory
+        :param pools: dict of src_ip/dst_ip/src_port/dst_port to ValuePool, shared by all
+                      samples, fields without a pool stay unbounded random
+        :param processes: render in producer processes, False renders in this process,
+                          e.g. inside a fanout worker, which cannot start processes
+        """
+        samples = load_protocol_samples(path)
+        weights = weights or dict.fromkeys(samples, 1)
+        for protocol in weights:
+            assert protocol in samples, 'No sample for protocol %s' % protocol
+        if seed is None:
+            seed = random.getrandbits(31)
+
+        self.files = []
+        self.protocols = []
+        self.weights = []
+        for protocol in sorted(weights):
+            if not weights[protocol]:
+                continue
+            for raw_log_file in samples[protocol]:
+                self.files.append(raw_log_file)
+                self.protocols.append(protocol)
+                self.weights.append(float(weights[protocol]) / len(samples[protocol]))
+        total_weight = sum(self.weights)
+        self.counts = self._split(count, [x / total_weight for x in self.weights])
+        self.sent = dict.fromkeys(self.protocols, 0)
+        self.seed = seed
+        self._rate = rate
+        self._block_size = block_size
+        self._pools = pools
+        self._processes = processes
+
+    @staticmethod
+    def _split(count, shares):
+        counts = [int(count * x) for x in shares]
+        rest = sorted(range(len(shares)), key=lambda i: count * shares[i] - counts[i], reverse=True)
+        for i in rest[:count - sum(counts)]:
+            counts[i] += 1
+        return counts
+
+    def __iter__(self):
+        next_blocks = []
+        producers = []
+        # every sample runs on the same timeline, its share of the rate from one start
+        start_time = int(round(time.time() * 1000))
+        for i, raw_log_file in enumerate(self.files):
+            args = (raw_log_file, self.counts[i], self.seed + i, self._rate * self.counts[i] / float(sum(self.counts) or 1),
+                    self._block_size, self._pools, start_time)
+            if not self._processes:
+                next_blocks.append(functools.partial(next, _json_blocks(*args)))
+                continue
+            queue = multiprocessing.Queue(maxsize=8)
+            producer = multiprocessing.Process(target=_produce_json, args=args + (queue,))
+            producer.daemon = True
+            producer.start()
+            next_blocks.append(functools.partial(_next_block, queue, producer))
+            producers.append(producer)
+
+        try:
+            remaining = list(self.counts)
+            buffers = [[] for x in self.files]
+            positions = [0] * len(self.files)
+            current = [0.0] * len(self.files)
+            active = [i for i in range(len(self.files)) if remaining[i]]
+            while active:
+                # smooth weighted round-robin over samples with msgs left
+                total = 0.0
+                pick = active[0]
+                for i in active:
+                    current[i] += self.weights[i]
+                    total += self.weights[i]
+                    if current[i] > current[pick]:
+                        pick = i
+                current[pick] -= total
+
+                if positions[pick] >= len(buffers[pick]):
+                    buffers[pick] = next_blocks[pick]()
+                    positions[pick] = 0
+                send_json_log = buffers[pick][positions[pick]]
+                positions[pick] += 1
+                remaining[pick] -= 1
+                self.sent[self.protocols[pick]] += 1
+                if not remaining[pick]:
+                    active.remove(pick)
+                yield send_json_log
+        finally:
+            for producer in producers:
+                if producer.is_alive():
+                    producer.terminate()
+                producer.join()
+
+
+session_samples = {
+    'dns': 'nta40_dns.txt',
+    'flow': 'nta40_flow.txt',
+    'http': 'http.txt',
+    'smtp': 'nta40_smtp.txt',
+}
+session_domains = ['www.baidu.com', 'image.baidu.com', 'ms0.meituan.net', 'i.meituan.com', 'mail.qq.com', 'www.hansight.com']
+session_resolvers = ['114.114.114.114', '61.139.2.69', '223.5.5.5']
+session_app_ports = {'http': 80, 'smtp': 25}
+
+
+def _blocks(func, block_size=1024):
+    while True:
+        for item in func(block_size):
+            yield item
+
+
+class SessionGenerator(object):
+    def __init__(self, count, max_sessions=1000, app_weights=None, seed=None, path=raw_log_path, pools=None):
+        """Correlated NTA sessions: dns lookup, then flow, then http/smtp application log
+
+        The three records of a session share client ip, ports, flow_id and domain, and
+        their timestamps are ordered. Live sessions are interleaved, at most max_sessions
+        are kept in memory, a finished session is replaced by a new one.
+
+        :param count: total msgs
+        :param max_sessions: live session table size
+        :param app_weights: dict of application protocol to weight, fractions allowed, default is http 3, smtp 1
+        :param seed: RNG seed
+        :param path: sample directory
+        :param pools: dict of src_ip (clients)/dst_ip (servers)/src_port to ValuePool,
+                      fields without a pool stay unbounded random
+        """
+        if seed is None:
+            seed = random.getrandbits(31)
+        self.seed = seed
+        self.pools = pools
+        self.count = count
+        self.max_sessions = max_sessions
+        self.sent = dict.fromkeys(session_samples, 0)
+        self.sessions = 0
+        app_weights = app_weights or {'http': 3, 'smtp': 1}
+        # apps are drawn by bisecting the running weight sum
+        self._apps = []
+        self._app_weights = []
+        total = 0.0
+        for app in sorted(app_weights):
+            assert app in session_app_ports, 'No session sample for %s' % app
+            assert app_weights[app] >= 0, 'Negative weight for %s' % app
+            if not app_weights[app]:
+                continue
+            total += app_weights[app]
+            self._apps.append(app)
+            self._app_weights.append(total)
+        assert total > 0, 'Every app weight is 0'
+
+        common = {
+            'timestamp': (('@timestamp',), False),
+            'src_ip': (('src_ip',), True),
+            'dst_ip': (('dst_ip',), True),
+            'src_port': (('src_port',), False),
+            'dst_port': (('dst_port',), False),
+        }
+        with_flow = dict(common, flow_id=(('flow_id',), False), end_timestamp=(('@end_timestamp',), False))
+        self._templates = {
+            'dns': build_json_template(path + session_samples['dns'], dict(with_flow, domain=(('dns', 'rrname'), True))),
+            'flow': build_json_template(path + session_samples['flow'], with_flow),
+            'http': build_json_template(path + session_samples['http'], dict(
+                common, flow_id=(('flow_id',), False), domain=(('request', 'host'), True),
+                session_key=(('session_key',), True))),
+            'smtp': build_json_template(path + session_samples['smtp'], with_flow),
+        }
+
+    def __iter__(self):
+        rng = random.Random(self.seed)
+        fields = FieldGenerator(self.seed)
+        client_ips = _blocks(_pooled(self.pools, 'src_ip', rng, fields.intranet_ips))
+        server_ips = _blocks(_pooled(self.pools, 'dst_ip', rng, fields.internet_ips))
+        client_ports = _blocks(_pooled(self.pools, 'src_port', rng, lambda n: fields.ports(n, 1024, 65536)))
+        templates = self._templates
+        live = []
+        sent = 0
+        while sent < self.count:
+            while len(live) < self.max_sessions:
+                live.append(self._new_session(rng, next(client_ips), next(server_ips), next(client_ports), next(client_ports)))
+            index = rng.randrange(len(live))
+            session = live[index]
+            kind, values = session.pop(0)
+
+            now = int(time.time() * 1000)
+            timestamp = max(now, values.pop('after') + rng.randint(1, 50))
+            values['timestamp'] = '%d' % timestamp
+            if 'duration' in values:
+                values['end_timestamp'] = '%d' % (timestamp + values.pop('duration'))
+            if session:
+                session[0][1]['after'] = timestamp
+            else:
+                # swap-remove keeps the table O(1) per msg
+                live[index] = live[-1]
+                live.pop()
+
+            self.sent[kind] += 1
+            sent += 1
+            yield templates[kind].render(values)
+
+    def _new_session(self, rng, client_ip, server_ip, dns_port, app_port):
+        self.sessions += 1
+        app = self._apps[bisect.bisect_right(self._app_weights, rng.random() * self._app_weights[-1])]
+        domain = session_domains[rng.randrange(len(session_domains))]
+        resolver = session_resolvers[rng.randrange(len(session_resolvers))]
+        flow_id = '%d' % rng.getrandbits(50)
+        app_values = {
+            'src_ip': client_ip,
+            'dst_ip': server_ip,
+            'src_port': '%d' % app_port,
+            'dst_port': '%d' % session_app_ports[app],
+            'flow_id': flow_id,
+        }
+        dns = {
+            'after': 0,
+            'src_ip': client_ip,
+            'dst_ip': resolver,
+            'src_port': '%d' % dns_port,
+            'dst_port': '53',
+            'flow_id': flow_id,
+            'duration': rng.randint(1, 20),
+            'domain': domain,
+        }
+        flow = dict(app_values, duration=rng.randint(100, 5000))
+        if app == 'http':
+            application = dict(app_values, domain=domain, session_key='%s-http-%s' % (client_ip, server_ip))
+        else:
+            application = dict(app_values, duration=rng.randint(100, 2000))
+        return [('dns', dns), ('flow', flow), (app, application)]
+
+
+def send_session_json(host, iter_times, max_sessions=1000, app_weights=None, rate=1000, seed=None, pacer=None,
+                      tagger=None):
+    sessions = SessionGenerator(int(iter_times), max_sessions, app_weights, seed)
+    sender = Sender(host, 9293, rate=rate, pacer=pacer, tagger=tagger)
+    count, size = sender.send_batch(sessions, 256)
+    for protocol in sorted(sessions.sent):
+        print "%-8s %d" % (protocol, sessions.sent[protocol])
+    print "Send %d session msgs of %d sessions (seed %d)." % (count, sessions.sessions, sessions.seed)
+    print SenderMetrics.format(sender.metrics.summary(emit=False))
+    return sessions.sent
+
+
+def send_mixed_json(host, iter_times, weights=None, rate=1000, seed=None, pacer=None, tagger=None):
+    mix = JsonMix(int(iter_times), weights, seed, rate)
+    sender = Sender(host, 9293, rate=rate, pacer=pacer, tagger=tagger)
+    count, size = sender.send_batch(mix, 256)
+    for protocol in sorted(mix.sent):
+        print "%-8s %d" % (protocol, mix.sent[protocol])
+    report = sender.pacer.report()
+    print "Send mixed stream '%s' times (seed %d), %.1f EPS." % (count, mix.seed, report['achieved_rate'])
+    print SenderMetrics.format(sender.metrics.summary(emit=False))
+    return mix.sent
 
 
 def start():
@@ -126,6 +542,332 @@ def start():
     print "Cost time: %s" % costtime
 
 
+default_config = {
+    'host': None,
+    'port': 9293,
+    'count': None,
+    'duration': None,
+    'rate': 1000,
+    'ramp_up': 0,
+    'ramp_down': 0,
+    'mix': None,
+    'sessions': 0,
+    'src_ips': 0,
+    'dst_ips': 0,
+    'src_ports': 0,
+    'dst_ports': 0,
+    'distribution': 'uniform',
+    'zipf_s': 1.0,
+    'hot_fraction': 0.1,
+    'hot_weight': 0.9,
+    'seed': None,
+    'workers': 1,
+    'spool': None,
+    'replay': None,
+    'loops': 1,
+    'report_interval': 5,
+    'report_format': 'text',
+    'metrics_host': '127.0.0.1',
+    'metrics_port': 0,
+    'run_id': None,
+    'seq_field': DEFAULT_FIELD,
+    'output': '-',
+}
+
+
+def parse_mix(value):
+    mix = {}
+    for item in value.split(','):
+        protocol, _, weight = item.partition('=')
+        mix[protocol.strip()] = float(weight or 1)
+    return mix
+
+
+def load_config(argv=None):
+    parser = argparse.ArgumentParser(description='Send NTA json logs to enterprise')
+    parser.add_argument('-c', '--config', help='json config file, command line options override it')
+    parser.add_argument('--host', help='enterprise ip')
+    parser.add_argument('--port', type=int, help='nta port, default is 9293')
+    parser.add_argument('-n', '--count', type=int, help='total msgs to send')
+    parser.add_argument('-d', '--duration', type=float, help='seconds to send, instead of or on top of count')
+    parser.add_argument('-r', '--rate', type=float, help='events per second, 0 is unpaced, default is 1000')
+    parser.add_argument('--ramp-up', type=float, help='seconds to ramp from 0 to rate')
+    parser.add_argument('--ramp-down', type=float, help='seconds to ramp from rate to 0 at the end, needs duration')
+    parser.add_argument('-m', '--mix', type=parse_mix, help='protocol weights, e.g. flow=50,dns=30,http=20, default is all equal')
+    parser.add_argument('--sessions', type=int, help='send correlated dns/flow/app sessions with this many live sessions, '
+                                                      'mix then weights the application protocols (http, smtp)')
+    parser.add_argument('--src-ips', type=int, help='distinct src ips, default is unbounded')
+    parser.add_argument('--dst-ips', type=int, help='distinct dst ips, default is unbounded')
+    parser.add_argument('--src-ports', type=int, help='distinct src ports, default is unbounded')
+    parser.add_argument('--dst-ports', type=int, help='distinct dst ports, default is unbounded')
+    parser.add_argument('--distribution', choices=Distribution, help='popularity of pooled values, default is uniform')
+    parser.add_argument('--zipf-s', type=float, help='zipf exponent, default is 1.0')
+    parser.add_argument('--hot-fraction', type=float, help='hotset share of hot values, default is 0.1')
+    parser.add_argument('--hot-weight', type=float, help='hotset share of draws on hot values, default is 0.9')
+    parser.add_argument('-s', '--seed', type=int, help='RNG seed')
+    parser.add_argument('-w', '--workers', type=int, help='sender processes, each with its own socket, seed and share '
+                                                          'of rate, default is 1')
+    parser.add_argument('--spool', help='write the rendered msgs to this spool file instead of sending them')
+    parser.add_argument('--replay', help='send a spool file written by --spool, at rate or unpaced')
+    parser.add_argument('--loops', type=int, help='times to replay the spool, default is 1, duration replays until it ends')
+    parser.add_argument('--report-interval', type=float, help='seconds between progress reports on stderr, 0 disables, default is 5')
+    parser.add_argument('--report-format', choices=ReportFormat, help='progress report format, default is text')
+    parser.add_argument('--metrics-port', type=int, help='serve OpenMetrics on this port during the run, 0 disables, default is 0')
+    parser.add_argument('--metrics-host', help='OpenMetrics listen address, default is 127.0.0.1, 0.0.0.0 listens on every interface')
+    parser.add_argument('--run-id', help='tag every msg with this run id and a sequence number, auto picks one; '
+                                         'check the run with Event.check_run, default is no tag')
+    parser.add_argument('--seq-field', help='json key of the tag, default is pyent_seq')
+    parser.add_argument('-o', '--output', help='results json file, - is stdout')
+    args = parser.parse_args(argv)
+
+    config = dict(default_config)
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+    for key, value in vars(args).items():
+        if key != 'config' and value is not None:
+            config[key] = value
+
+    if config['spool'] and config['replay']:
+        parser.error('spool and replay are separate phases')
+    if not config['host'] and not config['spool']:
+        parser.error('host is required')
+    if not config['count'] and not config['duration'] and not config['replay']:
+        parser.error('count or duration is required')
+    if config['spool'] and not config['count'] and not config['rate']:
+        parser.error('spool needs count, or duration and rate')
+    if config['ramp_down'] and not config['duration']:
+        parser.error('ramp_down needs duration')
+    if config['run_id'] and config['replay']:
+        parser.error('run_id tags msgs as they are rendered, tag the spool with --spool instead')
+    if config['workers'] < 1:
+        parser.error('workers must be at least 1')
+    if config['workers'] > 1:
+        if config['spool'] or config['replay']:
+            parser.error('workers send live msgs, spool and replay run in one process')
+        if config['ramp_up'] or config['ramp_down']:
+            parser.error('workers pace at a constant share of rate, ramps run in one process')
+        if config['metrics_port']:
+            parser.error('metrics_port serves one process, the results carry the merged worker counters')
+    return config
+
+
+def _until(iterable, deadline):
+    for i, item in enumerate(iterable):
+        if not i & 0x3f and time.time() >= deadline:
+            return
+        yield item
+
+
+def build_pools(config, seed=None):
+    """Build the field pools requested by config
+
+    :param config: config dict, see default_config
+    :param seed: RNG seed, each pool uses its own offset from it
+    :return: dict of field name to ValuePool, None when no pool is requested
+    """
+    if seed is None:
+        seed = random.getrandbits(31)
+    kwargs = {
+        'distribution': config['distribution'],
+        'zipf_s': config['zipf_s'],
+        'hot_fraction': config['hot_fraction'],
+        'hot_weight': config['hot_weight'],
+    }
+    pools = {}
+    # session clients are intranet hosts, like the unpooled SessionGenerator
+    if config['src_ips']:
+        kind = 'intranet' if config['sessions'] else 'internet'
+        pools['src_ip'] = ip_pool(config['src_ips'], kind, seed=seed, **kwargs)
+    if config['dst_ips']:
+        pools['dst_ip'] = ip_pool(config['dst_ips'], seed=seed + 1, **kwargs)
+    if config['src_ports']:
+        pools['src_port'] = port_pool(config['src_ports'], seed=seed + 2, **kwargs)
+    if config['dst_ports']:
+        pools['dst_port'] = port_pool(config['dst_ports'], 1, seed=seed + 3, **kwargs)
+    return pools or None
+
+
+def _fanout_stream(config, rate, pools, deadline, count):
+    # runs in a fanout worker, random is already seeded with seed + worker index
+    seed = random.getrandbits(31)
+    if config['sessions']:
+        stream = SessionGenerator(count, max(config['sessions'] // config['workers'], 1), config['mix'], seed,
+                                  pools=pools)
+    else:
+        stream = JsonMix(count, config['mix'], seed, rate, pools=pools, processes=False)
+    return _until(stream, deadline) if deadline else stream
+
+
+def fanout(config, count, seed, pools, tagger):
+    """Send the configured stream from config['workers'] processes
+
+    :param config: config dict, see default_config
+    :param count: total msgs, split evenly across workers
+    :param seed: base RNG seed, worker i uses seed + i
+    :param pools: field pools, see build_pools, every worker draws from a copy
+    :param tagger: SequenceTagger, worker i tags stream <run id>.<i>
+    :return: results dict
+    """
+    rate = config['rate']
+    workers = config['workers']
+    deadline = time.time() + config['duration'] if config['duration'] else None
+    sender = FanoutSender(config['host'], config['port'], workers=workers, rate=rate, seed=seed, tagger=tagger)
+    generator = functools.partial(_fanout_stream, config, rate / float(workers), pools, deadline)
+    started = datetime.now()
+    report = sender.send(generator, count, 256)
+    return {
+        'started': started.isoformat(),
+        'finished': datetime.now().isoformat(),
+        'config': config,
+        'seed': seed,
+        'sent': report['sent'],
+        'bytes': report['bytes'],
+        'elapsed': report['elapsed'],
+        'requested_rate': report['requested_rate'],
+        'dropped': None,
+        'achieved_rate': report['achieved_rate'],
+        'protocols': None,
+        'run_id': report['run_id'],
+        # check_run takes this as sent, one count per worker stream
+        'tagged': dict((x['run_id'], x['tagged']) for x in report['workers']) if tagger is not None else None,
+        'errors': report['errors'],
+        'retries': report['retries'],
+        'workers': report['workers'],
+        'metrics': None,
+    }
+
+
+def _send_exported(config, metrics, send):
+    if not config['metrics_port']:
+        return send()
+    exporter = MetricsExporter(host=config['metrics_host'], port=config['metrics_port']).start()
+    exporter.registry.add_sender('nta', metrics)
+    try:
+        return send()
+    finally:
+        exporter.registry.remove_sender('nta')
+        exporter.stop()
+
+
+def replay(config):
+    rate = config['rate']
+    duration = config['duration']
+    # the spool is looped until duration ends
+    loops = None if duration else config['loops']
+    pacer = None
+    if rate and (config['ramp_up'] or config['ramp_down']):
+        hold = None
+        if duration:
+            hold = max(duration - config['ramp_up'] - config['ramp_down'], 0)
+        pacer = Pacer(profile=ramp_profile(rate, config['ramp_up'], hold, config['ramp_down']))
+
+    metrics = SenderMetrics(config['report_interval'], report_format=config['report_format'])
+    sender = Sender(config['host'], config['port'], rate=rate, pacer=pacer, metrics=metrics)
+    started = datetime.now()
+    starttime = time.time()
+    sent, size = _send_exported(config, metrics, lambda: sender.replay(config['replay'], loops, 256, duration))
+    elapsed = time.time() - starttime
+    report = sender.pacer.report()
+
+    return {
+        'started': started.isoformat(),
+        'finished': datetime.now().isoformat(),
+        'config': config,
+        'sent': sent,
+        'bytes': size,
+        'elapsed': elapsed,
+        'requested_rate': report['requested_rate'],
+        'dropped': report.get('dropped'),
+        'achieved_rate': sent / elapsed if elapsed else 0.0,
+        'metrics': metrics.summary(emit=bool(config['report_interval'])),
+    }
+
+
+def run(config):
+    if config['replay']:
+        return replay(config)
+
+    rate = config['rate']
+    duration = config['duration']
+    count = config['count']
+    if not count:
+        count = int(rate * duration) if rate else 1 << 62
+
+    pacer = None
+    if rate and (config['ramp_up'] or config['ramp_down']) and not config['spool']:
+        hold = None
+        if duration:
+            hold = max(duration - config['ramp_up'] - config['ramp_down'], 0)
+        pacer = Pacer(profile=ramp_profile(rate, config['ramp_up'], hold, config['ramp_down']))
+
+    seed = config['seed']
+    if seed is None:
+        seed = random.getrandbits(31)
+    pools = build_pools(config, seed)
+    tagger = None
+    if config['run_id']:
+        tagger = SequenceTagger(None if config['run_id'] == 'auto' else config['run_id'], config['seq_field'], 'json')
+    if config['workers'] > 1:
+        return fanout(config, count, seed, pools, tagger)
+    if config['sessions']:
+        mix = SessionGenerator(count, config['sessions'], config['mix'], seed, pools=pools)
+    else:
+        mix = JsonMix(count, config['mix'], seed, rate, pools=pools)
+    started = datetime.now()
+    stream = iter(mix)
+    metrics = None
+    if config['spool']:
+        # timestamps are spaced for rate, as if the msgs were sent live
+        starttime = time.time()
+        if tagger is not None:
+            stream = tagger.tag_all(stream)
+        with SpoolWriter(config['spool']) as writer:
+            sent, size = writer.write_batch(stream)
+        elapsed = time.time() - starttime
+        report = {'requested_rate': rate}
+    else:
+        metrics = SenderMetrics(config['report_interval'], report_format=config['report_format'])
+        sender = Sender(config['host'], config['port'], rate=rate, pacer=pacer, metrics=metrics, tagger=tagger)
+        if duration:
+            stream = _until(stream, time.time() + duration)
+        starttime = time.time()
+        sent, size = _send_exported(config, metrics, lambda: sender.send_batch(stream, 256))
+        elapsed = time.time() - starttime
+        report = sender.pacer.report()
+
+    return {
+        'started': started.isoformat(),
+        'finished': datetime.now().isoformat(),
+        'config': config,
+        'seed': mix.seed,
+        'sent': sent,
+        'bytes': size,
+        'elapsed': elapsed,
+        'requested_rate': report['requested_rate'],
+        'dropped': report.get('dropped'),
+        'achieved_rate': sent / elapsed if elapsed else 0.0,
+        'protocols': mix.sent,
+        'run_id': tagger.run_id if tagger is not None else None,
+        'tagged': tagger.next_seq if tagger is not None else None,
+        'metrics': metrics.summary(emit=bool(config['report_interval'])) if metrics else None,
+    }
+
+
+def main(argv=None):
+    config = load_config(argv)
+    results = run(config)
+    if config['output'] == '-':
+        print json.dumps(results, indent=2, sort_keys=True)
+    else:
+        with open(config['output'], 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+    return results
+
+
 if __name__ == '__main__':
 
-    start()
+    if len(sys.argv) > 1:
+        main()
+    else:
+        start()
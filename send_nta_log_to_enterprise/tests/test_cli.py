@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Command line runs against a local UDP socket
+
+    python -m unittest discover -s tests
+"""
+
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import send_nta_log_to_enterprise as nta
+
+
+class UdpSink(object):
+    def __init__(self):
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 8 << 20)
+        self.socket.bind(('127.0.0.1', 0))
+        self.socket.settimeout(0.5)
+        self.port = self.socket.getsockname()[1]
+        self.msgs = []
+        self.thread = threading.Thread(target=self._serve)
+        self.thread.daemon = True
+        self.running = True
+        self.thread.start()
+
+    def _serve(self):
+        while self.running:
+            try:
+                self.msgs.append(self.socket.recv(65536))
+            except socket.timeout:
+                continue
+
+    def stop(self):
+        self.running = False
+        self.thread.join()
+        self.socket.close()
+
+
+class FanoutTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        # samples are read from ./nta_json_sample/
+        os.chdir(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+        self.dir = tempfile.mkdtemp()
+        self.sink = UdpSink()
+
+    def tearDown(self):
+        self.sink.stop()
+        shutil.rmtree(self.dir)
+        os.chdir(self.cwd)
+
+    def run_main(self, *args):
+        output = os.path.join(self.dir, 'results.json')
+        nta.main(['--host', '127.0.0.1', '--port', str(self.sink.port), '--report-interval', '0',
+                  '-o', output] + list(args))
+        with open(output) as f:
+            return json.load(f)
+
+    def test_workers(self):
+        results = self.run_main('-n', '2000', '-r', '20000', '-w', '4', '-s', '7', '--run-id', 'cli')
+        self.assertEqual(results['sent'], 2000)
+        self.assertEqual(len(results['workers']), 4)
+        self.assertEqual(sorted(x['seed'] for x in results['workers']), [7, 8, 9, 10])
+        self.assertEqual(results['tagged'], {'cli.0': 500, 'cli.1': 500, 'cli.2': 500, 'cli.3': 500})
+        self.assertEqual(sum(x['sent'] for x in results['workers']), 2000)
+
+    def test_session_workers(self):
+        results = self.run_main('-n', '900', '-r', '0', '-w', '3', '--sessions', '30')
+        self.assertEqual(results['sent'], 900)
+        self.assertEqual(len(results['workers']), 3)
+
+    def test_workers_refuse_spool(self):
+        with self.assertRaises(SystemExit):
+            nta.load_config(['--spool', os.path.join(self.dir, 'x.spool'), '-n', '10', '-w', '2'])
+
+
+if __name__ == '__main__':
+    unittest.main()
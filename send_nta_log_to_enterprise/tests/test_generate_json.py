@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+
+"""
+Timestamps of generated NTA msgs and the mixed stream producers
+
+    python -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import send_nta_log_to_enterprise as nta
+
+sample = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nta_json_sample', 'http.txt')
+
+
+def timestamps(msgs):
+    return [int(json.loads(x)['@timestamp']) for x in msgs]
+
+
+class GenerateJsonTest(unittest.TestCase):
+    def test_rate_timeline_spans_blocks(self):
+        # 1000 msgs at 100/s are 10 seconds, whatever the block size
+        stamps = timestamps(nta.generate_json(sample, 1000, seed=1, rate=100, block_size=64, start_time=1000000))
+        self.assertEqual(len(stamps), 1000)
+        self.assertEqual(stamps, sorted(stamps))
+        self.assertEqual(stamps[0], 1000000)
+        self.assertEqual(stamps[-1], 1000000 + 999 * 10)
+
+    def test_rate_timeline_starts_now(self):
+        now = int(time.time() * 1000)
+        stamps = timestamps(nta.generate_json(sample, 300, seed=1, rate=1000, block_size=7))
+        self.assertEqual(stamps, sorted(stamps))
+        self.assertTrue(now <= stamps[0] <= now + 1000)
+        self.assertEqual(stamps[-1] - stamps[0], 299)
+
+    def test_unpaced_never_goes_back(self):
+        stamps = timestamps(nta.generate_json(sample, 500, seed=1, block_size=10, start_time=int(time.time() * 1000) + 60000))
+        self.assertEqual(stamps, sorted(stamps))
+
+
+
+def _fail(*args, **kwargs):
+    raise IOError('sample gone')
+    yield
+
+
+def _die(*args, **kwargs):
+    os._exit(3)
+    yield
+
+
+class JsonMixTest(unittest.TestCase):
+    def setUp(self):
+        self.generate_json = nta.generate_json
+        self.path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nta_json_sample') + os.sep
+
+    def tearDown(self):
+        nta.generate_json = self.generate_json
+
+    def mix(self):
+        return nta.JsonMix(100, weights={'http': 1}, seed=1, block_size=10, path=self.path)
+
+    def test_mix(self):
+        msgs = list(self.mix())
+        self.assertEqual(len(msgs), 100)
+
+    def test_producer_error_is_raised(self):
+        # producers are forked, they inherit the patched generator
+        nta.generate_json = _fail
+        with self.assertRaises(RuntimeError) as context:
+            list(self.mix())
+        self.assertIn('sample gone', str(context.exception))
+
+    def test_producer_exit_is_raised(self):
+        nta.generate_json = _die
+        with self.assertRaises(RuntimeError) as context:
+            list(self.mix())
+        self.assertIn('code 3', str(context.exception))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+"""
+Correlated NTA sessions
+
+    python -m unittest discover -s tests
+"""
+
+import json
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import send_nta_log_to_enterprise as nta
+
+path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'nta_json_sample') + os.sep
+
+
+def records(count, **kwargs):
+    return [json.loads(x) for x in nta.SessionGenerator(count, path=path, seed=1, **kwargs)]
+
+
+class SessionGeneratorTest(unittest.TestCase):
+    def test_records_share_flow_id(self):
+        # one live session at a time, records come as dns, flow, app
+        rows = records(300, max_sessions=1)
+        flow_ids = set()
+        for i in range(0, len(rows), 3):
+            dns, flow, app = rows[i:i + 3]
+            self.assertEqual(dns['flow_id'], flow['flow_id'])
+            self.assertEqual(flow['flow_id'], app['flow_id'])
+            self.assertEqual(dns['src_ip'], app['src_ip'])
+            flow_ids.add(flow['flow_id'])
+        self.assertEqual(len(flow_ids), 100)
+
+    def test_fractional_weights(self):
+        sessions = nta.SessionGenerator(3000, 10, {'http': 0.25, 'smtp': 0.75}, seed=1, path=path)
+        list(sessions)
+        self.assertAlmostEqual(sessions.sent['smtp'] / 1000.0, 0.75, delta=0.05)
+        self.assertAlmostEqual(sessions.sent['http'] / 1000.0, 0.25, delta=0.05)
+
+    def test_zero_weight_left_out(self):
+        sessions = nta.SessionGenerator(300, 1, {'http': 0.5, 'smtp': 0}, seed=1, path=path)
+        list(sessions)
+        self.assertEqual(sessions.sent['smtp'], 0)
+        self.assertEqual(sessions.sent['http'], 100)
+
+    def test_all_zero_weights(self):
+        self.assertRaises(AssertionError, nta.SessionGenerator, 10, 10, {'http': 0, 'smtp': 0}, path=path)
+
+
+if __name__ == '__main__':
+    unittest.main()